@@ -7,10 +7,13 @@ import time
 
 from prometheus_client import start_http_server
 
+import reconcile.utils.oc as oc
+
 from reconcile.status import ExitCodes
 from reconcile.cli import integration, LOG_FMT, LOG_DATEFMT
 from reconcile.utils.metrics import run_time
 from reconcile.utils.metrics import run_status
+from reconcile.utils.vault import VaultClient
 
 
 SHARDS = int(os.environ.get('SHARDS', 1))
@@ -27,6 +30,14 @@ LOG_FILE = os.environ.get('LOG_FILE')
 SLEEP_DURATION_SECS = os.environ.get('SLEEP_DURATION_SECS', 600)
 SLEEP_ON_ERROR = os.environ.get('SLEEP_ON_ERROR', 10)
 
+# Daemon mode keeps the OpenShift clients, and their jump host tunnels,
+# warm between runs. The Vault client and the GraphQL connections are kept
+# in any case. AWS sessions are still created by each run.
+DAEMON_MODE = os.environ.get('DAEMON_MODE', '').lower() in ['true', 'yes']
+DAEMON_CLIENT_TTL_SECS = int(os.environ.get('DAEMON_CLIENT_TTL_SECS', 3600))
+DAEMON_HEALTH_CHECK_SECS = \
+    int(os.environ.get('DAEMON_HEALTH_CHECK_SECS', 300))
+
 LOG = logging.getLogger(__name__)
 
 # Messages to stdout
@@ -59,9 +70,19 @@ def build_args():
 if __name__ == "__main__":
     start_http_server(9090)
 
+    client_pool = None
+    if DAEMON_MODE and not RUN_ONCE:
+        client_pool = oc.init_client_pool(
+            ttl=DAEMON_CLIENT_TTL_SECS,
+            health_check_interval=DAEMON_HEALTH_CHECK_SECS)
+
     while True:
         sleep = SLEEP_DURATION_SECS
         start_time = time.monotonic()
+        if client_pool:
+            client_pool.expire()
+        # unversioned secrets may have changed since the last run
+        VaultClient.clear_cache()
         # Running the integration via Click, so we don't have to replicate
         # the CLI logic here
         try:
@@ -79,6 +100,9 @@ if __name__ == "__main__":
             sleep = SLEEP_ON_ERROR
             LOG.exception('Error running qontract-reconcile: %s', exc_obj)
             return_code = ExitCodes.ERROR
+            # do not trust warm clients after an unexpected error
+            if client_pool:
+                client_pool.clear()
 
         time_spent = time.monotonic() - start_time
 
@@ -469,9 +469,10 @@ def terraform_aws_route53(ctx, print_only, enable_deletion,
 
 
 @integration.command()
+@threaded()
 @click.pass_context
-def github(ctx):
-    run_integration(reconcile.github_org, ctx.obj)
+def github(ctx, thread_pool_size):
+    run_integration(reconcile.github_org, ctx.obj, thread_pool_size)
 
 
 @integration.command()
@@ -648,9 +649,10 @@ def openshift_upgrade_watcher(ctx, thread_pool_size, internal, use_jump_host):
 
 
 @integration.command()
+@threaded()
 @click.pass_context
-def slack_usergroups(ctx):
-    run_integration(reconcile.slack_usergroups, ctx.obj)
+def slack_usergroups(ctx, thread_pool_size):
+    run_integration(reconcile.slack_usergroups, ctx.obj, thread_pool_size)
 
 
 @integration.command()
@@ -945,30 +947,34 @@ def openshift_routes(ctx, thread_pool_size, internal, use_jump_host,
 
 
 @integration.command()
+@threaded()
 @click.pass_context
-def quay_membership(ctx):
-    run_integration(reconcile.quay_membership, ctx.obj)
+def quay_membership(ctx, thread_pool_size):
+    run_integration(reconcile.quay_membership, ctx.obj, thread_pool_size)
 
 
 @integration.command()
+@threaded()
 @click.pass_context
 @binary(['skopeo'])
-def gcr_mirror(ctx):
-    run_integration(reconcile.gcr_mirror, ctx.obj)
+def gcr_mirror(ctx, thread_pool_size):
+    run_integration(reconcile.gcr_mirror, ctx.obj, thread_pool_size)
 
 
 @integration.command()
+@threaded()
 @click.pass_context
 @binary(['skopeo'])
-def quay_mirror(ctx):
-    run_integration(reconcile.quay_mirror, ctx.obj)
+def quay_mirror(ctx, thread_pool_size):
+    run_integration(reconcile.quay_mirror, ctx.obj, thread_pool_size)
 
 
 @integration.command()
+@threaded()
 @click.pass_context
 @binary(['skopeo'])
-def quay_mirror_org(ctx):
-    run_integration(reconcile.quay_mirror_org, ctx.obj)
+def quay_mirror_org(ctx, thread_pool_size):
+    run_integration(reconcile.quay_mirror_org, ctx.obj, thread_pool_size)
 
 
 @integration.command()
@@ -9,6 +9,7 @@ import reconcile.utils.threaded as threaded
 
 from reconcile import queries
 from reconcile.utils.aws_api import AWSApi
+from reconcile.utils.registry_cache import RegistryCache
 from reconcile.utils.secret_reader import SecretReader
 
 
@@ -17,9 +18,10 @@ LOG = logging.getLogger(__name__)
 
 
 class EcrMirror:
-    def __init__(self, instance, dry_run):
+    def __init__(self, instance, dry_run, registry_cache=None):
         self.dry_run = dry_run
         self.instance = instance
+        self.registry_cache = registry_cache or RegistryCache()
         self.settings = queries.get_app_interface_settings()
         self.secret_reader = SecretReader(settings=self.settings)
         self.skopeo_cli = Skopeo(dry_run)
@@ -75,8 +77,8 @@ class EcrMirror:
                       password=self.image_password)
 
         LOG.debug('[checking %s -> %s]', image, ecr_mirror)
-        for tag in image:
-            if tag not in ecr_mirror:
+        for tag in self.registry_cache.tags(image):
+            if not self.registry_cache.has_tag(ecr_mirror, tag):
                 try:
                     self.skopeo_cli.copy(src_image=image[tag],
                                          src_creds=self.image_auth,
@@ -132,7 +134,10 @@ def run(dry_run, thread_pool_size=10):
 
             tfrs_to_mirror.append(tfr)
 
+    # mirrors of the same upstream image share its tags
+    registry_cache = RegistryCache()
     work_list = threaded.run(EcrMirror, tfrs_to_mirror,
                              thread_pool_size=thread_pool_size,
-                             dry_run=dry_run)
+                             dry_run=dry_run,
+                             registry_cache=registry_cache)
     threaded.run(worker, work_list, thread_pool_size=thread_pool_size)
@@ -1,10 +1,15 @@
 import logging
 import os
+
+from threading import Lock
+
 from github import Github
+from github.GithubException import GithubException
 from github.GithubObject import NotSet
 from sretoolbox.utils import retry
 
 import reconcile.utils.gql as gql
+import reconcile.utils.threaded as threaded
 from reconcile.utils.secret_reader import SecretReader
 import reconcile.openshift_users as openshift_users
 import reconcile.queries as queries
@@ -12,6 +17,7 @@ import reconcile.queries as queries
 from reconcile.utils.aggregated_list \
     import AggregatedList, AggregatedDiffRunner
 from reconcile.utils.raw_github_api import RawGithubApi
+from reconcile.utils.rate_limiter import TokenBucket
 
 
 GH_BASE_URL = os.environ.get('GITHUB_API', 'https://api.github.com')
@@ -94,54 +100,64 @@ def get_config(desired_org_name=None):
     return config
 
 
-@retry()
-def fetch_current_state(gh_api_store):
-    state = AggregatedList()
+def fetch_org_state(org_name, gh_api_store):
+    raw_gh_api = gh_api_store.raw_github_api(org_name)
+    managed_teams = gh_api_store.managed_teams(org_name)
+    # if 'managedTeams' is not specified
+    # we manage all teams
+    is_managed = managed_teams is None or len(managed_teams) == 0
 
-    for org_name in gh_api_store.orgs():
-        g = gh_api_store.github(org_name)
-        raw_gh_api = gh_api_store.raw_github_api(org_name)
-        managed_teams = gh_api_store.managed_teams(org_name)
-        # if 'managedTeams' is not specified
-        # we manage all teams
-        is_managed = managed_teams is None or len(managed_teams) == 0
-
-        org = g.get_organization(org_name)
-
-        org_members = None
-        if is_managed:
-            org_members = [member.login for member in org.get_members()]
-            org_members.extend(raw_gh_api.org_invitations(org_name))
-            org_members = [m.lower() for m in org_members]
-
-        all_team_members = []
-        for team in org.get_teams():
-            if not is_managed and team.name not in managed_teams:
-                continue
-
-            members = [member.login for member in team.get_members()]
-            members.extend(raw_gh_api.team_invitations(team.id))
-            members = [m.lower() for m in members]
-            all_team_members.extend(members)
-
-            state.add(
-                {
-                    'service': 'github-org-team',
-                    'org': org_name,
-                    'team': team.name
-                },
-                members
-            )
-        all_team_members = list(set(all_team_members))
-
-        members = org_members or all_team_members
-        state.add(
+    org_members = None
+    if is_managed:
+        org_members = raw_gh_api.org_members(org_name)
+        org_members.extend(raw_gh_api.org_invitations(org_name))
+        org_members = [m.lower() for m in org_members]
+
+    teams = raw_gh_api.org_teams(org_name)
+    gh_api_store.set_team_ids(
+        org_name, {team['name']: team['id'] for team in teams})
+
+    groups = []
+    all_team_members = []
+    for team in teams:
+        if not is_managed and team['name'] not in managed_teams:
+            continue
+
+        members = team['members'] + team['invitations']
+        members = [m.lower() for m in members]
+        all_team_members.extend(members)
+
+        groups.append((
             {
-                'service': 'github-org',
+                'service': 'github-org-team',
                 'org': org_name,
+                'team': team['name']
             },
             members
-        )
+        ))
+    all_team_members = list(set(all_team_members))
+
+    members = org_members or all_team_members
+    groups.append((
+        {
+            'service': 'github-org',
+            'org': org_name,
+        },
+        members
+    ))
+
+    return groups
+
+
+@retry()
+def fetch_current_state(gh_api_store, thread_pool_size=10):
+    state = AggregatedList()
+
+    results = threaded.run(fetch_org_state, gh_api_store.orgs(),
+                           thread_pool_size, gh_api_store=gh_api_store)
+    for groups in results:
+        for params, members in groups:
+            state.add(params, members)
 
     return state
 
@@ -210,6 +226,9 @@ def fetch_desired_state(infer_clusters=True):
 
 
 class GHApiStore:
+    """GHApiStore holds the api clients and rate limiter of each org,
+    and caches the team ids, organizations, teams and users looked
+    up in a run."""
     _orgs = {}
 
     def __init__(self, config):
@@ -218,9 +237,18 @@ class GHApiStore:
             managed_teams = org_config.get('managed_teams', None)
             self._orgs[org_name] = (Github(token, base_url=GH_BASE_URL),
                                     RawGithubApi(token), managed_teams)
+        # concurrency is bounded by the thread pool, calls are only
+        # throttled once the quota of an org runs low
+        self._rate_limiters = {org_name: TokenBucket(rate=None, floor=500)
+                               for org_name in config['github']}
+        self._team_ids = {}
+        self._gh_orgs = {}
+        self._gh_teams = {}
+        self._gh_users = {}
+        self._lock = Lock()
 
     def orgs(self):
-        return self._orgs.keys()
+        return list(self._orgs.keys())
 
     def github(self, org_name):
         return self._orgs[org_name][0]
@@ -231,6 +259,78 @@ class GHApiStore:
     def managed_teams(self, org_name):
         return self._orgs[org_name][2]
 
+    def set_team_ids(self, org_name, team_ids):
+        with self._lock:
+            self._team_ids[org_name] = team_ids
+
+    SECONDARY_RATE_LIMIT_ATTEMPTS = 3
+
+    @staticmethod
+    def _secondary_rate_limited(error):
+        headers = getattr(error, 'headers', None) or {}
+        return error.status == 403 and 'Retry-After' in headers
+
+    def call(self, org_name, func, *args):
+        """calls the github api within the rate limit of the org.
+        PyGithub keeps the rate limit of the last response.
+        calls hitting the secondary rate limit (403 with Retry-After,
+        e.g. on concurrent mutations) are retried once it is lifted."""
+        g = self.github(org_name)
+        rate_limiter = self._rate_limiters[org_name]
+        for attempt in range(1, self.SECONDARY_RATE_LIMIT_ATTEMPTS + 1):
+            rate_limiter.acquire()
+            try:
+                result = func(*args)
+                break
+            except GithubException as e:
+                if not self._secondary_rate_limited(e) or \
+                        attempt == self.SECONDARY_RATE_LIMIT_ATTEMPTS:
+                    raise
+                logging.warning(f'[{org_name}] secondary rate limit hit, '
+                                f'retrying after {e.headers["Retry-After"]}s')
+                rate_limiter.update_from_headers(e.headers)
+        remaining, _ = g.rate_limiting
+        rate_limiter.update(remaining, g.rate_limiting_resettime)
+        return result
+
+    def _cached(self, cache, key, fetch):
+        with self._lock:
+            if key in cache:
+                return cache[key]
+        value = fetch()
+        with self._lock:
+            return cache.setdefault(key, value)
+
+    def organization(self, org_name):
+        g = self.github(org_name)
+        return self._cached(
+            self._gh_orgs, org_name,
+            lambda: self.call(org_name, g.get_organization, org_name))
+
+    def team_id(self, org_name, team_name):
+        with self._lock:
+            team_ids = self._team_ids.get(org_name)
+        if team_ids is None or team_name not in team_ids:
+            gh_org = self.organization(org_name)
+            teams = self.call(org_name, lambda: list(gh_org.get_teams()))
+            team_ids = {team.name: team.id for team in teams}
+            self.set_team_ids(org_name, team_ids)
+        return team_ids[team_name]
+
+    def team(self, org_name, team_name):
+        def fetch():
+            gh_org = self.organization(org_name)
+            team_id = self.team_id(org_name, team_name)
+            return self.call(org_name, gh_org.get_team, team_id)
+
+        return self._cached(self._gh_teams, (org_name, team_name), fetch)
+
+    def user(self, org_name, login):
+        g = self.github(org_name)
+        return self._cached(
+            self._gh_users, (org_name, login),
+            lambda: self.call(org_name, g.get_user, login))
+
 
 class RunnerAction:
     def __init__(self, dry_run, gh_api_store):
@@ -248,15 +348,13 @@ class RunnerAction:
                 for member in items:
                     logging.info([label, member, org, team])
             else:
-                g = self.gh_api_store.github(org)
-                gh_org = g.get_organization(org)
-                teams = {team.name: team.id for team in gh_org.get_teams()}
-                gh_team = gh_org.get_team(teams[team])
+                gh_team = self.gh_api_store.team(org, team)
 
                 for member in items:
                     logging.info([label, member, org, team])
-                    gh_user = g.get_user(member)
-                    gh_team.add_membership(gh_user, "member")
+                    gh_user = self.gh_api_store.user(org, member)
+                    self.gh_api_store.call(org, gh_team.add_membership,
+                                           gh_user, "member")
 
         return action
 
@@ -271,15 +369,13 @@ class RunnerAction:
                 for member in items:
                     logging.info([label, member, org, team])
             else:
-                g = self.gh_api_store.github(org)
-                gh_org = g.get_organization(org)
-                teams = {team.name: team.id for team in gh_org.get_teams()}
-                gh_team = gh_org.get_team(teams[team])
+                gh_team = self.gh_api_store.team(org, team)
 
                 for member in items:
                     logging.info([label, member, org, team])
-                    gh_user = g.get_user(member)
-                    gh_team.remove_membership(gh_user)
+                    gh_user = self.gh_api_store.user(org, member)
+                    self.gh_api_store.call(org, gh_team.remove_membership,
+                                           gh_user)
 
                 # members = gh_team.get_members()
                 # if len(list(members)) == 0:
@@ -298,14 +394,14 @@ class RunnerAction:
             logging.info([label, org, team])
 
             if not self.dry_run:
-                g = self.gh_api_store.github(org)
-                gh_org = g.get_organization(org)
+                gh_org = self.gh_api_store.organization(org)
 
                 repo_names = NotSet
                 permission = NotSet
                 privacy = "secret"
 
-                gh_org.create_team(team, repo_names, permission, privacy)
+                self.gh_api_store.call(org, gh_org.create_team, team,
+                                       repo_names, permission, privacy)
 
         return action
 
@@ -319,13 +415,13 @@ class RunnerAction:
                 for member in items:
                     logging.info([label, member, org])
             else:
-                g = self.gh_api_store.github(org)
-                gh_org = g.get_organization(org)
+                gh_org = self.gh_api_store.organization(org)
 
                 for member in items:
                     logging.info([label, member, org])
-                    gh_user = g.get_user(member)
-                    gh_org.add_to_members(gh_user, 'member')
+                    gh_user = self.gh_api_store.user(org, member)
+                    self.gh_api_store.call(org, gh_org.add_to_members,
+                                           gh_user, 'member')
 
         return action
 
@@ -339,15 +435,15 @@ class RunnerAction:
                 for member in items:
                     logging.info([label, member, org])
             else:
-                g = self.gh_api_store.github(org)
-                gh_org = g.get_organization(org)
+                gh_org = self.gh_api_store.organization(org)
 
                 for member in items:
                     logging.info([label, member, org])
 
                     if not self.dry_run:
-                        gh_user = g.get_user(member)
-                        gh_org.remove_from_membership(gh_user)
+                        gh_user = self.gh_api_store.user(org, member)
+                        self.gh_api_store.call(
+                            org, gh_org.remove_from_membership, gh_user)
 
         return action
 
@@ -362,11 +458,11 @@ def service_is(service):
     return lambda params: params.get("service") == service
 
 
-def run(dry_run):
+def run(dry_run, thread_pool_size=10):
     config = get_config()
     gh_api_store = GHApiStore(config)
 
-    current_state = fetch_current_state(gh_api_store)
+    current_state = fetch_current_state(gh_api_store, thread_pool_size)
     desired_state = fetch_desired_state()
 
     # Ensure current_state and desired_state match orgs
@@ -384,7 +480,7 @@ def run(dry_run):
 
     # Run actions
     runner_action = RunnerAction(dry_run, gh_api_store)
-    runner = AggregatedDiffRunner(diff)
+    runner = AggregatedDiffRunner(diff, thread_pool_size=thread_pool_size)
 
     # insert github-org
     runner.register(
@@ -9,16 +9,15 @@ from reconcile.utils.ocm import OCMMap
 QONTRACT_INTEGRATION = 'ocm-addons'
 
 
-def fetch_current_state(clusters):
+def fetch_current_state(clusters, thread_pool_size=10):
     settings = queries.get_app_interface_settings()
     ocm_map = OCMMap(clusters=clusters, integration=QONTRACT_INTEGRATION,
-                     settings=settings)
+                     settings=settings, thread_pool_size=thread_pool_size)
 
     current_state = []
-    for cluster in clusters:
-        cluster_name = cluster['name']
-        ocm = ocm_map.get(cluster_name)
-        addons = ocm.get_cluster_addons(cluster_name)
+    cluster_addons = ocm_map.get_for_clusters(
+        'get_cluster_addons', [c['name'] for c in clusters])
+    for cluster_name, addons in cluster_addons.items():
         if addons:
             for addon in addons:
                 addon['cluster'] = cluster_name
@@ -79,7 +78,7 @@ def run(dry_run, gitlab_project_id=None, thread_pool_size=10):
         logging.debug("No Addon definitions found in app-interface")
         sys.exit(ExitCodes.SUCCESS)
 
-    ocm_map, current_state = fetch_current_state(clusters)
+    ocm_map, current_state = fetch_current_state(clusters, thread_pool_size)
     desired_state = fetch_desired_state(clusters)
     diffs = calculate_diff(current_state, desired_state)
     err = act(dry_run, diffs, ocm_map)
@@ -10,16 +10,15 @@ from reconcile.utils.ocm import OCMMap
 QONTRACT_INTEGRATION = 'ocm-external-configuration-labels'
 
 
-def fetch_current_state(clusters):
+def fetch_current_state(clusters, thread_pool_size=10):
     settings = queries.get_app_interface_settings()
     ocm_map = OCMMap(clusters=clusters, integration=QONTRACT_INTEGRATION,
-                     settings=settings)
+                     settings=settings, thread_pool_size=thread_pool_size)
 
     current_state = []
-    for cluster in clusters:
-        cluster_name = cluster['name']
-        ocm = ocm_map.get(cluster_name)
-        labels = ocm.get_external_configuration_labels(cluster_name)
+    cluster_labels = ocm_map.get_for_clusters(
+        'get_external_configuration_labels', [c['name'] for c in clusters])
+    for cluster_name, labels in cluster_labels.items():
         for key, value in labels.items():
             item = {
                 'label': {
@@ -101,7 +100,7 @@ def run(dry_run, gitlab_project_id=None, thread_pool_size=10):
             "No externalConfiguration definitions found in app-interface")
         sys.exit(ExitCodes.SUCCESS)
 
-    ocm_map, current_state = fetch_current_state(clusters)
+    ocm_map, current_state = fetch_current_state(clusters, thread_pool_size)
     desired_state = fetch_desired_state(clusters)
     diffs, err = calculate_diff(current_state, desired_state)
     act(dry_run, diffs, ocm_map)
@@ -9,16 +9,15 @@ from reconcile.utils.ocm import OCMMap
 QONTRACT_INTEGRATION = 'ocm-machine-pools'
 
 
-def fetch_current_state(clusters):
+def fetch_current_state(clusters, thread_pool_size=10):
     settings = queries.get_app_interface_settings()
     ocm_map = OCMMap(clusters=clusters, integration=QONTRACT_INTEGRATION,
-                     settings=settings)
+                     settings=settings, thread_pool_size=thread_pool_size)
 
     current_state = []
-    for cluster in clusters:
-        cluster_name = cluster['name']
-        ocm = ocm_map.get(cluster_name)
-        machine_pools = ocm.get_machine_pools(cluster_name)
+    cluster_machine_pools = ocm_map.get_for_clusters(
+        'get_machine_pools', [c['name'] for c in clusters])
+    for cluster_name, machine_pools in cluster_machine_pools.items():
         for machine_pool in machine_pools:
             machine_pool['cluster'] = cluster_name
             current_state.append(machine_pool)
@@ -109,7 +108,7 @@ def run(dry_run, gitlab_project_id=None, thread_pool_size=10):
         logging.debug("No machinePools definitions found in app-interface")
         sys.exit(0)
 
-    ocm_map, current_state = fetch_current_state(clusters)
+    ocm_map, current_state = fetch_current_state(clusters, thread_pool_size)
     desired_state = fetch_desired_state(clusters)
     diffs, err = calculate_diff(current_state, desired_state)
     act(dry_run, diffs, ocm_map)
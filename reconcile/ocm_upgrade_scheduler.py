@@ -8,17 +8,16 @@ from reconcile.utils.ocm import OCMMap
 QONTRACT_INTEGRATION = 'ocm-upgrade-scheduler'
 
 
-def fetch_current_state(clusters):
+def fetch_current_state(clusters, thread_pool_size=10):
     settings = queries.get_app_interface_settings()
     ocm_map = OCMMap(clusters=clusters, integration=QONTRACT_INTEGRATION,
-                     settings=settings)
+                     settings=settings, thread_pool_size=thread_pool_size)
 
     current_state = []
-    for cluster in clusters:
-        cluster_name = cluster['name']
-        ocm = ocm_map.get(cluster_name)
-        upgrade_policies = \
-            ocm.get_upgrade_policies(cluster_name, schedule_type='automatic')
+    cluster_upgrade_policies = ocm_map.get_for_clusters(
+        'get_upgrade_policies', [c['name'] for c in clusters],
+        schedule_type='automatic')
+    for cluster_name, upgrade_policies in cluster_upgrade_policies.items():
         for upgrade_policy in upgrade_policies:
             upgrade_policy['cluster'] = cluster_name
             current_state.append(upgrade_policy)
@@ -85,7 +84,7 @@ def run(dry_run, gitlab_project_id=None, thread_pool_size=10):
         logging.debug("No upgradePolicy definitions found in app-interface")
         sys.exit(0)
 
-    ocm_map, current_state = fetch_current_state(clusters)
+    ocm_map, current_state = fetch_current_state(clusters, thread_pool_size)
     desired_state = fetch_desired_state(clusters)
     diffs, err = calculate_diff(current_state, desired_state)
     act(dry_run, diffs, ocm_map)
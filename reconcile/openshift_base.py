@@ -1,4 +1,10 @@
+import hashlib
+import json
 import logging
+import os
+import time
+
+from threading import Lock
 
 import yaml
 
@@ -15,6 +21,7 @@ from reconcile.utils.oc import MetaDataAnnotationsTooLongApplyError
 from reconcile.utils.oc import OC_Map
 from reconcile.utils.oc import StatusCodeError
 from reconcile.utils.oc import UnsupportedMediaTypeError
+from reconcile.utils.metrics import validation_time_to_ready
 from reconcile.utils.openshift_resource import OpenshiftResource as OR
 from reconcile.utils.openshift_resource import ResourceInventory
 
@@ -40,6 +47,104 @@ class StateSpec:
         self.resource_names = resource_names
 
 
+class NamespaceStateSpec:
+    """ a batch of the "current" StateSpecs of a single namespace.
+    the current state of all the resource types it contains is fetched
+    at once (see OC.get_namespace_items). """
+    def __init__(self, specs):
+        self.type = 'current-namespace'
+        self.specs = specs
+        self.oc = specs[0].oc
+        self.cluster = specs[0].cluster
+        self.namespace = specs[0].namespace
+        self.resource_names = {s.resource: s.resource_names for s in specs
+                               if s.resource_names}
+
+
+class ClusterStateSpec:
+    """ a batch of the "current" StateSpecs of a single resource type
+    in all the namespaces of a cluster. the current state is listed once
+    for all namespaces and split into the namespaces it belongs to. """
+    def __init__(self, specs):
+        self.type = 'current-cluster'
+        self.specs = specs
+        self.oc = specs[0].oc
+        self.cluster = specs[0].cluster
+        self.namespace = None
+        self.resource_type = \
+            specs[0].resource_type_override or specs[0].resource
+        self.resource_names = {s.namespace: s.resource_names for s in specs
+                               if s.resource_names}
+
+
+# minimal ratio of managed namespaces out of all the namespaces
+# in a cluster to fetch the current state of the cluster at once
+CLUSTER_WIDE_FETCH_RATIO = 0.5
+
+
+def get_namespaces_count(oc):
+    if oc.init_projects:
+        return len(oc.projects)
+    return len(oc.get_all('Project.project.openshift.io')['items'])
+
+
+def batch_specs_by_cluster(state_specs, thread_pool_size,
+                           ratio=CLUSTER_WIDE_FETCH_RATIO):
+    """ replaces the "current" StateSpecs of clusters in which the ratio
+    of managed namespaces is at least `ratio` with one ClusterStateSpec
+    per resource type. other specs are kept as is. """
+    clusters = {}
+    for spec in state_specs:
+        if spec.type != 'current' or spec.namespace == 'cluster':
+            continue
+        clusters.setdefault(spec.cluster, (spec.oc, set()))[1].add(
+            spec.namespace)
+
+    def use_cluster_wide_fetch(cluster):
+        oc, managed_namespaces = clusters[cluster]
+        try:
+            namespaces_count = get_namespaces_count(oc)
+        except StatusCodeError as e:
+            logging.warning(f"[{cluster}] could not count namespaces: {e}")
+            return False
+        return namespaces_count > 0 and \
+            len(managed_namespaces) / namespaces_count >= ratio
+
+    cluster_names = list(clusters)
+    results = threaded.run(use_cluster_wide_fetch, cluster_names,
+                           thread_pool_size)
+    cluster_wide = {c for c, r in zip(cluster_names, results) if r}
+
+    batches = {}
+    other_specs = []
+    for spec in state_specs:
+        if spec.type == 'current' and spec.cluster in cluster_wide \
+                and spec.namespace != 'cluster':
+            key = (spec.cluster, spec.resource_type_override or spec.resource)
+            batches.setdefault(key, []).append(spec)
+        else:
+            other_specs.append(spec)
+    for cluster in cluster_wide:
+        logging.debug(f"[{cluster}] fetching current state cluster wide")
+    return [ClusterStateSpec(specs) for specs in batches.values()] + \
+        other_specs
+
+
+def batch_specs_by_namespace(state_specs):
+    """ replaces the "current" StateSpecs with one
+    NamespaceStateSpec per namespace. other specs are kept as is. """
+    batches = {}
+    other_specs = []
+    for spec in state_specs:
+        if spec.type == 'current':
+            key = (spec.cluster, spec.namespace)
+            batches.setdefault(key, []).append(spec)
+        else:
+            other_specs.append(spec)
+    return [NamespaceStateSpec(specs) for specs in batches.values()] + \
+        other_specs
+
+
 def init_specs_to_fetch(ri, oc_map,
                         namespaces=None,
                         clusters=None,
@@ -135,10 +240,124 @@ def init_specs_to_fetch(ri, oc_map,
     return state_specs
 
 
+def has_api_resource(oc, resource_type):
+    # some resource types may be used explicitly (<kind>.<api_group>).
+    # we only take the first token as oc.api_resources contains only the kind.
+    # this is the case created by using `managedResourceTypeOverrides`.
+    if not oc.api_resources:
+        return True
+    kind = resource_type.split('.')[0].lower()
+    return kind in [a.lower() for a in oc.api_resources]
+
+
+def populate_current_state_batch(spec, ri, integration, integration_version):
+    oc = spec.oc
+    kinds = []
+    resource_names = {}
+    resource_types = {}
+    for s in spec.specs:
+        resource_type_to_use = s.resource_type_override or s.resource
+        if not has_api_resource(oc, resource_type_to_use):
+            msg = f"[{s.cluster}] cluster has no API resource " + \
+                f"{resource_type_to_use}."
+            logging.warning(msg)
+            continue
+        kind = resource_type_to_use.split('.')[0].lower()
+        resource_types[kind] = s.resource
+        if s.resource_names:
+            resource_names[resource_type_to_use] = s.resource_names
+        else:
+            kinds.append(resource_type_to_use)
+
+    if not resource_types:
+        return
+
+    try:
+        items = oc.get_namespace_items(spec.namespace,
+                                       kinds=kinds,
+                                       resource_names=resource_names)
+    except StatusCodeError as e:
+        ri.register_error(cluster=spec.cluster)
+        msg = f"[{spec.cluster}/{spec.namespace}] {e}"
+        logging.error(msg)
+        return
+
+    for item in items:
+        resource_type = resource_types.get(item['kind'].lower())
+        if resource_type is None:
+            continue
+        openshift_resource = OR(item,
+                                integration,
+                                integration_version)
+        ri.add_current(
+            spec.cluster,
+            spec.namespace,
+            resource_type,
+            openshift_resource.name,
+            openshift_resource
+        )
+
+
+def populate_current_state_cluster(spec, ri,
+                                   integration, integration_version):
+    oc = spec.oc
+    if not has_api_resource(oc, spec.resource_type):
+        msg = f"[{spec.cluster}] cluster has no API resource " + \
+            f"{spec.resource_type}."
+        logging.warning(msg)
+        return
+
+    try:
+        items = oc.get_all(spec.resource_type, all_namespaces=True)['items']
+    except StatusCodeError as e:
+        if 'forbidden' in str(e).lower():
+            # the token may only have access to the managed namespaces
+            msg = f"[{spec.cluster}] can not list {spec.resource_type} " + \
+                "in all namespaces, fetching per namespace."
+            logging.warning(msg)
+            for s in spec.specs:
+                populate_current_state_batch(NamespaceStateSpec([s]), ri,
+                                             integration,
+                                             integration_version)
+            return
+        ri.register_error(cluster=spec.cluster)
+        msg = f"[{spec.cluster}] {e}"
+        logging.error(msg)
+        return
+
+    specs = {s.namespace: s for s in spec.specs}
+    for item in items:
+        namespace = item['metadata'].get('namespace')
+        s = specs.get(namespace)
+        if s is None:
+            continue
+        if s.resource_names and \
+                item['metadata']['name'] not in s.resource_names:
+            continue
+        openshift_resource = OR(item,
+                                integration,
+                                integration_version)
+        ri.add_current(
+            s.cluster,
+            s.namespace,
+            s.resource,
+            openshift_resource.name,
+            openshift_resource
+        )
+
+
 def populate_current_state(spec, ri, integration, integration_version):
     oc = spec.oc
     if oc is None:
         return
+    if spec.type == 'current-namespace':
+        populate_current_state_batch(spec, ri,
+                                     integration, integration_version)
+        return
+    if spec.type == 'current-cluster':
+        populate_current_state_cluster(spec, ri,
+                                       integration, integration_version)
+        return
     api_resources = oc.api_resources
     if api_resources and spec.resource not in api_resources:
         msg = f"[{spec.cluster}] cluster has no API resource {spec.resource}."
@@ -170,7 +389,9 @@ def fetch_current_state(namespaces=None,
                         override_managed_types=None,
                         internal=None,
                         use_jump_host=True,
-                        init_api_resources=False):
+                        init_api_resources=False,
+                        batch_by_namespace=False,
+                        cluster_wide_fetch=False):
     ri = ResourceInventory()
     settings = queries.get_app_interface_settings()
     oc_map = OC_Map(namespaces=namespaces,
@@ -189,6 +410,10 @@ def fetch_current_state(namespaces=None,
             clusters=clusters,
             override_managed_types=override_managed_types
         )
+    if cluster_wide_fetch:
+        state_specs = batch_specs_by_cluster(state_specs, thread_pool_size)
+    if batch_by_namespace:
+        state_specs = batch_specs_by_namespace(state_specs)
     threaded.run(populate_current_state, state_specs, thread_pool_size,
                  ri=ri,
                  integration=integration,
@@ -197,6 +422,163 @@ def fetch_current_state(namespaces=None,
     return ri, oc_map
 
 
+class ReconcileState:
+    """ records, per (cluster, namespace, resource type), the digest of
+    the desired state and of the resource versions of the current state
+    seen at the last successful run.
+
+    units where both are unchanged can skip fetching and realizing the
+    current state. every unit is fully reconciled at least every
+    resync_interval seconds to guard against drift.
+
+    the state is kept in memory (for daemon mode) and in path, if set. """
+    def __init__(self, path=None, resync_interval=3600):
+        self.path = path
+        self.resync_interval = resync_interval
+        self._units = {}
+        self._lock = Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                self._units = json.load(f)
+
+    @staticmethod
+    def key(cluster, namespace, resource_type):
+        return '/'.join([cluster, namespace, resource_type])
+
+    def unchanged(self, key, desired, current):
+        unit = self._units.get(key)
+        if unit is None:
+            return False
+        if time.time() - unit['synced'] >= self.resync_interval:
+            return False
+        return unit['desired'] == desired and unit['current'] == current
+
+    def record(self, key, desired, current):
+        with self._lock:
+            self._units[key] = {'desired': desired, 'current': current,
+                                'synced': time.time()}
+
+    def save(self):
+        if not self.path:
+            return
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self._units, f)
+        os.replace(tmp_path, self.path)
+
+
+_reconcile_states = {}
+
+
+def get_reconcile_state(integration):
+    """ returns the ReconcileState of an integration if incremental
+    reconciliation is enabled (INCREMENTAL_RECONCILE), otherwise None. """
+    enabled = os.environ.get('INCREMENTAL_RECONCILE', '').lower() \
+        in ['true', 'yes']
+    if not enabled:
+        return None
+    if integration not in _reconcile_states:
+        state_dir = os.environ.get('INCREMENTAL_RECONCILE_STATE_DIR')
+        path = os.path.join(state_dir, f'{integration}.json') \
+            if state_dir else None
+        resync_interval = \
+            int(os.environ.get('INCREMENTAL_RECONCILE_RESYNC_SECS', 3600))
+        _reconcile_states[integration] = \
+            ReconcileState(path, resync_interval)
+    return _reconcile_states[integration]
+
+
+def _digest(data):
+    return hashlib.sha256(json.dumps(data).encode('utf-8')).hexdigest()
+
+
+def desired_state_digest(data):
+    return _digest(sorted((name, d_item.sha256sum())
+                          for name, d_item in data['desired'].items()))
+
+
+def current_state_digest(oc, namespace, resource_type, names=None,
+                         integration=None):
+    """ digests the versions of the managed items of a unit: the items
+    with the given names and the items annotated by the integration.
+    unmanaged items are left out, as they may change constantly. """
+    return _digest(sorted(
+        oc.get_resource_versions(namespace, resource_type, names=names,
+                                 integration=integration).items()))
+
+
+def _unit_current_state_digest(unit, integration=None, take_over=False):
+    spec, names = unit
+    if take_over:
+        # unmanaged items are deleted, new ones must change the digest
+        names = integration = None
+    try:
+        return current_state_digest(
+            spec.oc, spec.namespace,
+            spec.resource_type_override or spec.resource,
+            names=names, integration=integration)
+    except StatusCodeError:
+        # the unit will be fetched and the error will be registered
+        return None
+
+
+def skip_unchanged_specs(state_specs, ri, reconcile_state, thread_pool_size,
+                         integration=None, take_over=False):
+    """ to be called once the desired state is in the inventory.
+
+    returns the "current" specs of the units which changed since
+    the last successful run, and the digests of these units, to record
+    once they are reconciled (see record_reconciled_units).
+    unchanged units are removed from the inventory.
+    take_over should match the take_over passed to realize_data. """
+    specs = [s for s in state_specs if s.type == 'current']
+    inventory = {(cluster, namespace, resource_type): data
+                 for cluster, namespace, resource_type, data in ri}
+    units = []
+    for spec in specs:
+        data = inventory.get((spec.cluster, spec.namespace, spec.resource))
+        names = set(data['desired']) if data else set()
+        names.update(spec.resource_names or [])
+        units.append((spec, names))
+    current_digests = threaded.run(_unit_current_state_digest, units,
+                                   thread_pool_size, integration=integration,
+                                   take_over=take_over)
+
+    changed_specs = []
+    unit_digests = {}
+    for spec, current in zip(specs, current_digests):
+        unit = (spec.cluster, spec.namespace, spec.resource)
+        if current is None or unit not in inventory:
+            changed_specs.append(spec)
+            continue
+        desired = desired_state_digest(inventory[unit])
+        key = ReconcileState.key(*unit)
+        if reconcile_state.unchanged(key, desired, current):
+            logging.debug(['unchanged', *unit])
+            ri.remove_resource_type(*unit)
+            continue
+        changed_specs.append(spec)
+        unit_digests[key] = (desired, current)
+
+    return changed_specs, unit_digests
+
+
+def record_reconciled_units(ri, actions, unit_digests, reconcile_state):
+    """ records the units which are in sync after realize_data.
+    units which had actions taken on them are checked again next run. """
+    if ri.has_error_registered():
+        return
+    changed = {(a['cluster'], a['namespace'], a['kind']) for a in actions}
+    for cluster, namespace, resource_type, _ in ri:
+        if (cluster, namespace, resource_type) in changed:
+            continue
+        key = ReconcileState.key(cluster, namespace, resource_type)
+        digests = unit_digests.get(key)
+        if digests:
+            reconcile_state.record(key, *digests)
+    reconcile_state.save()
+
+
 @retry(max_attempts=20)
 def wait_for_namespace_exists(oc, namespace):
     if not oc.project_exists(namespace):
@@ -278,13 +660,153 @@ def check_unused_resource_types(ri):
             logging.warning(msg)
 
 
+def _realize_resource_data(unpacked_ri_item,
+                           dry_run, oc_map, ri,
+                           take_over,
+                           caller,
+                           wait_for_namespace,
+                           no_dry_run_skip_compare,
+                           enable_deletion,
+                           recycle_pods):
+    cluster, namespace, resource_type, data = unpacked_ri_item
+    actions = []
+    if ri.has_error_registered(cluster=cluster):
+        msg = (
+            "[{}] skipping realize_data for "
+            "cluster with errors"
+        ).format(cluster)
+        logging.error(msg)
+        return actions
+
+    # desired items
+    for name, d_item in data['desired'].items():
+        c_item = data['current'].get(name)
+
+        if c_item is not None:
+            if not dry_run and no_dry_run_skip_compare:
+                msg = (
+                    "[{}/{}] skipping compare of resource '{}/{}'."
+                ).format(cluster, namespace, resource_type, name)
+                logging.debug(msg)
+            else:
+                # If resource doesn't have annotations, annotate and apply
+                if not c_item.has_qontract_annotations():
+                    msg = (
+                        "[{}/{}] resource '{}/{}' present "
+                        "w/o annotations, annotating and applying"
+                    ).format(cluster, namespace, resource_type, name)
+                    logging.info(msg)
+
+                # don't apply if sha256sum hashes match.
+                # this is checked before comparing the resources,
+                # as it does not require the current body, which
+                # a compact inventory does not keep in this case.
+                elif c_item.sha256sum() == d_item.sha256sum() and \
+                        c_item.has_valid_sha256sum():
+                    msg = (
+                        "[{}/{}] resource '{}/{}' present "
+                        "and hashes match, skipping."
+                    ).format(cluster, namespace, resource_type, name)
+                    logging.debug(msg)
+                    continue
+
+                # don't apply if resources match
+                # if there is a caller (saas file) and this is a take over
+                # we skip the equal compare as it's not covering
+                # cases of a removed label (for example)
+                # d_item == c_item is uncommutative
+                elif not (caller and take_over) and d_item == c_item:
+                    msg = (
+                        "[{}/{}] resource '{}/{}' present "
+                        "and matches desired, skipping."
+                    ).format(cluster, namespace, resource_type, name)
+                    logging.debug(msg)
+                    continue
+
+                elif c_item.sha256sum() == d_item.sha256sum():
+                    msg = (
+                        "[{}/{}] resource '{}/{}' present and "
+                        "has stale sha256sum due to manual changes."
+                    ).format(cluster, namespace, resource_type, name)
+                    logging.info(msg)
+
+                if logging.getLogger().isEnabledFor(logging.DEBUG):
+                    logging.debug("CURRENT: " +
+                                  OR.serialize(c_item.canonical_body))
+        else:
+            logging.debug("CURRENT: None")
+
+        if logging.getLogger().isEnabledFor(logging.DEBUG):
+            logging.debug("DESIRED: " +
+                          OR.serialize(d_item.canonical_body))
+
+        try:
+            apply(dry_run, oc_map, cluster, namespace,
+                  resource_type, d_item, wait_for_namespace,
+                  recycle_pods=recycle_pods)
+            action = {
+                'action': ACTION_APPLIED,
+                'cluster': cluster,
+                'namespace': namespace,
+                'kind': resource_type,
+                'name': d_item.name
+            }
+            actions.append(action)
+        except StatusCodeError as e:
+            ri.register_error()
+            msg = "[{}/{}] {} (error details: {})".format(
+                cluster, namespace, str(e), d_item.error_details)
+            logging.error(msg)
+
+    # current items
+    for name, c_item in data['current'].items():
+        d_item = data['desired'].get(name)
+        if d_item is not None:
+            continue
+
+        if c_item.has_qontract_annotations():
+            if caller and c_item.caller != caller:
+                continue
+        elif not take_over:
+            continue
+
+        try:
+            delete(dry_run, oc_map, cluster, namespace,
+                   resource_type, name, enable_deletion)
+            action = {
+                'action': ACTION_DELETED,
+                'cluster': cluster,
+                'namespace': namespace,
+                'kind': resource_type,
+                'name': name
+            }
+            actions.append(action)
+        except StatusCodeError as e:
+            ri.register_error()
+            msg = "[{}/{}] {}".format(cluster, namespace, str(e))
+            logging.error(msg)
+
+    return actions
+
+
+def _realize_resource_data_unit(unpacked_ri_items, **kwargs):
+    # items of a unit (a cluster or a namespace) are realized
+    # sequentially to keep the order of actions within a namespace
+    actions = []
+    for unpacked_ri_item in unpacked_ri_items:
+        actions.extend(_realize_resource_data(unpacked_ri_item, **kwargs))
+    return actions
+
+
 def realize_data(dry_run, oc_map, ri,
                  take_over=False,
                  caller=None,
                  wait_for_namespace=False,
                  no_dry_run_skip_compare=False,
                  override_enable_deletion=None,
-                 recycle_pods=True):
+                 recycle_pods=True,
+                 thread_pool_size=1,
+                 split_by_namespace=False):
     """
     Realize the current state to the desired state.
 
@@ -299,207 +821,240 @@ def realize_data(dry_run, oc_map, ri,
     :param no_dry_run_skip_compare: when running without dry-run, skip compare
     :param override_enable_deletion: override calculated enable_deletion value
     :param recycle_pods: should pods be recycled if a dependency changed
+    :param thread_pool_size: number of clusters (or namespaces)
+                             to realize in parallel
+    :param split_by_namespace: realize namespaces of a cluster in parallel
+                               instead of sequentially
     """
-    actions = []
     enable_deletion = False if ri.has_error_registered() else True
     # only allow to override enable_deletion if no errors were found
     if enable_deletion is True and override_enable_deletion is False:
         enable_deletion = False
 
+    # group the inventory into units of work that can be realized
+    # in parallel. dicts keep insertion order, so the returned actions
+    # are ordered the same way regardless of the thread pool size.
+    units = {}
     for cluster, namespace, resource_type, data in ri:
-        if ri.has_error_registered(cluster=cluster):
-            msg = (
-                "[{}] skipping realize_data for "
-                "cluster with errors"
-            ).format(cluster)
-            logging.error(msg)
-            continue
-
-        # desired items
-        for name, d_item in data['desired'].items():
-            c_item = data['current'].get(name)
-
-            if c_item is not None:
-                if not dry_run and no_dry_run_skip_compare:
-                    msg = (
-                        "[{}/{}] skipping compare of resource '{}/{}'."
-                    ).format(cluster, namespace, resource_type, name)
-                    logging.debug(msg)
-                else:
-                    # If resource doesn't have annotations, annotate and apply
-                    if not c_item.has_qontract_annotations():
-                        msg = (
-                            "[{}/{}] resource '{}/{}' present "
-                            "w/o annotations, annotating and applying"
-                        ).format(cluster, namespace, resource_type, name)
-                        logging.info(msg)
-
-                    # don't apply if resources match
-                    # if there is a caller (saas file) and this is a take over
-                    # we skip the equal compare as it's not covering
-                    # cases of a removed label (for example)
-                    # d_item == c_item is uncommutative
-                    elif not (caller and take_over) and d_item == c_item:
-                        msg = (
-                            "[{}/{}] resource '{}/{}' present "
-                            "and matches desired, skipping."
-                        ).format(cluster, namespace, resource_type, name)
-                        logging.debug(msg)
-                        continue
-
-                    # don't apply if sha256sum hashes match
-                    elif c_item.sha256sum() == d_item.sha256sum():
-                        if c_item.has_valid_sha256sum():
-                            msg = (
-                                "[{}/{}] resource '{}/{}' present "
-                                "and hashes match, skipping."
-                            ).format(cluster, namespace, resource_type, name)
-                            logging.debug(msg)
-                            continue
-                        else:
-                            msg = (
-                                "[{}/{}] resource '{}/{}' present and "
-                                "has stale sha256sum due to manual changes."
-                            ).format(cluster, namespace, resource_type, name)
-                            logging.info(msg)
-
-                    logging.debug("CURRENT: " +
-                                  OR.serialize(OR.canonicalize(c_item.body)))
-            else:
-                logging.debug("CURRENT: None")
-
-            logging.debug("DESIRED: " +
-                          OR.serialize(OR.canonicalize(d_item.body)))
-
-            try:
-                apply(dry_run, oc_map, cluster, namespace,
-                      resource_type, d_item, wait_for_namespace,
-                      recycle_pods=recycle_pods)
-                action = {
-                    'action': ACTION_APPLIED,
-                    'cluster': cluster,
-                    'namespace': namespace,
-                    'kind': resource_type,
-                    'name': d_item.name
-                }
-                actions.append(action)
-            except StatusCodeError as e:
-                ri.register_error()
-                msg = "[{}/{}] {} (error details: {})".format(
-                    cluster, namespace, str(e), d_item.error_details)
-                logging.error(msg)
-
-        # current items
-        for name, c_item in data['current'].items():
-            d_item = data['desired'].get(name)
-            if d_item is not None:
-                continue
-
-            if c_item.has_qontract_annotations():
-                if caller and c_item.caller != caller:
-                    continue
-            elif not take_over:
-                continue
-
-            try:
-                delete(dry_run, oc_map, cluster, namespace,
-                       resource_type, name, enable_deletion)
-                action = {
-                    'action': ACTION_DELETED,
-                    'cluster': cluster,
-                    'namespace': namespace,
-                    'kind': resource_type,
-                    'name': name
-                }
-                actions.append(action)
-            except StatusCodeError as e:
-                ri.register_error()
-                msg = "[{}/{}] {}".format(cluster, namespace, str(e))
-                logging.error(msg)
-
-    return actions
-
+        key = (cluster, namespace) if split_by_namespace else cluster
+        units.setdefault(key, []).append(
+            (cluster, namespace, resource_type, data))
+
+    results = threaded.run(_realize_resource_data_unit,
+                           units.values(), thread_pool_size,
+                           dry_run=dry_run,
+                           oc_map=oc_map,
+                           ri=ri,
+                           take_over=take_over,
+                           caller=caller,
+                           wait_for_namespace=wait_for_namespace,
+                           no_dry_run_skip_compare=no_dry_run_skip_compare,
+                           enable_deletion=enable_deletion,
+                           recycle_pods=recycle_pods)
+
+    return [action for unit_actions in results for action in unit_actions]
+
+
+VALIDATION_SUPPORTED_KINDS = [
+    'Deployment',
+    'DeploymentConfig',
+    'Subscription',
+    'Job',
+    'ClowdApp'
+]
+
+
+def resource_is_ready(kind, name, resource):
+    """
+    Checks if a deployed resource is ready, logging why it is not.
 
-@retry(exceptions=(ValidationError), max_attempts=100)
-def validate_data(oc_map, actions):
+    :param kind: kind of the resource
+    :param name: name of the resource
+    :param resource: the resource as fetched from the cluster
+    :return: True if the resource is ready
     """
-    Validate the realized desired state.
+    status = resource.get('status')
+    if not status:
+        return False
+    # add elif to validate additional resource kinds
+    if kind in ['Deployment', 'DeploymentConfig']:
+        desired_replicas = resource['spec']['replicas']
+        if desired_replicas == 0:
+            return True
+        replicas = status.get('replicas')
+        if replicas == 0:
+            return True
+        updated_replicas = status.get('updatedReplicas')
+        ready_replicas = status.get('readyReplicas')
+        if not desired_replicas == replicas == \
+                ready_replicas == updated_replicas:
+            logging.info(
+                f'{kind} {name} has replicas that are not ready '
+                f'({ready_replicas} ready / {desired_replicas} total)')
+            return False
+    elif kind == 'Subscription':
+        state = status.get('state')
+        if state != 'AtLatestKnown':
+            logging.info(
+                f'Subscription {name} state is invalid. '
+                f'Current state: {state}')
+            return False
+    elif kind == 'Job':
+        succeeded = status.get('succeeded')
+        if not succeeded:
+            logging.info(f'Job {name} has not succeeded')
+            conditions = status.get('conditions')
+            if conditions:
+                logging.info(f'Job conditions are: {conditions}')
+                logging.info(yaml.safe_dump(conditions))
+            return False
+    elif kind == 'ClowdApp':
+        deployments = status.get('deployments')
+        if not deployments:
+            logging.info(
+                'ClowdApp has no deployments, status is invalid')
+            return False
+        managed_deployments = deployments.get('managedDeployments')
+        ready_deployments = deployments.get('readyDeployments')
+        if managed_deployments != ready_deployments:
+            logging.info(
+                f'ClowdApp has deployments that are not ready '
+                f'({ready_deployments} ready / '
+                f'{managed_deployments} total)')
+            return False
+    return True
+
+
+class ValidationTracker:
+    """ValidationTracker validates the realized desired state.
+
+    The status of each applied resource is tracked, so only the resources
+    which are not ready yet are polled again, with a linear backoff
+    between attempts. Clusters are polled concurrently. With watch, the
+    resources are watched for changes instead of being polled.
+    The time each resource took to become ready is reported.
 
     :param oc_map: a dictionary containing oc client per cluster
     :param actions: a dictionary of performed actions
+    :param thread_pool_size: number of clusters (or watched resources)
+                             to validate concurrently
+    :param max_attempts: number of attempts before failing validation
+    :param watch: watch the resources instead of polling them
     """
 
-    supported_kinds = [
-        'Deployment',
-        'DeploymentConfig',
-        'Subscription',
-        'Job',
-        'ClowdApp'
-    ]
-    for action in actions:
-        if action['action'] == ACTION_APPLIED:
-            kind = action['kind']
-            if kind not in supported_kinds:
+    def __init__(self, oc_map, actions, thread_pool_size=1,
+                 max_attempts=100, watch=False):
+        self.oc_map = oc_map
+        self.thread_pool_size = thread_pool_size
+        self.max_attempts = max_attempts
+        self.watch = watch
+        self.started = time.monotonic()
+        self.pending = [a for a in actions
+                        if a['action'] == ACTION_APPLIED
+                        and a['kind'] in VALIDATION_SUPPORTED_KINDS]
+        self.time_to_ready = {}
+
+    @staticmethod
+    def _key(action):
+        return (action['cluster'], action['namespace'],
+                action['kind'], action['name'])
+
+    def _oc(self, action):
+        oc = self.oc_map.get(action['cluster'])
+        if not oc:
+            logging.log(level=oc.log_level, msg=oc.message)
+        return oc
+
+    def _ready(self, action):
+        kind = action['kind']
+        name = action['name']
+        self.time_to_ready[self._key(action)] = \
+            time.monotonic() - self.started
+        logging.info(['validated', action['cluster'], action['namespace'],
+                      kind, name,
+                      f'{self.time_to_ready[self._key(action)]:.1f}s'])
+        validation_time_to_ready.labels(kind=kind).observe(
+            self.time_to_ready[self._key(action)])
+
+    def _poll(self, actions):
+        """polls the resources of a cluster, returns the ones
+        which are not ready."""
+        not_ready = []
+        for action in actions:
+            oc = self._oc(action)
+            if not oc:
                 continue
-            cluster = action['cluster']
-            namespace = action['namespace']
+            kind = action['kind']
             name = action['name']
-            logging.info(['validating', cluster, namespace, kind, name])
+            logging.info(['validating', action['cluster'],
+                          action['namespace'], kind, name])
+            resource = oc.get(action['namespace'], kind, name=name)
+            if resource_is_ready(kind, name, resource):
+                self._ready(action)
+            else:
+                not_ready.append(action)
+        return not_ready
+
+    def _watch(self, action, timeout):
+        """watches a resource for up to timeout seconds,
+        returns it if it is not ready."""
+        oc = self._oc(action)
+        if not oc:
+            return []
+        kind = action['kind']
+        name = action['name']
+        logging.info(['validating', action['cluster'], action['namespace'],
+                      kind, name])
+        deadline = time.monotonic() + timeout
+        for resource in oc.watch(action['namespace'], kind, name, timeout):
+            if resource_is_ready(kind, name, resource):
+                self._ready(action)
+                return []
+        remaining = deadline - time.monotonic()
+        if remaining > 0:
+            time.sleep(remaining)
+        return [action]
+
+    def run(self):
+        for attempt in range(1, self.max_attempts + 1):
+            if self.watch:
+                results = threaded.run(self._watch, self.pending,
+                                       self.thread_pool_size,
+                                       timeout=attempt)
+            else:
+                by_cluster = {}
+                for action in self.pending:
+                    by_cluster.setdefault(action['cluster'], []) \
+                        .append(action)
+                results = threaded.run(self._poll, by_cluster.values(),
+                                       self.thread_pool_size)
+            self.pending = [a for not_ready in results for a in not_ready]
+            if not self.pending:
+                return self.time_to_ready
+            if not self.watch and attempt < self.max_attempts:
+                time.sleep(attempt)
+
+        raise ValidationError(', '.join(a['name'] for a in self.pending))
+
+
+def validate_data(oc_map, actions, thread_pool_size=1, watch=None):
+    """
+    Validate the realized desired state.
 
-            oc = oc_map.get(cluster)
-            if not oc:
-                logging.log(level=oc.log_level, msg=oc.message)
-                continue
-            resource = oc.get(namespace, kind, name=name)
-            status = resource.get('status')
-            if not status:
-                raise ValidationError('status')
-            # add elif to validate additional resource kinds
-            if kind in ['Deployment', 'DeploymentConfig']:
-                desired_replicas = resource['spec']['replicas']
-                if desired_replicas == 0:
-                    continue
-                replicas = status.get('replicas')
-                if replicas == 0:
-                    continue
-                updated_replicas = status.get('updatedReplicas')
-                ready_replicas = status.get('readyReplicas')
-                if not desired_replicas == replicas == \
-                        ready_replicas == updated_replicas:
-                    logging.info(
-                        f'{kind} {name} has replicas that are not ready '
-                        f'({ready_replicas} ready / {desired_replicas} total)')
-                    raise ValidationError(name)
-            elif kind == 'Subscription':
-                state = status.get('state')
-                if state != 'AtLatestKnown':
-                    logging.info(
-                        f'Subscription {name} state is invalid. '
-                        f'Current state: {state}')
-                    raise ValidationError(name)
-            elif kind == 'Job':
-                succeeded = status.get('succeeded')
-                if not succeeded:
-                    logging.info(f'Job {name} has not succeeded')
-                    conditions = status.get('conditions')
-                    if conditions:
-                        logging.info(f'Job conditions are: {conditions}')
-                        logging.info(yaml.safe_dump(conditions))
-                    raise ValidationError(name)
-            elif kind == 'ClowdApp':
-                deployments = status.get('deployments')
-                if not deployments:
-                    logging.info(
-                        'ClowdApp has no deployments, status is invalid')
-                    raise ValidationError(name)
-                managed_deployments = deployments.get('managedDeployments')
-                ready_deployments = deployments.get('readyDeployments')
-                if managed_deployments != ready_deployments:
-                    logging.info(
-                        f'ClowdApp has deployments that are not ready '
-                        f'({ready_deployments} ready / '
-                        f'{managed_deployments} total)')
-                    raise ValidationError(name)
+    :param oc_map: a dictionary containing oc client per cluster
+    :param actions: a dictionary of performed actions
+    :param thread_pool_size: number of clusters to validate concurrently
+    :param watch: watch resources instead of polling them,
+                  defaults to the VALIDATION_WATCH env variable
+    :return: the seconds each resource took to become ready
+    """
+    if watch is None:
+        watch = \
+            os.environ.get('VALIDATION_WATCH', '').lower() in ['true', 'yes']
+    tracker = ValidationTracker(oc_map, actions,
+                                thread_pool_size=thread_pool_size,
+                                watch=watch)
+    return tracker.run()
 
 
 def follow_logs(oc_map, actions, io_dir):
@@ -54,13 +54,15 @@ def construct_resources(namespaces):
                     speclimit[ltype] = l[ltype]
             body['spec']['limits'].append(speclimit)
 
-        resource = OR(body, QONTRACT_INTEGRATION, QONTRACT_INTEGRATION_VERSION)
-
         # k8s changes an empty array to null/None. we do this here
         # to be consistent
         if len(body['spec']['limits']) == 0:
             body['spec']['limits'] = None
 
+        # the body must not be changed once the resource is constructed,
+        # as its sha256sum is cached
+        resource = OR(body, QONTRACT_INTEGRATION, QONTRACT_INTEGRATION_VERSION)
+
         # Create the resources and append them to the namespace
         namespace["resources"] = [resource]
 
@@ -108,7 +110,8 @@ def run(dry_run, thread_pool_size=10, internal=None,
     defer(lambda: oc_map.cleanup())
 
     add_desired_state(namespaces, ri, oc_map)
-    ob.realize_data(dry_run, oc_map, ri, take_over=take_over)
+    ob.realize_data(dry_run, oc_map, ri, take_over=take_over,
+                    thread_pool_size=thread_pool_size)
 
     if ri.has_error_registered():
         sys.exit(1)
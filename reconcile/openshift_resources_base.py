@@ -1,4 +1,5 @@
 import base64
+import functools
 import json
 import logging
 import sys
@@ -10,6 +11,8 @@ from sretoolbox.utils import retry
 import anymarkup
 import jinja2
 
+from jinja2 import nodes
+
 import reconcile.openshift_base as ob
 import reconcile.queries as queries
 import reconcile.utils.amtool as amtool
@@ -192,6 +195,26 @@ def lookup_vault_secret(path, key, version=None, tvars=None):
         raise FetchVaultSecretError(e)
 
 
+# maximum number of compiled templates kept in memory
+JINJA2_TEMPLATE_CACHE_SIZE = 1024
+
+
+@functools.lru_cache(maxsize=None)
+def _jinja2_environment(env_items):
+    return jinja2.Environment(
+        extensions=[B64EncodeExtension],
+        undefined=jinja2.StrictUndefined,
+        **dict(env_items)
+    )
+
+
+@functools.lru_cache(maxsize=JINJA2_TEMPLATE_CACHE_SIZE)
+def _compile_jinja2_template(body, env_items):
+    # environments and templates are immutable once created,
+    # so they can be shared between threads and renders
+    return _jinja2_environment(env_items).from_string(body)
+
+
 def process_jinja2_template(body, vars=None, env=None):
     if vars is None:
         vars = {}
@@ -200,28 +223,126 @@ def process_jinja2_template(body, vars=None, env=None):
     vars.update({'vault': lambda p, k, v=None:
                  lookup_vault_secret(p, k, v, vars)})
     try:
-        env = jinja2.Environment(
-            extensions=[B64EncodeExtension],
-            undefined=jinja2.StrictUndefined,
-            **env
-        )
-        template = env.from_string(body)
+        template = _compile_jinja2_template(body,
+                                            tuple(sorted(env.items())))
         r = template.render(vars)
     except Exception as e:
         raise Jinja2TemplateError(e)
     return r
 
 
+EXTRACURLYJINJA2_ENV = {
+    'block_start_string': '{{%',
+    'block_end_string': '%}}',
+    'variable_start_string': '{{{',
+    'variable_end_string': '}}}',
+    'comment_start_string': '{{#',
+    'comment_end_string': '#}}'
+}
+
+
 def process_extracurlyjinja2_template(body, vars={}):
-    env = {
-        'block_start_string': '{{%',
-        'block_end_string': '%}}',
-        'variable_start_string': '{{{',
-        'variable_end_string': '}}}',
-        'comment_start_string': '{{#',
-        'comment_end_string': '#}}'
-    }
-    return process_jinja2_template(body, vars=vars, env=env)
+    return process_jinja2_template(body, vars=vars, env=EXTRACURLYJINJA2_ENV)
+
+
+# fields of a resource template which are the same in every namespace
+NAMESPACE_INDEPENDENT_RESOURCE_FIELDS = [
+    'provider',
+    'path',
+    'type',
+    'variables',
+    'validate_json',
+    'add_path_to_prom_rules',
+    'validate_alertmanager_config',
+    'alertmanager_config_key',
+]
+
+
+def _reads_resource_namespace(node, markers):
+    if isinstance(node, (nodes.Getattr, nodes.Getitem)) and \
+            isinstance(node.node, nodes.Name) and \
+            node.node.name == 'resource':
+        if isinstance(node, nodes.Getattr):
+            attr = node.attr
+        elif isinstance(node.arg, nodes.Const):
+            attr = node.arg.value
+        else:
+            attr = None
+        # any other use of resource (e.g. resource.get('namespace'),
+        # resource.items()) may read the namespace
+        return attr not in NAMESPACE_INDEPENDENT_RESOURCE_FIELDS
+    if isinstance(node, nodes.Name) and node.name == 'resource':
+        # resource is used as a whole
+        return True
+    if isinstance(node, nodes.Const) and isinstance(node.value, str) and \
+            any(m in node.value for m in markers):
+        # vault() arguments are rendered with the template variables
+        return True
+    return any(_reads_resource_namespace(child, markers)
+               for child in node.iter_child_nodes())
+
+
+@functools.lru_cache(maxsize=JINJA2_TEMPLATE_CACHE_SIZE)
+def template_reads_namespace(body, env_items=()):
+    """ returns False if the template only reads fields of `resource`
+    which are known to be the same in every namespace, so it renders
+    the same in every namespace. """
+    env = _jinja2_environment(env_items)
+    try:
+        ast = env.parse(body)
+    except Exception:
+        return True
+    markers = (env.variable_start_string, env.block_start_string)
+    return _reads_resource_namespace(ast, markers)
+
+
+class RenderCache:
+    """ a run-scoped cache of desired resources, to render resources
+    which are shared by many namespaces only once.
+
+    cached resources are shared between namespaces and must not
+    be modified (OpenshiftResource.annotate returns a copy). """
+    def __init__(self):
+        self._resources = {}
+        self._locks = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def key(resource):
+        """ returns the key of a resource, or None if the rendered
+        resource depends on the namespace it is rendered for. """
+        provider = resource['provider']
+        if provider == 'resource-template':
+            tt = resource['type'] or 'jinja2'
+            env = EXTRACURLYJINJA2_ENV if tt == 'extracurlyjinja2' else {}
+            try:
+                content = gql.get_api().get_resource(resource['path'])
+            except gql.GqlGetResourceError:
+                return None
+            if template_reads_namespace(content['content'],
+                                        tuple(sorted(env.items()))):
+                return None
+            # variables may contain jinja as well, e.g. to build the
+            # path of a vault() call, which may read the namespace
+            variables = resource.get('variables') or ''
+            if any(m in variables for m in ['{{', '{%']):
+                return None
+        elif provider not in ['resource', 'vault-secret', 'route']:
+            return None
+        # the namespace is set on resource templates when rendering
+        return json.dumps({k: v for k, v in resource.items()
+                           if k != 'namespace'}, sort_keys=True)
+
+    def get(self, key, render):
+        with self._lock:
+            lock = self._locks.setdefault(key, Lock())
+        # resources are rendered once, even if requested concurrently
+        with lock:
+            openshift_resource = self._resources.get(key)
+            if openshift_resource is None:
+                openshift_resource = render()
+                self._resources[key] = openshift_resource
+        return openshift_resource
 
 
 def check_alertmanager_config(data, path, alertmanager_config_key,
@@ -373,9 +494,12 @@ def fetch_provider_route(path, tls_path, tls_version):
     if tls_path is None or tls_version is None:
         return openshift_resource
 
-    # override existing tls fields from vault secret
-    openshift_resource.body['spec'].setdefault('tls', {})
-    tls = openshift_resource.body['spec']['tls']
+    # override existing tls fields from vault secret.
+    # the body is copied and reassigned, as the canonical body and
+    # sha256sum of the resource are cached until the body is replaced
+    body = dict(openshift_resource.body)
+    spec = body['spec'] = dict(body['spec'])
+    tls = spec['tls'] = dict(spec.get('tls') or {})
     # get tls fields from vault
     vault_client = VaultClient()
     raw_data = vault_client.read_all({'path': tls_path,
@@ -395,8 +519,10 @@ def fetch_provider_route(path, tls_path, tls_version):
         logging.info(msg)
         _log_lock.release()
 
-    host = openshift_resource.body['spec'].get('host')
-    certificate = openshift_resource.body['spec']['tls'].get('certificate')
+    openshift_resource.body = body
+
+    host = spec.get('host')
+    certificate = tls.get('certificate')
     if host and certificate:
         match = openssl.certificate_matches_host(certificate, host)
         if not match:
@@ -406,7 +532,16 @@ def fetch_provider_route(path, tls_path, tls_version):
     return openshift_resource
 
 
-def fetch_openshift_resource(resource, parent):
+def fetch_openshift_resource(resource, parent, render_cache=None):
+    if render_cache is not None:
+        key = render_cache.key(resource)
+        if key is not None:
+            return render_cache.get(
+                key, lambda: _fetch_openshift_resource(resource, parent))
+    return _fetch_openshift_resource(resource, parent)
+
+
+def _fetch_openshift_resource(resource, parent):
     global _log_lock
 
     provider = resource['provider']
@@ -508,12 +643,7 @@ def fetch_current_state(oc, ri, cluster, namespace, resource_type,
     _log_lock.release()
     if oc is None:
         return
-    # some resource types may be used explicitly (<kind>.<api_group>).
-    # we only take the first token as oc.api_resources contains only the kind.
-    # this is the case created by using `managedResourceTypeOverrides`.
-    if oc.api_resources and \
-            resource_type_to_use.split('.')[0].lower() \
-            not in [a.lower() for a in oc.api_resources]:
+    if not ob.has_api_resource(oc, resource_type_to_use):
         msg = \
             f"[{cluster}] cluster has no API resource {resource_type_to_use}."
         logging.warning(msg)
@@ -532,14 +662,16 @@ def fetch_current_state(oc, ri, cluster, namespace, resource_type,
         )
 
 
-def fetch_desired_state(oc, ri, cluster, namespace, resource, parent):
+def fetch_desired_state(oc, ri, cluster, namespace, resource, parent,
+                        render_cache=None):
     global _log_lock
 
     if oc is None:
         return
 
     try:
-        openshift_resource = fetch_openshift_resource(resource, parent)
+        openshift_resource = fetch_openshift_resource(resource, parent,
+                                                      render_cache)
     except (FetchResourceError,
             FetchVaultSecretError,
             FetchRouteError,
@@ -587,8 +719,12 @@ def fetch_desired_state(oc, ri, cluster, namespace, resource, parent):
         return
 
 
-def fetch_states(spec, ri):
+def fetch_states(spec, ri, render_cache=None):
     try:
+        if spec.type in ("current-namespace", "current-cluster"):
+            ob.populate_current_state(spec, ri,
+                                      QONTRACT_INTEGRATION,
+                                      QONTRACT_INTEGRATION_VERSION)
         if spec.type == "current":
             fetch_current_state(spec.oc, ri, spec.cluster,
                                 spec.namespace, spec.resource,
@@ -597,7 +733,7 @@ def fetch_states(spec, ri):
         if spec.type == "desired":
             fetch_desired_state(spec.oc, ri, spec.cluster,
                                 spec.namespace, spec.resource,
-                                spec.parent)
+                                spec.parent, render_cache)
 
     except StatusCodeError as e:
         ri.register_error(cluster=spec.cluster)
@@ -613,8 +749,8 @@ def fetch_states(spec, ri):
 
 
 def fetch_data(namespaces, thread_pool_size, internal, use_jump_host,
-               init_api_resources=False):
-    ri = ResourceInventory()
+               init_api_resources=False, reconcile_state=None):
+    ri = ResourceInventory(compact_current=True)
     settings = queries.get_app_interface_settings()
     oc_map = OC_Map(namespaces=namespaces, integration=QONTRACT_INTEGRATION,
                     settings=settings, internal=internal,
@@ -622,9 +758,42 @@ def fetch_data(namespaces, thread_pool_size, internal, use_jump_host,
                     thread_pool_size=thread_pool_size,
                     init_api_resources=init_api_resources)
     state_specs = ob.init_specs_to_fetch(ri, oc_map, namespaces=namespaces)
-    threaded.run(fetch_states, state_specs, thread_pool_size, ri=ri)
-
-    return oc_map, ri
+    # prefetch all resource files in as few requests as possible
+    gql.get_api().get_resources(
+        resource['path'] for namespace_info in namespaces
+        for resource in namespace_info.get('openshiftResources') or []
+        if resource['provider'] in ['resource', 'resource-template'])
+    # prefetch all vault secrets concurrently
+    secrets = []
+    for namespace_info in namespaces:
+        for resource in namespace_info.get('openshiftResources') or []:
+            if resource['provider'] == 'vault-secret':
+                secrets.append({'path': resource['path'],
+                                'version': resource['version']})
+            elif resource['provider'] == 'route' and \
+                    resource.get('vault_tls_secret_path') and \
+                    resource.get('vault_tls_secret_version') is not None:
+                secrets.append(
+                    {'path': resource['vault_tls_secret_path'],
+                     'version': resource['vault_tls_secret_version']})
+    if secrets:
+        VaultClient().read_all_many(secrets, thread_pool_size)
+    render_cache = RenderCache()
+    unit_digests = {}
+    if reconcile_state:
+        # the desired state is needed to find the unchanged units
+        desired_specs = [s for s in state_specs if s.type == 'desired']
+        threaded.run(fetch_states, desired_specs, thread_pool_size, ri=ri,
+                     render_cache=render_cache)
+        state_specs, unit_digests = ob.skip_unchanged_specs(
+            state_specs, ri, reconcile_state, thread_pool_size,
+            integration=QONTRACT_INTEGRATION)
+    state_specs = ob.batch_specs_by_cluster(state_specs, thread_pool_size)
+    state_specs = ob.batch_specs_by_namespace(state_specs)
+    threaded.run(fetch_states, state_specs, thread_pool_size, ri=ri,
+                 render_cache=render_cache)
+
+    return oc_map, ri, unit_digests
 
 
 def filter_namespaces_by_cluster_and_namespace(namespaces,
@@ -678,14 +847,23 @@ def run(dry_run, thread_pool_size=10, internal=None,
             namespace_name
         )
     namespaces = canonicalize_namespaces(namespaces, providers)
-    oc_map, ri = \
+    # incremental reconciliation is only used to apply changes
+    reconcile_state = None if dry_run else \
+        ob.get_reconcile_state('-'.join([QONTRACT_INTEGRATION] + providers))
+    oc_map, ri, unit_digests = \
         fetch_data(namespaces, thread_pool_size, internal, use_jump_host,
-                   init_api_resources=init_api_resources)
+                   init_api_resources=init_api_resources,
+                   reconcile_state=reconcile_state)
     defer(lambda: oc_map.cleanup())
 
-    ob.realize_data(dry_run, oc_map, ri)
+    actions = ob.realize_data(dry_run, oc_map, ri,
+                              thread_pool_size=thread_pool_size)
 
     if ri.has_error_registered():
         sys.exit(1)
 
+    if reconcile_state:
+        ob.record_reconciled_units(ri, actions, unit_digests,
+                                   reconcile_state)
+
     return ri
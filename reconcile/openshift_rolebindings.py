@@ -178,10 +178,11 @@ def run(dry_run, thread_pool_size=10, internal=None,
         integration_version=QONTRACT_INTEGRATION_VERSION,
         override_managed_types=['RoleBinding'],
         internal=internal,
-        use_jump_host=use_jump_host)
+        use_jump_host=use_jump_host,
+        cluster_wide_fetch=True)
     defer(lambda: oc_map.cleanup())
     fetch_desired_state(ri, oc_map)
-    ob.realize_data(dry_run, oc_map, ri)
+    ob.realize_data(dry_run, oc_map, ri, thread_pool_size=thread_pool_size)
 
     if ri.has_error_registered():
         sys.exit(1)
@@ -60,7 +60,8 @@ def run(dry_run, thread_pool_size=10, io_dir='throughput/',
         thread_pool_size=thread_pool_size,
         integration=QONTRACT_INTEGRATION,
         integration_version=QONTRACT_INTEGRATION_VERSION,
-        init_api_resources=True)
+        init_api_resources=True,
+        batch_by_namespace=True)
     defer(lambda: oc_map.cleanup())
     saasherder.populate_desired_state(ri)
 
@@ -77,7 +78,8 @@ def run(dry_run, thread_pool_size=10, io_dir='throughput/',
         caller=saas_file_name,
         wait_for_namespace=True,
         no_dry_run_skip_compare=(not saasherder.compare),
-        take_over=saasherder.take_over
+        take_over=saasherder.take_over,
+        thread_pool_size=thread_pool_size
     )
 
     if not dry_run:
@@ -88,7 +90,8 @@ def run(dry_run, thread_pool_size=10, io_dir='throughput/',
                 logging.error(str(e))
                 ri.register_error()
         try:
-            ob.validate_data(oc_map, actions)
+            ob.validate_data(oc_map, actions,
+                             thread_pool_size=thread_pool_size)
         except Exception as e:
             logging.error(str(e))
             ri.register_error()
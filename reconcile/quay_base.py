@@ -4,6 +4,7 @@ from reconcile.utils.secret_reader import SecretReader
 import reconcile.queries as queries
 
 from reconcile.utils.quay_api import QuayApi
+from reconcile.utils.rate_limiter import TokenBucket
 
 OrgKey = namedtuple('OrgKey', ['instance', 'org_name'])
 
@@ -18,11 +19,14 @@ def get_quay_api_store():
     settings = queries.get_app_interface_settings()
     secret_reader = SecretReader(settings=settings)
     store = {}
+    # the api quota is shared by all the orgs of an instance
+    rate_limiters = {}
     for org_data in quay_orgs:
         instance_name = org_data['instance']['name']
         org_name = org_data['name']
         org_key = OrgKey(instance_name, org_name)
         base_url = org_data['instance']['url']
+        rate_limiter = rate_limiters.setdefault(base_url, TokenBucket())
         token = secret_reader.read(org_data['automationToken'])
 
         if org_data.get('mirror'):
@@ -38,7 +42,8 @@ def get_quay_api_store():
 
         store[org_key] = {
             'url': base_url,
-            'api': QuayApi(token, org_name, base_url=base_url),
+            'api': QuayApi(token, org_name, base_url=base_url,
+                           rate_limiter=rate_limiter),
             'push_token': push_token,
             'teams': org_data.get('managedTeams'),
             'managedRepos': org_data.get('managedRepos'),
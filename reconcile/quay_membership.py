@@ -151,7 +151,7 @@ class RunnerAction:
         return action
 
 
-def run(dry_run):
+def run(dry_run, thread_pool_size=10):
     quay_api_store = get_quay_api_store()
 
     current_state = fetch_current_state(quay_api_store)
@@ -180,7 +180,7 @@ def run(dry_run):
 
     # Run actions
     runner_action = RunnerAction(dry_run, quay_api_store)
-    runner = AggregatedDiffRunner(diff)
+    runner = AggregatedDiffRunner(diff, thread_pool_size=thread_pool_size)
 
     runner.register("update-insert", runner_action.add_to_team())
     runner.register("update-delete", runner_action.del_from_team())
@@ -1,3 +1,4 @@
+import functools
 import logging
 import os
 import re
@@ -8,13 +9,13 @@ import time
 from collections import defaultdict, namedtuple
 
 from sretoolbox.container import Image
-from sretoolbox.container.image import ImageComparisonError
 from sretoolbox.container import Skopeo
-from sretoolbox.container.skopeo import SkopeoCmdError
 
 from reconcile import queries
 from reconcile.status import ExitCodes
 from reconcile.utils import gql
+from reconcile.utils.mirror import MirrorEngine
+from reconcile.utils.registry_cache import RegistryCache
 from reconcile.utils.secret_reader import SecretReader
 
 
@@ -43,25 +44,27 @@ class QuayMirror:
     }
     """
 
-    def __init__(self, dry_run=False):
+    def __init__(self, dry_run=False, thread_pool_size=10):
         self.dry_run = dry_run
         self.gqlapi = gql.get_api()
         settings = queries.get_app_interface_settings()
         self.secret_reader = SecretReader(settings=settings)
         self.skopeo_cli = Skopeo(dry_run)
+        self.registry_cache = RegistryCache()
+        self.engine = MirrorEngine(QONTRACT_INTEGRATION, self.skopeo_cli,
+                                   registry_cache=self.registry_cache,
+                                   dry_run=dry_run,
+                                   thread_pool_size=thread_pool_size)
         self.push_creds = self._get_push_creds()
 
     def run(self):
         sync_tasks = self.process_sync_tasks()
+        tasks = []
         for org, data in sync_tasks.items():
             for item in data:
-                try:
-                    self.skopeo_cli.copy(src_image=item['mirror_url'],
-                                         src_creds=item['mirror_creds'],
-                                         dst_image=item['image_url'],
-                                         dest_creds=self.push_creds[org])
-                except SkopeoCmdError as details:
-                    _LOG.error('[%s]', details)
+                item['dest_creds'] = self.push_creds[org]
+                tasks.append(item)
+        self.engine.run(tasks)
 
     @staticmethod
     def process_repos_query():
@@ -124,7 +127,7 @@ class QuayMirror:
         is_deep_sync = self._is_deep_sync(interval=eight_hours)
 
         summary = self.process_repos_query()
-        sync_tasks = defaultdict(list)
+        repos = []
         for org_key, data in summary.items():
             org = org_key.org_name
             for item in data:
@@ -150,48 +153,18 @@ class QuayMirror:
                 tags = item['mirror'].get('tags')
                 tags_exclude = item['mirror'].get('tagsExclude')
 
-                for tag in image_mirror:
-                    if not self.sync_tag(tags=tags, tags_exclude=tags_exclude,
-                                         candidate=tag):
-                        continue
-
-                    upstream = image_mirror[tag]
-                    downstream = image[tag]
-                    if tag not in image:
-                        _LOG.debug('Image %s and mirror %s are out off sync',
-                                   downstream, upstream)
-                        task = {'mirror_url': str(upstream),
-                                'mirror_creds': mirror_creds,
-                                'image_url': str(downstream)}
-                        sync_tasks[org_key].append(task)
-                        continue
-
-                    # Deep (slow) check only in non dry-run mode
-                    if self.dry_run:
-                        _LOG.debug('Image %s and mirror %s are in sync',
-                                   downstream, upstream)
-                        continue
+                repos.append({
+                    'image': image,
+                    'mirror': image_mirror,
+                    'mirror_creds': mirror_creds,
+                    'org_key': org_key,
+                    'tag_filter': functools.partial(
+                        self.sync_tag, tags, tags_exclude),
+                })
 
-                    # Deep (slow) check only from time to time
-                    if not is_deep_sync:
-                        _LOG.debug('Image %s and mirror %s are in sync',
-                                   downstream, upstream)
-                        continue
-
-                    try:
-                        if downstream == upstream:
-                            _LOG.debug('Image %s and mirror %s are in sync',
-                                       downstream, upstream)
-                            continue
-                    except ImageComparisonError as details:
-                        _LOG.error('[%s]', details)
-                        continue
-
-                    _LOG.debug('Image %s and mirror %s are out of sync',
-                               downstream, upstream)
-                    sync_tasks[org_key].append({'mirror_url': str(upstream),
-                                                'mirror_creds': mirror_creds,
-                                                'image_url': str(downstream)})
+        sync_tasks = defaultdict(list)
+        for task in self.engine.sync_tasks(repos, deep_sync=is_deep_sync):
+            sync_tasks[task['org_key']].append(task)
 
         return sync_tasks
 
@@ -236,6 +209,6 @@ class QuayMirror:
         return creds
 
 
-def run(dry_run):
-    quay_mirror = QuayMirror(dry_run)
+def run(dry_run, thread_pool_size=10):
+    quay_mirror = QuayMirror(dry_run, thread_pool_size)
     quay_mirror.run()
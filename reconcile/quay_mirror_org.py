@@ -6,11 +6,13 @@ import time
 from collections import defaultdict
 
 from sretoolbox.container import Image
-from sretoolbox.container.image import ImageComparisonError
 from sretoolbox.container import Skopeo
-from sretoolbox.container.skopeo import SkopeoCmdError
+
+import reconcile.utils.threaded as threaded
 
 from reconcile.quay_base import get_quay_api_store
+from reconcile.utils.mirror import MirrorEngine
+from reconcile.utils.registry_cache import RegistryCache
 
 
 _LOG = logging.getLogger(__name__)
@@ -19,22 +21,25 @@ QONTRACT_INTEGRATION = 'quay-mirror-org'
 
 
 class QuayMirrorOrg:
-    def __init__(self, dry_run=False):
+    def __init__(self, dry_run=False, thread_pool_size=10):
         self.dry_run = dry_run
+        self.thread_pool_size = thread_pool_size
         self.skopeo_cli = Skopeo(dry_run)
+        self.registry_cache = RegistryCache()
+        self.engine = MirrorEngine(QONTRACT_INTEGRATION, self.skopeo_cli,
+                                   registry_cache=self.registry_cache,
+                                   dry_run=dry_run,
+                                   thread_pool_size=thread_pool_size)
         self.quay_api_store = get_quay_api_store()
 
     def run(self):
         sync_tasks = self.process_sync_tasks()
+        tasks = []
         for org, data in sync_tasks.items():
             for item in data:
-                try:
-                    self.skopeo_cli.copy(src_image=item['mirror_url'],
-                                         src_creds=item['mirror_creds'],
-                                         dst_image=item['image_url'],
-                                         dest_creds=self.get_push_creds(org))
-                except SkopeoCmdError as details:
-                    _LOG.error('[%s]', details)
+                item['dest_creds'] = self.get_push_creds(org)
+                tasks.append(item)
+        self.engine.run(tasks)
 
     def process_org_mirrors(self, summary):
         """adds new keys to the summary dict with information about mirrored
@@ -49,35 +54,43 @@ class QuayMirrorOrg:
         :rtype: dict
         """
 
-        for org_key, org_info in self.quay_api_store.items():
-            if not org_info.get('mirror'):
-                continue
+        org_keys = [org_key for org_key, org_info
+                    in self.quay_api_store.items()
+                    if org_info.get('mirror')]
+        results = threaded.run(self._org_mirror_repos, org_keys,
+                               self.thread_pool_size)
+        for org_key, data in zip(org_keys, results):
+            summary[org_key].extend(data)
+
+        return summary
+
+    def _org_mirror_repos(self, org_key):
+        org_info = self.quay_api_store[org_key]
+        quay_api = org_info['api']
+        upstream_org_key = org_info['mirror']
+        upstream_org = self.quay_api_store[upstream_org_key]
+        upstream_quay_api = upstream_org['api']
+
+        username = upstream_org['push_token']['user']
+        token = upstream_org['push_token']['token']
 
-            quay_api = org_info['api']
-            upstream_org_key = org_info['mirror']
-            upstream_org = self.quay_api_store[upstream_org_key]
-            upstream_quay_api = upstream_org['api']
-
-            username = upstream_org['push_token']['user']
-            token = upstream_org['push_token']['token']
-
-            repos = [item['name'] for item in quay_api.list_images()]
-            for repo in upstream_quay_api.list_images():
-                if repo['name'] not in repos:
-                    continue
-                server_url = upstream_org['url']
-                url = f"{server_url}/{org_key.org_name}/{repo['name']}"
-                data = {
-                    'name': repo['name'],
-                    'mirror': {
-                        'url': url,
-                        'username': username,
-                        'token': token,
-                    }
+        repos = [item['name'] for item in quay_api.list_images()]
+        data = []
+        for repo in upstream_quay_api.list_images():
+            if repo['name'] not in repos:
+                continue
+            server_url = upstream_org['url']
+            url = f"{server_url}/{org_key.org_name}/{repo['name']}"
+            data.append({
+                'name': repo['name'],
+                'mirror': {
+                    'url': url,
+                    'username': username,
+                    'token': token,
                 }
-                summary[org_key].append(data)
+            })
 
-        return summary
+        return data
 
     def process_sync_tasks(self):
         eight_hours = 28800  # 60 * 60 * 8
@@ -86,7 +99,7 @@ class QuayMirrorOrg:
         summary = defaultdict(list)
         self.process_org_mirrors(summary)
 
-        sync_tasks = defaultdict(list)
+        repos = []
         for org_key, data in summary.items():
             org = self.quay_api_store[org_key]
             org_name = org_key.org_name
@@ -114,44 +127,14 @@ class QuayMirrorOrg:
                 image_mirror = Image(mirror_url, username=mirror_username,
                                      password=mirror_password)
 
-                for tag in image_mirror:
-                    upstream = image_mirror[tag]
-                    downstream = image[tag]
-                    if tag not in image:
-                        _LOG.debug('Image %s and mirror %s are out of sync',
-                                   downstream, upstream)
-                        task = {'mirror_url': str(upstream),
-                                'mirror_creds': mirror_creds,
-                                'image_url': str(downstream)}
-                        sync_tasks[org_key].append(task)
-                        continue
-
-                    # Deep (slow) check only in non dry-run mode
-                    if self.dry_run:
-                        _LOG.debug('Image %s and mirror %s are in sync',
-                                   downstream, upstream)
-                        continue
-
-                    # Deep (slow) check only from time to time
-                    if not is_deep_sync:
-                        _LOG.debug('Image %s and mirror %s are in sync',
-                                   downstream, upstream)
-                        continue
-
-                    try:
-                        if downstream == upstream:
-                            _LOG.debug('Image %s and mirror %s are in sync',
-                                       downstream, upstream)
-                            continue
-                    except ImageComparisonError as details:
-                        _LOG.error('[%s]', details)
-                        continue
-
-                    _LOG.debug('Image %s and mirror %s are out of sync',
-                               downstream, upstream)
-                    sync_tasks[org_key].append({'mirror_url': str(upstream),
-                                                'mirror_creds': mirror_creds,
-                                                'image_url': str(downstream)})
+                repos.append({'image': image,
+                              'mirror': image_mirror,
+                              'mirror_creds': mirror_creds,
+                              'org_key': org_key})
+
+        sync_tasks = defaultdict(list)
+        for task in self.engine.sync_tasks(repos, deep_sync=is_deep_sync):
+            sync_tasks[task['org_key']].append(task)
 
         return sync_tasks
 
@@ -193,6 +176,6 @@ class QuayMirrorOrg:
         return f"{username}:{password}"
 
 
-def run(dry_run):
-    quay_mirror = QuayMirrorOrg(dry_run)
+def run(dry_run, thread_pool_size=10):
+    quay_mirror = QuayMirrorOrg(dry_run, thread_pool_size)
     quay_mirror.run()
@@ -6,7 +6,7 @@ from sretoolbox.utils import retry
 from reconcile.utils import gql
 from reconcile.utils.github_api import GithubApi
 from reconcile.utils.gitlab_api import GitLabApi
-from reconcile.utils.pagerduty_api import PagerDutyApi
+from reconcile.utils.pagerduty_api import PagerDutyMap
 from reconcile.utils.repo_owners import RepoOwners
 from reconcile.utils.slack_api import SlackApi
 from reconcile import queries
@@ -139,24 +139,12 @@ def get_pagerduty_name(user):
     return user['pagerduty_username'] or user['org_username']
 
 
-def get_slack_usernames_from_pagerduty(pagerduties, users, usergroup):
-    settings = queries.get_app_interface_settings()
+def get_slack_usernames_from_pagerduty(pagerduties, users, usergroup,
+                                       pagerduty_map):
     all_slack_usernames = []
     all_pagerduty_names = [get_pagerduty_name(u) for u in users]
     for pagerduty in pagerduties or []:
-        pd_token = pagerduty['token']
-        pd_schedule_id = pagerduty['scheduleID']
-        if pd_schedule_id is not None:
-            pd_resource_type = 'schedule'
-            pd_resource_id = pd_schedule_id
-        pd_escalation_policy_id = pagerduty['escalationPolicyID']
-        if pd_escalation_policy_id is not None:
-            pd_resource_type = 'escalationPolicy'
-            pd_resource_id = pd_escalation_policy_id
-
-        pd = PagerDutyApi(pd_token, settings=settings)
-        pagerduty_names = pd.get_pagerduty_users(pd_resource_type,
-                                                 pd_resource_id)
+        pagerduty_names = pagerduty_map.get_pagerduty_users(pagerduty)
         if not pagerduty_names:
             continue
         pagerduty_names = [name.split('+', 1)[0] for name in pagerduty_names]
@@ -233,11 +221,17 @@ def get_slack_usernames_from_owners(owners_from_repo, users, usergroup):
     return all_slack_usernames
 
 
-def get_desired_state(slack_map):
+def get_desired_state(slack_map, pagerduty_map):
     gqlapi = gql.get_api()
     roles = gqlapi.query(ROLES_QUERY)['roles']
     all_users = queries.get_users()
 
+    # the same schedules and escalation policies are referenced
+    # by many permissions, fetch each of them once in advance
+    pagerduty_map.prefetch([pd for r in roles for p in r['permissions']
+                            if p['service'] == 'slack-usergroup'
+                            for pd in p.get('pagerduty') or []])
+
     desired_state = []
     for r in roles:
         for p in r['permissions']:
@@ -267,7 +261,8 @@ def get_desired_state(slack_map):
 
             slack_usernames_pagerduty = \
                 get_slack_usernames_from_pagerduty(p['pagerduty'],
-                                                   all_users, usergroup)
+                                                   all_users, usergroup,
+                                                   pagerduty_map)
             user_names.extend(slack_usernames_pagerduty)
 
             slack_usernames_repo = get_slack_usernames_from_owners(
@@ -351,10 +346,13 @@ def act(desired_state, slack_map):
         slack.update_usergroup(ugid, channels, description)
 
 
-def run(dry_run):
+def run(dry_run, thread_pool_size=10):
     slack_map = get_slack_map()
+    settings = queries.get_app_interface_settings()
+    pagerduty_map = PagerDutyMap(settings=settings,
+                                 thread_pool_size=thread_pool_size)
     current_state = get_current_state(slack_map)
-    desired_state = get_desired_state(slack_map)
+    desired_state = get_desired_state(slack_map, pagerduty_map)
 
     print_diff(current_state, desired_state)
 
@@ -1,3 +1,6 @@
+import time
+
+import mock
 import pytest
 
 from reconcile.utils.aggregated_list import AggregatedList
@@ -153,6 +156,72 @@ class TestAggregatedList:
             {'items': ['qwerty2'], 'params': {'a': 1}}
         ]
 
+    @staticmethod
+    def test_diff_unhashable_items():
+        left = AggregatedList()
+        right = AggregatedList()
+
+        left.add({'a': 1}, [{'x': 1}, {'x': 2}, {'x': 2}])
+        right.add({'a': 1}, [{'x': 2}, {'x': 3}])
+
+        diff = left.diff(right)
+
+        assert left.dump()[0]['items'] == [{'x': 1}, {'x': 2}]
+        assert diff['update-insert'] == [
+            {'items': [{'x': 3}], 'params': {'a': 1}}
+        ]
+        assert diff['update-delete'] == [
+            {'items': [{'x': 1}], 'params': {'a': 1}}
+        ]
+
+    @staticmethod
+    def test_params_hashed_once_per_object():
+        alist = AggregatedList()
+        params = {'service': 'github-org', 'org': 'org'}
+        with mock.patch.object(AggregatedList, 'hash_params',
+                               wraps=AggregatedList.hash_params) as hash_:
+            for n in range(10):
+                alist.add(params, [f'user-{n}'])
+            alist.get(params)
+            assert hash_.call_count == 1
+
+            params_hash = AggregatedList.hash_params(params)
+            alist.add(dict(params), ['user-10'], params_hash=params_hash)
+            alist.get(dict(params), params_hash=params_hash)
+            assert hash_.call_count == 2
+        assert len(alist.get(params)['items']) == 11
+
+    @staticmethod
+    def test_diff_scales_linearly():
+        # with list membership checks, each item is compared with all the
+        # other ones, so the comparisons grow quadratically with the size
+        comparisons = []
+
+        class Item:
+            def __init__(self, n):
+                self.n = n
+
+            def __hash__(self):
+                return hash(self.n)
+
+            def __eq__(self, other):
+                comparisons.append(self.n)
+                return self.n == other.n
+
+        def build(size, offset):
+            alist = AggregatedList()
+            alist.add({'team': 'members'},
+                      [Item(i) for i in range(offset, size + offset)])
+            return alist
+
+        size = 1000
+        diff = build(size, 0).diff(build(size, size // 2))
+
+        assert len(diff['update-insert'][0]['items']) == size // 2
+        assert len(diff['update-delete'][0]['items']) == size // 2
+        # only the items present on both sides are compared, once each way
+        assert len(comparisons) == size
+
 
 class TestAggregatedDiffRunner:
     @staticmethod
@@ -245,3 +314,50 @@ class TestAggregatedDiffRunner:
 
         with pytest.raises(Exception):
             runner.register("qwerty", lambda p, i: True, lambda p: True)
+
+    @staticmethod
+    def test_run_concurrent_keeps_order_per_params():
+        left = AggregatedList()
+        right = AggregatedList()
+        for team in ['a', 'b', 'c']:
+            right.add({'team': team}, ['user'])
+
+        calls = []
+
+        def recorder(label):
+            return lambda p, i: calls.append((p['team'], label))
+
+        runner = AggregatedDiffRunner(left.diff(right), thread_pool_size=3)
+        runner.register("insert", recorder('create'))
+        runner.register("insert", recorder('add'))
+        runner.run()
+
+        assert len(calls) == 6
+        for team in ['a', 'b', 'c']:
+            assert [label for t, label in calls if t == team] == \
+                ['create', 'add']
+
+    @staticmethod
+    def test_run_concurrent_keeps_order_between_actions():
+        left = AggregatedList()
+        right = AggregatedList()
+        right.add({'org': 'org'}, ['user'])
+        for team in ['a', 'b', 'c']:
+            right.add({'org': 'org', 'team': team}, ['user'])
+
+        calls = []
+
+        def recorder(label, delay=0):
+            def record(params, items):
+                time.sleep(delay)
+                calls.append(label)
+            return record
+
+        runner = AggregatedDiffRunner(left.diff(right), thread_pool_size=4)
+        runner.register("insert", recorder('add_to_org', delay=0.1),
+                        lambda p: 'team' not in p)
+        runner.register("insert", recorder('add_to_team'),
+                        lambda p: 'team' in p)
+        runner.run()
+
+        assert calls == ['add_to_org'] + ['add_to_team'] * 3
@@ -1,3 +1,9 @@
+import time
+
+import mock
+import pytest
+
+from github.GithubException import GithubException
 from mock import patch
 
 import reconcile.utils.config as config
@@ -5,6 +11,7 @@ import reconcile.utils.gql as gql
 import reconcile.github_org as github_org
 
 from reconcile.utils.aggregated_list import AggregatedList
+from reconcile.utils.raw_github_api import RawGithubApi
 
 from .fixtures import Fixtures
 
@@ -13,55 +20,26 @@ fxt = Fixtures('github_org')
 
 
 class RawGithubApiMock:
-    @staticmethod
-    def org_invitations(org_name):
-        return []
-
-    @staticmethod
-    def team_invitations(team_id):
-        return []
-
-
-class AttrDict(dict):
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.__dict__ = self
-
-
-class GithubMock:
     def __init__(self, spec):
         self.spec = spec
 
-    class GithubOrgMock:
-        def __init__(self, spec_org):
-            self.spec_org = spec_org
-
-        class GithubTeamMock:
-            def __init__(self, spec_team):
-                self.spec_team = spec_team
+    def org_members(self, org_name):
+        return [e['login'] for e in self.spec[org_name]['members']]
 
-            def get_members(self):
-                return map(lambda e: AttrDict(e), self.spec_team["members"])
+    def org_teams(self, org_name):
+        return [
+            {
+                'id': team['name'],
+                'name': team['name'],
+                'members': [e['login'] for e in team['members']],
+                'invitations': [],
+            }
+            for team in self.spec[org_name]['teams']
+        ]
 
-            @property
-            def id(self):
-                return self.spec_team["name"]
-
-            @property
-            def name(self):
-                return self.spec_team["name"]
-
-        def get_members(self):
-            return map(lambda e: AttrDict(e), self.spec_org["members"])
-
-        def get_teams(self):
-            return map(
-                lambda e: self.GithubTeamMock(e),
-                self.spec_org["teams"]
-            )
-
-    def get_organization(self, org_name):
-        return self.GithubOrgMock(self.spec[org_name])
+    @staticmethod
+    def org_invitations(org_name):
+        return []
 
 
 def get_items_by_params(state, params):
@@ -85,9 +63,8 @@ class TestGithubOrg:
         fixture = fxt.get_anymarkup(path)
 
         with patch('reconcile.github_org.RawGithubApi') as m_rga:
-            with patch('reconcile.github_org.Github') as m_gh:
-                m_gh.return_value = GithubMock(fixture['gh_api'])
-                m_rga.return_value = RawGithubApiMock()
+            with patch('reconcile.github_org.Github'):
+                m_rga.return_value = RawGithubApiMock(fixture['gh_api'])
 
                 gh_api_store = github_org.GHApiStore(config.get_config())
                 current_state = github_org.fetch_current_state(gh_api_store)
@@ -130,3 +107,66 @@ class TestGithubOrg:
 
     def test_desired_state_simple(self):
         self.do_desired_state_test('desired_state_simple.yml')
+
+
+class TestRawGithubApiGraphQL:
+    @staticmethod
+    def test_org_teams_paginated():
+        def page(nodes, end_cursor=None):
+            return {'pageInfo': {'hasNextPage': end_cursor is not None,
+                                 'endCursor': end_cursor},
+                    'nodes': nodes}
+
+        def team(name, logins, end_cursor=None):
+            return {'name': name, 'slug': name, 'databaseId': 1,
+                    'members': page([{'login': login} for login in logins],
+                                    end_cursor),
+                    'invitations': page([{'invitee': {'login': 'new'}},
+                                         {'invitee': None}])}
+
+        responses = [
+            {'organization': {'teams': page([team('a', ['u1'], 'm1')],
+                                            't1')}},
+            {'organization': {'team': {'members': page([{'login': 'u2'}])}}},
+            {'organization': {'teams': page([team('b', ['u3'])])}},
+        ]
+        raw_gh_api = RawGithubApi('token')
+        with patch.object(raw_gh_api, 'graphql',
+                          side_effect=responses) as m_graphql:
+            teams = raw_gh_api.org_teams('org')
+
+        assert [(t['name'], t['members'], t['invitations'])
+                for t in teams] == [('a', ['u1', 'u2'], ['new']),
+                                    ('b', ['u3'], ['new'])]
+        cursors = [c[0][1]['cursor'] for c in m_graphql.call_args_list]
+        assert cursors == [None, 'm1', 't1']
+
+
+def get_config_store():
+    orgs = {}
+    with patch.object(github_org.GHApiStore, '_orgs', orgs):
+        store = github_org.GHApiStore({'github': {'org': {'token': 't'}}})
+    store._orgs = orgs
+    return store
+
+
+class TestGHApiStoreCall:
+    @staticmethod
+    @mock.patch('reconcile.utils.rate_limiter.time.sleep')
+    def test_secondary_rate_limit_retried(sleep):
+        store = get_config_store()
+        g = mock.Mock(rate_limiting=(4000, 5000),
+                      rate_limiting_resettime=time.time() + 3600)
+        func = mock.Mock(side_effect=[
+            GithubException(403, {}, {'Retry-After': '0'}), 'ok'])
+        with mock.patch.object(store, 'github', return_value=g):
+            assert store.call('org', func, 'arg') == 'ok'
+        assert func.call_count == 2
+
+    @staticmethod
+    def test_other_errors_raised():
+        store = get_config_store()
+        func = mock.Mock(side_effect=GithubException(404, {}, {}))
+        with pytest.raises(GithubException):
+            store.call('org', func)
+        func.assert_called_once()
@@ -0,0 +1,94 @@
+import json
+
+import mock
+import pytest
+
+import reconcile.utils.gql as gql
+
+from reconcile.utils.gql import GqlApi, GqlCache, GqlGetResourceError
+
+
+RESPONSE = json.dumps({'data': {'apps': []}})
+
+
+class TestGqlCache:
+    @staticmethod
+    @mock.patch('reconcile.utils.gql.GqlApi._execute')
+    def test_query_cached_per_sha(execute, tmp_path):
+        execute.return_value = RESPONSE
+        cache = GqlCache(cache_dir=str(tmp_path))
+        gqlapi = GqlApi('url', sha='abc', cache=cache)
+
+        assert gqlapi.query('{ apps }') == {'apps': []}
+        assert gqlapi.query('{ apps }') == {'apps': []}
+        execute.assert_called_once()
+
+        # entries on disk are shared with other processes
+        other = GqlApi('url', sha='abc', cache=GqlCache(str(tmp_path)))
+        assert other.query('{ apps }') == {'apps': []}
+        execute.assert_called_once()
+
+        other_sha = GqlApi('url', sha='def', cache=cache)
+        other_sha.query('{ apps }')
+        assert execute.call_count == 2
+
+    @staticmethod
+    def test_evict_keeps_current_sha(tmp_path):
+        cache = GqlCache(cache_dir=str(tmp_path), max_disk_size=1)
+        for sha in ['old', 'new']:
+            cache.set(sha, GqlCache.key(sha, 'q', None), RESPONSE)
+
+        cache.evict(keep_sha='new')
+        assert [p.name for p in tmp_path.iterdir()] == ['new']
+
+
+class TestGetResources:
+    @staticmethod
+    @mock.patch('reconcile.utils.gql.GqlApi._execute')
+    def test_resources_fetched_in_one_request(execute):
+        def resource(path):
+            return [{'path': path, 'content': 'c', 'sha256sum': 's'}]
+
+        execute.return_value = json.dumps({'data': {
+            'r0': resource('/a.yml'), 'r1': resource('/b.yml'), 'r2': [],
+        }})
+        gqlapi = GqlApi('url')
+
+        resources = gqlapi.get_resources(['/a.yml', '/b.yml', '/missing.yml'])
+        assert list(resources) == ['/a.yml', '/b.yml']
+        execute.assert_called_once()
+        assert execute.call_args[0][1] == {
+            'p0': '/a.yml', 'p1': '/b.yml', 'p2': '/missing.yml'}
+
+        assert gqlapi.get_resource('/b.yml') == resource('/b.yml')[0]
+        execute.assert_called_once()
+
+    @staticmethod
+    @mock.patch('time.sleep')
+    @mock.patch('reconcile.utils.gql.GqlApi._execute')
+    def test_failed_batch_fetched_one_by_one(execute, sleep):
+        def execute_query(query, variables):
+            if 'query Resources(' in query or variables['path'] == '/bad':
+                return json.dumps({'errors': ['not found']})
+            return json.dumps({'data': {'resources': [
+                {'path': variables['path'], 'content': 'c',
+                 'sha256sum': 's'}]}})
+
+        execute.side_effect = execute_query
+        gqlapi = GqlApi('url')
+
+        resources = gqlapi.get_resources(['/a.yml', '/bad'])
+        assert list(resources) == ['/a.yml']
+        with pytest.raises(GqlGetResourceError):
+            gqlapi.get_resource('/bad')
+
+
+class TestInit:
+    @staticmethod
+    @mock.patch('reconcile.utils.gql._gqlapi', None)
+    def test_session_kept_between_runs():
+        first = gql.init('https://server/graphqlsha/a', token='token')
+        second = gql.init('https://server/graphqlsha/b', token='token')
+        assert second.session is first.session
+        third = gql.init('https://server/graphqlsha/b', token='other')
+        assert third.session is not first.session
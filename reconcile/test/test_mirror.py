@@ -0,0 +1,82 @@
+import mock
+
+from sretoolbox.container.skopeo import SkopeoCmdError
+
+from reconcile.utils.mirror import MirrorEngine
+
+
+class FakeImage:
+    def __init__(self, registry, repository, tags=(), tag=None):
+        self.registry = registry
+        self.repository = repository
+        self.image = repository
+        self.username = None
+        self.tags = list(tags)
+        self.tag = tag
+
+    def __iter__(self):
+        return iter(self.tags)
+
+    def __getitem__(self, tag):
+        return FakeImage(self.registry, self.repository, tags=self.tags,
+                         tag=tag)
+
+    def __eq__(self, other):
+        return self.tag == other.tag
+
+    def __str__(self):
+        return f'{self.registry}/{self.repository}:{self.tag}'
+
+
+class TestMirrorEngine:
+    @staticmethod
+    def test_sync_tasks():
+        engine = MirrorEngine('test', mock.Mock(), thread_pool_size=2)
+        repos = [
+            {'image': FakeImage('quay.io', 'a', tags=['1']),
+             'mirror': FakeImage('docker.io', 'a', tags=['1', '2', 'x']),
+             'mirror_creds': None,
+             'tag_filter': lambda tag: tag != 'x',
+             'org': 'org-a'},
+            {'image': FakeImage('quay.io', 'b'),
+             'mirror': FakeImage('docker.io', 'b', tags=['3']),
+             'mirror_creds': 'user:token',
+             'org': 'org-b'},
+        ]
+        tasks = engine.sync_tasks(repos)
+        assert [(t['mirror_url'], t['image_url'], t['org'])
+                for t in tasks] == [
+            ('docker.io/a:2', 'quay.io/a:2', 'org-a'),
+            ('docker.io/b:3', 'quay.io/b:3', 'org-b'),
+        ]
+        assert tasks[1]['mirror_creds'] == 'user:token'
+        assert tasks[0]['src_registry'] == 'docker.io'
+        assert tasks[0]['dst_registry'] == 'quay.io'
+
+    @staticmethod
+    @mock.patch('reconcile.utils.mirror.time.sleep')
+    def test_copy_retried(sleep):
+        skopeo_cli = mock.Mock()
+        skopeo_cli.copy.side_effect = [SkopeoCmdError('err'), None]
+        engine = MirrorEngine('test', skopeo_cli, dry_run=True,
+                              max_attempts=2, backoff=3)
+        task = {'mirror_url': 'docker.io/a:1', 'mirror_creds': None,
+                'image_url': 'quay.io/a:1', 'dest_creds': 'u:p',
+                'src_registry': 'docker.io', 'dst_registry': 'quay.io'}
+        assert engine.run([task]) == 0
+        assert skopeo_cli.copy.call_count == 2
+        sleep.assert_called_once_with(3)
+
+    @staticmethod
+    @mock.patch('reconcile.utils.mirror.time.sleep')
+    def test_copy_failed(sleep):
+        skopeo_cli = mock.Mock()
+        skopeo_cli.copy.side_effect = SkopeoCmdError('err')
+        engine = MirrorEngine('test', skopeo_cli, dry_run=True,
+                              max_attempts=3, backoff=1)
+        task = {'mirror_url': 'docker.io/a:1', 'mirror_creds': None,
+                'image_url': 'quay.io/a:1', 'dest_creds': 'u:p',
+                'src_registry': 'quay.io', 'dst_registry': 'quay.io'}
+        assert engine.run([task]) == 1
+        assert skopeo_cli.copy.call_count == 3
+        assert sleep.call_args_list == [mock.call(1), mock.call(2)]
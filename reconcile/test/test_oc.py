@@ -0,0 +1,329 @@
+import json
+import os
+
+import mock
+import pytest
+
+from reconcile.utils.oc import (OC, OC_Map, OCNative, OCClientPool,
+                                FieldIsImmutableError, StatusCodeError,
+                                UnsupportedMediaTypeError,
+                                native_client_enabled, system_ca_bundle)
+from reconcile.utils.openshift_resource import OpenshiftResource as OR
+
+
+def build_process(out, code=0, err=b''):
+    process = mock.Mock(returncode=code)
+    process.communicate.return_value = (out, err)
+    return process
+
+
+class TestGetResourceVersions:
+    @staticmethod
+    @mock.patch('reconcile.utils.oc.Popen')
+    def test_empty_kind_not_retried(popen):
+        popen.return_value = build_process(b'')
+        oc = OC('server', 'token', local=True)
+        assert oc.get_resource_versions('cluster', 'ConfigMap') == {}
+        popen.assert_called_once()
+
+    @staticmethod
+    @mock.patch('reconcile.utils.oc.Popen')
+    def test_only_managed_items(popen):
+        popen.return_value = build_process(
+            b'managed 1 openshift-resources\n'
+            b'named 2 \n'
+            b'leader-election 3 \n'
+            b'other 4 other-integration\n')
+        oc = OC('server', 'token', local=True)
+        versions = oc.get_resource_versions(
+            'cluster', 'ConfigMap', names={'named'},
+            integration='openshift-resources')
+        assert versions == {'managed': '1', 'named': '2'}
+
+
+CONFIGMAPS = {'name': 'configmaps', 'singularName': 'configmap',
+              'kind': 'ConfigMap', 'namespaced': True, 'groupVersion': 'v1',
+              'shortNames': ['cm']}
+
+
+def build_response(status_code=200, body=None, reason='OK'):
+    response = mock.Mock(status_code=status_code, ok=status_code < 400,
+                         reason=reason, text=json.dumps(body))
+    if body is None:
+        response.json.side_effect = ValueError('no json')
+    else:
+        response.json.return_value = body
+    return response
+
+
+def build_native(send):
+    send.return_value = build_response(body={'major': '1'})
+    oc = OCNative('https://server', 'token')
+    oc._resources = [CONFIGMAPS]
+    oc._group_versions['v1'] = [CONFIGMAPS]
+    send.reset_mock()
+    return oc
+
+
+def build_configmap(name='cm'):
+    body = {'apiVersion': 'v1', 'kind': 'ConfigMap',
+            'metadata': {'name': name}, 'data': {'k': 'v'}}
+    return OR(body, 'integration', '1.0.0')
+
+
+class TestOCNative:
+    @staticmethod
+    @mock.patch.object(OCNative, '_send')
+    def test_request_errors(send):
+        oc = build_native(send)
+        path = '/api/v1/namespaces/ns/configmaps/cm'
+
+        send.return_value = build_response(404, {'reason': 'NotFound',
+                                                 'message': 'not found'})
+        assert oc._request('GET', path, allow_not_found=True) == {}
+        with pytest.raises(StatusCodeError, match=r'\(NotFound\)'):
+            oc._request('GET', path)
+
+        send.return_value = build_response(403, {'reason': 'Forbidden',
+                                                 'message': 'denied'})
+        with pytest.raises(StatusCodeError,
+                           match=r'Error from server \(Forbidden\): denied'):
+            oc._request('GET', path)
+
+        send.return_value = build_response(
+            422, {'reason': 'Invalid',
+                  'message': 'spec.selector: Invalid value: "x": '
+                             'field is immutable'})
+        with pytest.raises(FieldIsImmutableError):
+            oc._request('PATCH', path, apply=True)
+
+        send.return_value = build_response(415, None,
+                                           reason='UnsupportedMediaType')
+        with pytest.raises(UnsupportedMediaTypeError):
+            oc._request('PATCH', path, apply=True)
+
+    @staticmethod
+    @mock.patch.object(OCNative, '_send')
+    def test_list_paginated(send):
+        oc = build_native(send)
+        pages = [
+            build_response(body={'items': [{'metadata': {'name': 'a'}}],
+                                 'metadata': {'continue': 'next'}}),
+            build_response(body={'items': [{'metadata': {'name': 'b'}}],
+                                 'metadata': {}}),
+        ]
+        tokens = []
+
+        def list_page(method, path, params, headers):
+            tokens.append(params.get('continue'))
+            return pages.pop(0)
+
+        send.side_effect = list_page
+
+        items = oc.get_all('ConfigMap', all_namespaces=True)['items']
+        assert [i['metadata']['name'] for i in items] == ['a', 'b']
+        assert {i['kind'] for i in items} == {'ConfigMap'}
+        assert tokens == [None, 'next']
+        assert send.call_args_list[0][0] == ('GET', '/api/v1/configmaps')
+
+    @staticmethod
+    @mock.patch.object(OCNative, '_send')
+    @mock.patch('reconcile.utils.oc.RunningState')
+    def test_apply_upgrades_client_side_apply(running_state, send):
+        running_state.return_value.timestamp = 0
+        oc = build_native(send)
+        current = {'metadata': {'name': 'cm', 'namespace': 'ns',
+                                'resourceVersion': '7',
+                                'managedFields': [{
+                                    'manager': 'kubectl-client-side-apply',
+                                    'operation': 'Update',
+                                    'apiVersion': 'v1',
+                                    'fieldsType': 'FieldsV1',
+                                    'fieldsV1': {'f:data': {'f:old': {}}},
+                                }]}}
+        send.side_effect = [build_response(body={'items': [current],
+                                                 'metadata': {}}),
+                            build_response(body=current),
+                            build_response(body={}),
+                            build_response(body={}),
+                            build_response(body={})]
+
+        oc.get_all('ConfigMap', all_namespaces=True)
+        oc.apply('ns', build_configmap())
+        path = '/api/v1/namespaces/ns/configmaps/cm'
+        (_, get, upgrade, apply) = send.call_args_list
+        assert get[0] == ('GET', path)
+        assert upgrade[0] == ('PATCH', path)
+        test, replace = json.loads(upgrade[1]['data'])
+        assert test == {'op': 'test', 'path': '/metadata/resourceVersion',
+                        'value': '7'}
+        [entry] = replace['value']
+        assert entry['manager'] == OCNative.FIELD_MANAGER
+        assert entry['operation'] == 'Apply'
+        assert entry['fieldsV1'] == {'f:data': {'f:old': {}}}
+        assert apply[0] == ('PATCH', path)
+        assert apply[1]['params'] == {'fieldManager': OCNative.FIELD_MANAGER,
+                                      'force': 'true'}
+        assert apply[1]['headers']['Content-Type'] == \
+            'application/apply-patch+yaml'
+
+        # the object is only migrated once
+        oc.apply('ns', build_configmap())
+        assert send.call_args[0] == ('PATCH', path)
+        assert send.call_count == 5
+
+    @staticmethod
+    @mock.patch.object(OCNative, '_send')
+    @mock.patch('reconcile.utils.oc.RunningState')
+    def test_apply_without_client_side_apply(running_state, send):
+        running_state.return_value.timestamp = 0
+        oc = build_native(send)
+        current = {'metadata': {'name': 'cm', 'namespace': 'ns',
+                                'managedFields': [{
+                                    'manager': OCNative.FIELD_MANAGER,
+                                    'operation': 'Apply',
+                                }]}}
+        send.side_effect = [build_response(body={'items': [current],
+                                                 'metadata': {}}),
+                            build_response(body={}),
+                            build_response(body={})]
+
+        oc.get_all('ConfigMap', all_namespaces=True)
+        oc.apply('ns', build_configmap())
+        # objects which were not listed do not need to be migrated
+        oc.apply('ns', build_configmap('new'))
+        assert [c[0][0] for c in send.call_args_list] == \
+            ['GET', 'PATCH', 'PATCH']
+
+    @staticmethod
+    @mock.patch.object(OCNative, '_send')
+    @mock.patch('reconcile.utils.oc.RunningState')
+    def test_delete(running_state, send):
+        running_state.return_value.timestamp = 0
+        oc = build_native(send)
+        send.return_value = build_response(body={})
+
+        oc.delete('ns', 'cm', 'name')
+        send.assert_called_once_with(
+            'DELETE', '/api/v1/namespaces/ns/configmaps/name',
+            data=json.dumps({'propagationPolicy': 'Background'}),
+            headers={'Content-Type': 'application/json'})
+
+    @staticmethod
+    @mock.patch.object(OCNative, '_send')
+    def test_self_subject_access_review(send):
+        oc = build_native(send)
+        send.return_value = build_response(body={'status': {}})
+
+        oc.self_subject_access_review()
+        (method, path), kwargs = send.call_args
+        assert (method, path) == (
+            'POST', '/apis/authorization.k8s.io/v1/selfsubjectaccessreviews')
+        assert json.loads(kwargs['data'])['kind'] == \
+            'SelfSubjectAccessReview'
+
+
+class TestSystemCABundle:
+    @staticmethod
+    @mock.patch('reconcile.utils.oc.ssl.get_default_verify_paths')
+    def test_system_bundle_used(paths, tmp_path):
+        cafile = tmp_path / 'ca.crt'
+        cafile.write_text('')
+        paths.return_value = mock.Mock(cafile=None,
+                                       openssl_cafile=str(cafile),
+                                       capath=None)
+        with mock.patch.object(OCNative, '_send') as send:
+            oc = build_native(send)
+        assert oc._session.verify == str(cafile)
+
+    @staticmethod
+    @mock.patch('reconcile.utils.oc.ssl.get_default_verify_paths')
+    def test_no_system_bundle(paths, tmp_path):
+        paths.return_value = mock.Mock(cafile=None,
+                                       openssl_cafile=str(tmp_path / 'no'),
+                                       capath=None)
+        assert system_ca_bundle() is True
+
+
+class TestUpgradeManagedFields:
+    @staticmethod
+    def test_merged_into_existing_apply_entry():
+        managed_fields = [
+            {'manager': 'kubectl-client-side-apply', 'operation': 'Update',
+             'fieldsV1': {'f:data': {'f:a': {}}}},
+            {'manager': OCNative.FIELD_MANAGER, 'operation': 'Apply',
+             'fieldsV1': {'f:data': {'f:b': {}}}},
+            {'manager': 'operator', 'operation': 'Update',
+             'fieldsV1': {'f:status': {}}},
+        ]
+        upgraded = OCNative.upgrade_managed_fields(managed_fields)
+        assert upgraded[0]['manager'] == 'operator'
+        assert upgraded[1]['manager'] == OCNative.FIELD_MANAGER
+        assert upgraded[1]['fieldsV1'] == {'f:data': {'f:a': {}, 'f:b': {}}}
+        assert OCNative.upgrade_managed_fields(upgraded) is None
+
+
+class TestNativeClientEnabled:
+    @staticmethod
+    @pytest.mark.parametrize('value, integration, enabled', [
+        ('', 'openshift-resources', False),
+        ('true', 'openshift-resources', True),
+        ('openshift-resources,openshift-groups', 'openshift_resources', True),
+        ('openshift-groups', 'openshift-resources', False),
+    ])
+    def test_per_integration(value, integration, enabled):
+        with mock.patch.dict(os.environ, {'USE_NATIVE_CLIENT': value}):
+            assert native_client_enabled(integration) is enabled
+
+
+CLUSTER_INFO = {'name': 'cluster', 'serverUrl': 'https://server',
+                'automationToken': {'path': 'creds', 'field': 'token'}}
+
+
+def build_pooled_client():
+    return mock.Mock(init_projects=False)
+
+
+class TestOCClientPool:
+    @staticmethod
+    def test_key_includes_token_version():
+        versioned = dict(CLUSTER_INFO, automationToken=dict(
+            CLUSTER_INFO['automationToken'], version=2))
+        key = OCClientPool.key(versioned, None, False)
+        assert key == OCClientPool.key(versioned, None, False)
+        assert key != OCClientPool.key(CLUSTER_INFO, None, False)
+
+    @staticmethod
+    def test_reused_when_healthy():
+        pool = OCClientPool(health_check_interval=0)
+        client = pool.get('key', build_pooled_client)
+        assert pool.get('key', build_pooled_client) is client
+        client.self_subject_access_review.assert_called_once()
+        client.cleanup.assert_not_called()
+
+    @staticmethod
+    def test_rebuilt_when_unauthorized():
+        pool = OCClientPool(health_check_interval=0)
+        client = pool.get('key', build_pooled_client)
+        client.self_subject_access_review.side_effect = \
+            StatusCodeError('Error from server (Unauthorized)')
+        assert pool.get('key', build_pooled_client) is not client
+        client.cleanup.assert_called_once()
+
+    @staticmethod
+    def test_not_checked_within_interval():
+        pool = OCClientPool(health_check_interval=300)
+        client = pool.get('key', build_pooled_client)
+        assert pool.get('key', build_pooled_client) is client
+        client.self_subject_access_review.assert_not_called()
+
+    @staticmethod
+    @mock.patch('reconcile.utils.oc.OC')
+    @mock.patch('reconcile.utils.oc.SecretReader')
+    def test_token_read_only_when_built(secret_reader, oc):
+        oc.side_effect = lambda *args, **kwargs: build_pooled_client()
+        cluster_info = dict(CLUSTER_INFO, jumpHost=None)
+        with mock.patch('reconcile.utils.oc._client_pool', OCClientPool()):
+            client = OC_Map(clusters=[cluster_info]).get('cluster')
+            assert OC_Map(clusters=[cluster_info]).get('cluster') is client
+            secret_reader.return_value.read.assert_called_once()
@@ -0,0 +1,329 @@
+import mock
+import pytest
+
+import reconcile.openshift_base as ob
+
+from reconcile.utils.semver_helper import make_semver
+from reconcile.utils.openshift_resource import (OpenshiftResource as OR,
+                                                CompactOpenshiftResource,
+                                                ResourceInventory)
+
+
+TEST_INT = 'test_openshift_base'
+TEST_INT_VER = make_semver(1, 0, 0)
+
+
+def build_resource(kind, name):
+    body = {
+        'apiVersion': 'v1',
+        'kind': kind,
+        'metadata': {'name': name}
+    }
+    return OR(body, TEST_INT, TEST_INT_VER)
+
+
+def build_inventory():
+    ri = ResourceInventory()
+    for cluster in ['cluster-a', 'cluster-b']:
+        for namespace in ['ns-1', 'ns-2']:
+            for kind in ['ConfigMap', 'Secret']:
+                ri.initialize_resource_type(cluster, namespace, kind)
+                for name in ['first', 'second']:
+                    ri.add_desired(cluster, namespace, kind, name,
+                                   build_resource(kind, name))
+    return ri
+
+
+class TestRealizeData:
+    @staticmethod
+    @mock.patch('reconcile.openshift_base.apply')
+    def test_actions_order_independent_of_thread_pool_size(apply):
+        expected = ob.realize_data(True, {}, build_inventory())
+        assert len(expected) == 16
+
+        parallel = ob.realize_data(True, {}, build_inventory(),
+                                   thread_pool_size=4)
+        assert parallel == expected
+
+        by_namespace = ob.realize_data(True, {}, build_inventory(),
+                                       thread_pool_size=4,
+                                       split_by_namespace=True)
+        assert by_namespace == expected
+
+    @staticmethod
+    @mock.patch('reconcile.openshift_base.apply')
+    def test_cluster_with_errors_is_skipped(apply):
+        ri = build_inventory()
+        ri.register_error(cluster='cluster-a')
+
+        actions = ob.realize_data(True, {}, ri, thread_pool_size=4)
+        assert {a['cluster'] for a in actions} == {'cluster-b'}
+
+
+class TestPopulateCurrentStateBatch:
+    @staticmethod
+    def test_namespace_fetched_at_once():
+        oc = mock.Mock(api_resources=None)
+        oc.get_namespace_items.return_value = [
+            build_resource('ConfigMap', 'cm').body,
+            build_resource('Secret', 'secret').body,
+        ]
+        ri = ResourceInventory()
+        specs = []
+        for resource_type, names in [('ConfigMap', None),
+                                     ('Secret', ['secret'])]:
+            ri.initialize_resource_type('cluster', 'ns', resource_type)
+            specs.append(ob.StateSpec('current', oc, 'cluster', 'ns',
+                                      resource_type,
+                                      resource_names=names))
+        desired = ob.StateSpec('desired', oc, 'cluster', 'ns', {})
+
+        batched = ob.batch_specs_by_namespace(specs + [desired])
+        assert len(batched) == 2
+        assert batched[1] is desired
+
+        ob.populate_current_state(batched[0], ri, TEST_INT, TEST_INT_VER)
+        oc.get_namespace_items.assert_called_once_with(
+            'ns', kinds=['ConfigMap'], resource_names={'Secret': ['secret']})
+        current = {(resource_type, name)
+                   for _, _, resource_type, data in ri
+                   for name in data['current']}
+        assert current == {('ConfigMap', 'cm'), ('Secret', 'secret')}
+
+
+class TestPopulateCurrentStateCluster:
+    @staticmethod
+    def test_items_split_by_namespace():
+        def item(namespace, name):
+            body = build_resource('RoleBinding', name).body
+            body['metadata']['namespace'] = namespace
+            return body
+
+        oc = mock.Mock(api_resources=None, init_projects=True,
+                       projects=['ns-1', 'ns-2', 'unmanaged'])
+        oc.get_all.return_value = {'items': [
+            item('ns-1', 'a'), item('ns-2', 'b'), item('ns-2', 'c'),
+            item('unmanaged', 'd'),
+        ]}
+        ri = ResourceInventory()
+        specs = []
+        for namespace, names in [('ns-1', None), ('ns-2', ['b'])]:
+            ri.initialize_resource_type('cluster', namespace, 'RoleBinding')
+            specs.append(ob.StateSpec('current', oc, 'cluster', namespace,
+                                      'RoleBinding', resource_names=names))
+
+        [batched] = ob.batch_specs_by_cluster(specs, 1)
+        assert batched.type == 'current-cluster'
+
+        ob.populate_current_state(batched, ri, TEST_INT, TEST_INT_VER)
+        oc.get_all.assert_called_once_with('RoleBinding',
+                                           all_namespaces=True)
+        current = {(namespace, name)
+                   for _, namespace, _, data in ri
+                   for name in data['current']}
+        assert current == {('ns-1', 'a'), ('ns-2', 'b')}
+
+    @staticmethod
+    def test_forbidden_falls_back_to_namespaces():
+        oc = mock.Mock(api_resources=None, init_projects=True,
+                       projects=['ns-1', 'ns-2'])
+        oc.get_all.side_effect = ob.StatusCodeError(
+            'Error from server (Forbidden): rolebindings is forbidden')
+        oc.get_namespace_items.side_effect = \
+            lambda namespace, **_: [build_resource('RoleBinding',
+                                                   f'{namespace}-rb').body]
+        ri = ResourceInventory()
+        specs = []
+        for namespace in ['ns-1', 'ns-2']:
+            ri.initialize_resource_type('cluster', namespace, 'RoleBinding')
+            specs.append(ob.StateSpec('current', oc, 'cluster', namespace,
+                                      'RoleBinding'))
+
+        [batched] = ob.batch_specs_by_cluster(specs, 1)
+        ob.populate_current_state(batched, ri, TEST_INT, TEST_INT_VER)
+        assert not ri.has_error_registered()
+        current = {(namespace, name)
+                   for _, namespace, _, data in ri
+                   for name in data['current']}
+        assert current == {('ns-1', 'ns-1-rb'), ('ns-2', 'ns-2-rb')}
+
+    @staticmethod
+    def test_low_managed_ratio_fetches_per_namespace():
+        oc = mock.Mock(init_projects=True,
+                       projects=['ns-1', 'ns-2', 'ns-3'])
+        specs = [ob.StateSpec('current', oc, 'cluster', 'ns-1',
+                              'RoleBinding')]
+
+        assert ob.batch_specs_by_cluster(specs, 1) == specs
+
+
+class TestCompactCurrentState:
+    @staticmethod
+    def build(current_body, desired, add_desired_first=True):
+        ri = ResourceInventory(compact_current=True)
+        ri.initialize_resource_type('cluster', 'ns', 'ConfigMap')
+        current = OR(current_body, TEST_INT, TEST_INT_VER)
+        adds = [
+            lambda: ri.add_desired('cluster', 'ns', 'ConfigMap', 'cm',
+                                   desired),
+            lambda: ri.add_current('cluster', 'ns', 'ConfigMap', 'cm',
+                                   current),
+        ]
+        if not add_desired_first:
+            adds.reverse()
+        for add in adds:
+            add()
+        return ri
+
+    @staticmethod
+    @pytest.mark.parametrize('add_desired_first', [True, False])
+    @mock.patch('reconcile.openshift_base.apply')
+    def test_compacted_if_hashes_match(apply, add_desired_first):
+        desired = build_resource('ConfigMap', 'cm')
+        ri = TestCompactCurrentState.build(desired.annotate().body, desired,
+                                           add_desired_first)
+        [(_, _, _, data)] = list(ri)
+        assert isinstance(data['current']['cm'], CompactOpenshiftResource)
+
+        assert ob.realize_data(True, {}, ri) == []
+        apply.assert_not_called()
+
+    @staticmethod
+    @mock.patch('reconcile.openshift_base.apply')
+    def test_equal_resources_not_applied(apply):
+        # the hashes differ, but the resources are still compared
+        current_body = build_resource('ConfigMap', 'cm').annotate().body
+        current_body['data'] = {'k': 'v'}
+        current_body['metadata']['annotations']['qontract.sha256sum'] = \
+            OR(current_body, TEST_INT, TEST_INT_VER).sha256sum()
+        desired = build_resource('ConfigMap', 'cm')
+        ri = TestCompactCurrentState.build(current_body, desired)
+        [(_, _, _, data)] = list(ri)
+        assert not isinstance(data['current']['cm'],
+                              CompactOpenshiftResource)
+
+        assert ob.realize_data(True, {}, ri) == []
+        apply.assert_not_called()
+
+    @staticmethod
+    @mock.patch('reconcile.openshift_base.apply')
+    def test_changed_manually_applied(apply):
+        desired = build_resource('ConfigMap', 'cm')
+        desired.body = dict(desired.body, data={'k': 'v'})
+        current_body = desired.annotate().body
+        current_body['data'] = {'k': 'manual'}
+        ri = TestCompactCurrentState.build(current_body, desired)
+        [(_, _, _, data)] = list(ri)
+        assert data['current']['cm'].body['data'] == {'k': 'manual'}
+
+        actions = ob.realize_data(True, {}, ri)
+        assert [a['action'] for a in actions] == [ob.ACTION_APPLIED]
+
+
+class TestReconcileState:
+    @staticmethod
+    def test_unchanged_units_skipped(tmp_path):
+        oc = mock.Mock()
+        oc.get_resource_versions.return_value = {'cm': '1'}
+        path = str(tmp_path / 'state.json')
+
+        def skip_unchanged(reconcile_state):
+            ri = ResourceInventory()
+            ri.initialize_resource_type('cluster', 'ns', 'ConfigMap')
+            ri.add_desired('cluster', 'ns', 'ConfigMap', 'cm',
+                           build_resource('ConfigMap', 'cm'))
+            specs = [ob.StateSpec('current', oc, 'cluster', 'ns',
+                                  'ConfigMap')]
+            specs, digests = ob.skip_unchanged_specs(specs, ri,
+                                                     reconcile_state, 1)
+            return ri, specs, digests
+
+        ri, specs, digests = skip_unchanged(ob.ReconcileState(path))
+        assert len(specs) == 1
+        ob.record_reconciled_units(ri, [], digests, ob.ReconcileState(path))
+
+        # state is loaded from disk
+        ri, specs, _ = skip_unchanged(ob.ReconcileState(path))
+        assert specs == []
+        assert list(ri) == []
+
+        # the current state changed
+        oc.get_resource_versions.return_value = {'cm': '2'}
+        _, specs, _ = skip_unchanged(ob.ReconcileState(path))
+        assert len(specs) == 1
+
+        # a full resync is due
+        oc.get_resource_versions.return_value = {'cm': '1'}
+        _, specs, _ = skip_unchanged(ob.ReconcileState(path,
+                                                       resync_interval=0))
+        assert len(specs) == 1
+
+    @staticmethod
+    def test_take_over_digests_unmanaged_items(tmp_path):
+        oc = mock.Mock()
+        oc.get_resource_versions.return_value = {'cm': '1'}
+        reconcile_state = ob.ReconcileState(str(tmp_path / 'state.json'))
+
+        def skip_unchanged():
+            ri = ResourceInventory()
+            ri.initialize_resource_type('cluster', 'ns', 'ConfigMap')
+            ri.add_desired('cluster', 'ns', 'ConfigMap', 'cm',
+                           build_resource('ConfigMap', 'cm'))
+            specs = [ob.StateSpec('current', oc, 'cluster', 'ns',
+                                  'ConfigMap')]
+            specs, digests = ob.skip_unchanged_specs(
+                specs, ri, reconcile_state, 1, integration=TEST_INT,
+                take_over=True)
+            ob.record_reconciled_units(ri, [], digests, reconcile_state)
+            return specs
+
+        assert len(skip_unchanged()) == 1
+        # all items are listed, not only the managed ones
+        oc.get_resource_versions.assert_called_with(
+            'ns', 'ConfigMap', names=None, integration=None)
+        assert skip_unchanged() == []
+
+        # a new unannotated item is to be deleted
+        oc.get_resource_versions.return_value = {'cm': '1', 'other': '1'}
+        assert len(skip_unchanged()) == 1
+
+
+class TestValidationTracker:
+    @staticmethod
+    @mock.patch('reconcile.openshift_base.time.sleep')
+    def test_only_unfinished_resources_polled(sleep):
+        def deployment(ready_replicas):
+            return {'spec': {'replicas': 2},
+                    'status': {'replicas': 2, 'updatedReplicas': 2,
+                               'readyReplicas': ready_replicas}}
+
+        oc = mock.Mock()
+        oc.get.side_effect = [deployment(2), deployment(1), deployment(2)]
+        actions = [{'action': ob.ACTION_APPLIED, 'cluster': 'cluster',
+                    'namespace': 'ns', 'kind': 'Deployment', 'name': name}
+                   for name in ['fast', 'slow']]
+        actions.append({'action': ob.ACTION_APPLIED, 'cluster': 'cluster',
+                        'namespace': 'ns', 'kind': 'ConfigMap',
+                        'name': 'cm'})
+
+        time_to_ready = ob.validate_data({'cluster': oc}, actions,
+                                         watch=False)
+        assert oc.get.call_count == 3
+        assert oc.get.call_args[1] == {'name': 'slow'}
+        assert set(time_to_ready) == {('cluster', 'ns', 'Deployment', 'fast'),
+                                      ('cluster', 'ns', 'Deployment', 'slow')}
+        sleep.assert_called_once_with(1)
+
+    @staticmethod
+    @mock.patch('reconcile.openshift_base.time.sleep')
+    def test_not_ready_after_max_attempts(sleep):
+        oc = mock.Mock()
+        oc.get.return_value = {'status': {'succeeded': 0}}
+        actions = [{'action': ob.ACTION_APPLIED, 'cluster': 'cluster',
+                    'namespace': 'ns', 'kind': 'Job', 'name': 'job'}]
+
+        tracker = ob.ValidationTracker({'cluster': oc}, actions,
+                                       max_attempts=3)
+        with pytest.raises(ob.ValidationError):
+            tracker.run()
+        assert oc.get.call_count == 3
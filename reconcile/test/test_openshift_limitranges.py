@@ -0,0 +1,27 @@
+import json
+
+import mock
+
+import reconcile.openshift_limitranges as openshift_limitranges
+
+from reconcile.utils.openshift_resource import OpenshiftResource as OR
+
+
+class TestConstructResources:
+    @staticmethod
+    def test_body_not_changed_after_construction():
+        bodies = []
+
+        def construct(body, *args, **kwargs):
+            bodies.append(json.dumps(body, sort_keys=True))
+            return OR(body, *args, **kwargs)
+
+        namespaces = [{'name': 'ns',
+                       'limitRanges': {'name': 'limits', 'limits': []}}]
+        with mock.patch('reconcile.openshift_limitranges.OR',
+                        side_effect=construct):
+            [namespace] = openshift_limitranges.construct_resources(
+                namespaces)
+        [resource] = namespace['resources']
+        assert resource.body['spec']['limits'] is None
+        assert json.dumps(resource.body, sort_keys=True) == bodies[0]
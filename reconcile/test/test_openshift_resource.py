@@ -1,3 +1,5 @@
+import copy
+
 import pytest
 
 from reconcile.utils.semver_helper import make_semver
@@ -105,3 +107,24 @@ class TestOpenshiftResource:
             '1366d8ef31f0d83419d25b446e61008b16348b9efee2216873856c49cede6965'
 
         assert not annotated.has_valid_sha256sum()
+
+    @staticmethod
+    def test_canonicalize_does_not_mutate_body():
+        resource = fxt.get_anymarkup('sha256sum.yml')
+        openshift_resource = OR(resource, TEST_INT, TEST_INT_VER)
+        body = copy.deepcopy(resource)
+
+        openshift_resource.annotate()
+        assert openshift_resource.body == body
+
+    @staticmethod
+    def test_sha256sum_cache_invalidated_on_body_change():
+        resource = fxt.get_anymarkup('sha256sum.yml')
+        openshift_resource = OR(resource, TEST_INT, TEST_INT_VER)
+        sha256sum = openshift_resource.sha256sum()
+
+        body = copy.deepcopy(resource)
+        body['metadata']['name'] = 'changed'
+        openshift_resource.body = body
+
+        assert openshift_resource.sha256sum() != sha256sum
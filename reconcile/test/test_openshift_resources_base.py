@@ -0,0 +1,80 @@
+import mock
+
+import reconcile.openshift_resources_base as orb
+
+
+class TestTemplateReadsNamespace:
+    @staticmethod
+    def test_namespace_independent_template():
+        body = "name: {{ resource.path }}\nvalue: {{ value }}\n" \
+            "type: {{ resource['type'] }}"
+        assert not orb.template_reads_namespace(body)
+
+    @staticmethod
+    def test_namespace_dependent_templates():
+        for body in ["namespace: {{ resource.namespace.name }}",
+                     "namespace: {{ resource['namespace'] }}",
+                     "resource: {{ resource }}",
+                     "namespace: {{ resource.get('namespace') }}",
+                     "namespace: {{ resource['namespace'] | string }}",
+                     "namespace: {{ resource | attr('namespace') }}",
+                     "{% for k, v in resource.items() %}{{ v }}{% endfor %}",
+                     "{% for v in resource.values() %}{{ v }}{% endfor %}",
+                     "{% set r = resource %}{{ r.namespace }}",
+                     "name: {{ resource[key] }}",
+                     "secret: {{ vault('app/{{ resource.path }}', 'k') }}"]:
+            assert orb.template_reads_namespace(body)
+
+
+class TestRenderCache:
+    @staticmethod
+    @mock.patch('reconcile.openshift_resources_base.gql')
+    def test_shared_template_rendered_once(gql):
+        gql.get_api.return_value.get_resource.return_value = \
+            {'content': 'value: {{ value }}'}
+        render_cache = orb.RenderCache()
+        render = mock.Mock()
+
+        for namespace in ['ns-1', 'ns-2']:
+            resource = {'provider': 'resource-template', 'path': '/t.yml',
+                        'type': None, 'variables': '{"value": 1}',
+                        'namespace': {'name': namespace}}
+            key = render_cache.key(resource)
+            assert key is not None
+            render_cache.get(key, render)
+
+        render.assert_called_once()
+
+    @staticmethod
+    @mock.patch('reconcile.openshift_resources_base.gql')
+    def test_templated_variables_not_shared(gql):
+        gql.get_api.return_value.get_resource.return_value = \
+            {'content': "secret: {{ vault(path, 'k') }}"}
+        for variables in [
+                '{"path": "app/{{ resource.namespace.name }}"}',
+                '{"path": "{% if true %}app{% endif %}"}']:
+            resource = {'provider': 'resource-template', 'path': '/t.yml',
+                        'type': None, 'variables': variables,
+                        'namespace': {'name': 'ns-1'}}
+            assert orb.RenderCache.key(resource) is None
+
+
+class TestFetchProviderRoute:
+    @staticmethod
+    @mock.patch('reconcile.openshift_resources_base.VaultClient')
+    def test_tls_invalidates_sha256sum(vault_client):
+        vault_client.return_value.read_all.return_value = \
+            {'termination': 'edge'}
+        fetched = orb.OR({'apiVersion': 'v1', 'kind': 'Route',
+                          'metadata': {'name': 'route'},
+                          'spec': {'host': 'example.com'}},
+                         'integration', '1.0.0')
+        sha256sum = fetched.sha256sum()
+
+        with mock.patch('reconcile.openshift_resources_base.'
+                        'fetch_provider_resource', return_value=fetched):
+            route = orb.fetch_provider_route('/route.yml', 'tls', 1)
+        assert route.body['spec']['tls'] == {'termination': 'edge'}
+        assert route.sha256sum() != sha256sum
+        assert route.sha256sum() == \
+            orb.OR(route.body, 'integration', '1.0.0').sha256sum()
@@ -0,0 +1,75 @@
+import re
+import shutil
+
+import pytest
+
+import reconcile.utils.openshift_template as openshift_template
+
+from reconcile.utils.oc import OC
+
+from .fixtures import Fixtures
+
+
+fxt = Fixtures('openshift_template')
+GOLDEN_FILES = ['substitution.yml', 'namespaces_and_labels.yml',
+                'non_string_parameters.yml', 'label_collisions.yml']
+
+
+class TestProcess:
+    @staticmethod
+    @pytest.mark.parametrize('fixture', GOLDEN_FILES)
+    def test_golden_files(fixture):
+        data = fxt.get_anymarkup(fixture)
+        items = openshift_template.process(data['template'],
+                                           data['parameters'])
+        assert items == data['expected']
+
+    @staticmethod
+    @pytest.mark.skipif(shutil.which('oc') is None,
+                        reason='oc is not installed')
+    @pytest.mark.parametrize('fixture', GOLDEN_FILES)
+    def test_matches_oc(fixture):
+        data = fxt.get_anymarkup(fixture)
+        oc = OC('server', 'token', local=True)
+        items = oc.process(data['template'], data['parameters'])
+        assert items == data['expected']
+
+    @staticmethod
+    def test_keys_substituted():
+        template = {'parameters': [{'name': 'KEY', 'value': 'k'}],
+                    'objects': [{'data': {'${KEY}': 'v',
+                                          'prefix-${KEY}': '${KEY}'}}]}
+        [item] = openshift_template.process(template)
+        assert item['data'] == {'k': 'v', 'prefix-k': 'k'}
+
+    @staticmethod
+    def test_required_parameter():
+        template = {'parameters': [{'name': 'TAG', 'required': True}],
+                    'objects': []}
+        with pytest.raises(openshift_template.TemplateProcessingError):
+            openshift_template.process(template, {'TAG': ''})
+        assert openshift_template.process(template, {'TAG': 'a'}) == []
+
+    @staticmethod
+    def test_unknown_parameters():
+        template = {'objects': []}
+        with pytest.raises(openshift_template.TemplateProcessingError):
+            openshift_template.process(template, {'TAG': 'a'},
+                                       ignore_unknown_parameters=False)
+
+    @staticmethod
+    def test_generated_parameter():
+        template = {
+            'parameters': [
+                {'name': 'PASSWORD', 'generate': 'expression',
+                 'from': 'pw-[a-f0-9]{8}-[\\d]{2}', 'required': True},
+                {'name': 'PROVIDED', 'generate': 'expression',
+                 'from': '[\\w]{8}'},
+            ],
+            'objects': [{'data': {'password': '${PASSWORD}',
+                                  'provided': '${PROVIDED}'}}],
+        }
+        [item] = openshift_template.process(template, {'PROVIDED': 'value'})
+        assert re.fullmatch(r'pw-[a-f0-9]{8}-[0-9]{2}',
+                            item['data']['password'])
+        assert item['data']['provided'] == 'value'
@@ -0,0 +1,42 @@
+import time
+
+from reconcile.utils.rate_limiter import TokenBucket
+
+
+class TestTokenBucket:
+    @staticmethod
+    def test_burst_within_capacity():
+        bucket = TokenBucket(rate=1, capacity=5)
+        start = time.monotonic()
+        for _ in range(5):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.5
+
+    @staticmethod
+    def test_headers_adjust_rate_below_floor():
+        bucket = TokenBucket(rate=10, capacity=10, floor=100)
+        bucket.update_from_headers({
+            'X-RateLimit-Remaining': '50',
+            'X-RateLimit-Reset': str(time.time() + 1000),
+        })
+        assert 0.04 < bucket.rate < 0.06
+
+        bucket.update(1000, time.time() + 1000)
+        assert bucket.rate == 10
+
+    @staticmethod
+    def test_unlimited_above_floor():
+        bucket = TokenBucket(rate=None, capacity=1, floor=100)
+        bucket.update(4000, time.time() + 3600)
+        start = time.monotonic()
+        for _ in range(100):
+            bucket.acquire()
+        assert time.monotonic() - start < 0.5
+
+    @staticmethod
+    def test_retry_after_pauses():
+        bucket = TokenBucket(rate=1000, capacity=10)
+        start = time.monotonic()
+        bucket.update_from_headers({'Retry-After': '0.2'})
+        bucket.acquire()
+        assert time.monotonic() - start >= 0.2
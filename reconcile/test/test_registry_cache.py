@@ -0,0 +1,54 @@
+import mock
+import pytest
+
+from requests import exceptions as rqexc
+
+from reconcile.utils.registry_cache import RegistryCache
+
+
+def build_image(url, tags=()):
+    image = mock.MagicMock(registry='quay.io', repository='org', image='app',
+                           username=None)
+    image.__str__.return_value = url
+    image.__iter__.side_effect = lambda: iter(tags)
+    return image
+
+
+class TestRegistryCache:
+    @staticmethod
+    def test_digest_fetched_once():
+        cache = RegistryCache()
+        digest = mock.PropertyMock(return_value='sha256:1')
+        for _ in range(50):
+            image = build_image('quay.io/org/app:abcdef1')
+            type(image).digest = digest
+            assert cache.digest(image) == 'sha256:1'
+        digest.assert_called_once()
+
+    @staticmethod
+    def test_tags_and_membership():
+        cache = RegistryCache()
+        image = build_image('quay.io/org/app', tags=['a', 'b'])
+        assert cache.tags(image) == ['a', 'b']
+        assert cache.has_tag(image, 'a')
+        assert not cache.has_tag(image, 'c')
+        image.__iter__.assert_called_once()
+
+    @staticmethod
+    def test_not_found_cached_negatively():
+        cache = RegistryCache(negative_ttl=60)
+        image = build_image('quay.io/org/missing:tag')
+        error = rqexc.HTTPError(response=mock.Mock(status_code=404))
+        digest = mock.PropertyMock(side_effect=error)
+        type(image).digest = digest
+        for _ in range(2):
+            with pytest.raises(rqexc.HTTPError):
+                cache.digest(image)
+        digest.assert_called_once()
+
+        cache = RegistryCache(negative_ttl=0)
+        type(image).digest = digest
+        for _ in range(2):
+            with pytest.raises(rqexc.HTTPError):
+                cache.digest(image)
+        assert digest.call_count == 3
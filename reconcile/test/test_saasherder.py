@@ -0,0 +1,58 @@
+import mock
+
+from reconcile.utils.saasherder import ContentCache, SaasHerder
+
+
+class TestContentCache:
+    @staticmethod
+    def test_entries_shared_on_disk(tmp_path):
+        key = ContentCache.key('file', 'https://github.com/o/r', 'a' * 40,
+                               '/template.yaml')
+        fetch = mock.Mock(return_value='kind: Template')
+        cache = ContentCache(cache_dir=str(tmp_path))
+        assert cache.get_or_fetch(key, fetch) == b'kind: Template'
+        assert cache.get_or_fetch(key, fetch) == b'kind: Template'
+
+        other = ContentCache(cache_dir=str(tmp_path))
+        assert other.get_or_fetch(key, fetch) == b'kind: Template'
+        fetch.assert_called_once()
+
+    @staticmethod
+    def test_evict_least_recently_used(tmp_path):
+        cache = ContentCache(cache_dir=str(tmp_path), max_disk_size=10)
+        cache.set('aa1', b'0123456789')
+        cache.set('bb2', b'0123456789')
+
+        cache.evict()
+        remaining = [p.name for p in tmp_path.glob('*/*')]
+        assert len(remaining) == 1
+
+    @staticmethod
+    def test_evicted_while_writing(tmp_path):
+        cache = ContentCache(cache_dir=str(tmp_path), max_disk_size=100)
+        for n in range(50):
+            cache.set(f'{n:03}', b'0123456789')
+
+        size = sum(p.stat().st_size for p in tmp_path.glob('*/*'))
+        assert size <= 100
+
+
+class TestGetCommitSha:
+    @staticmethod
+    def test_ref_resolved_once_per_run():
+        saasherder = SaasHerder([], thread_pool_size=1, gitlab=None,
+                                integration='', integration_version='',
+                                settings={})
+        github = mock.Mock()
+        github.get_repo.return_value.get_commit.return_value.sha = 'b' * 40
+        options = {'url': 'https://github.com/o/r', 'ref': 'master',
+                   'github': github}
+
+        assert saasherder._get_commit_sha(options) == 'b' * 40
+        options['hash_length'] = 7
+        assert saasherder._get_commit_sha(options) == 'b' * 7
+        github.get_repo.assert_called_once()
+
+        options['ref'] = 'c' * 40
+        assert saasherder._get_commit_sha(options) == 'c' * 7
+        github.get_repo.assert_called_once()
@@ -0,0 +1,88 @@
+import io
+import json
+
+import mock
+import pytest
+
+import reconcile.utils.state as state_module
+
+from reconcile.utils.state import State
+
+
+@pytest.fixture(autouse=True)
+def clear_etag_cache():
+    state_module.clear_cache()
+    yield
+    state_module.clear_cache()
+
+
+class S3ClientMock:
+    def __init__(self, objects):
+        self.objects = objects
+        self.get_object = mock.Mock(side_effect=self._get_object)
+        self.put_object = mock.Mock(side_effect=self._put_object)
+
+    def get_paginator(self, name):
+        paginator = mock.Mock()
+        contents = [{'Key': k, 'ETag': f'"{v}"'}
+                    for k, v in self.objects.items()]
+        paginator.paginate.return_value = [{'Contents': contents[:1]},
+                                           {'Contents': contents[1:]}]
+        return paginator
+
+    def _get_object(self, Bucket, Key, **kwargs):
+        return {'Body': io.BytesIO(json.dumps(self.objects[Key]).encode()),
+                'ETag': f'"{self.objects[Key]}"'}
+
+    def _put_object(self, Bucket, Key, Body):
+        self.objects[Key] = json.loads(Body)
+        return {'ETag': f'"{self.objects[Key]}"'}
+
+
+def build_state(client, monkeypatch):
+    monkeypatch.setenv('APP_INTERFACE_STATE_BUCKET', 'bucket')
+    monkeypatch.setenv('APP_INTERFACE_STATE_BUCKET_ACCOUNT', 'account')
+    with mock.patch('reconcile.utils.state.AWSApi') as aws_api:
+        aws_api.return_value.get_session.return_value.client.return_value = \
+            client
+        return State('integration', [])
+
+
+class TestStateSnapshot:
+    @staticmethod
+    def test_load(monkeypatch):
+        client = S3ClientMock({'state/integration/a': 'x',
+                               'state/integration/b/c': 'y'})
+        state = build_state(client, monkeypatch)
+        state.load()
+        assert client.get_object.call_count == 2
+
+        assert state.get('a') == 'x'
+        assert state.get('b/c') == 'y'
+        assert state.get('missing', None) is None
+        assert client.get_object.call_count == 2
+
+        # writes are not deferred
+        state.add('new', 'z')
+        assert state.exists('new')
+        assert client.objects['state/integration/new'] == 'z'
+        assert client.get_object.call_count == 2
+
+        # unchanged objects are not downloaded again
+        build_state(client, monkeypatch).load()
+        assert client.get_object.call_count == 2
+
+
+class TestEtagCache:
+    @staticmethod
+    @mock.patch.object(state_module, 'ETAG_CACHE_SIZE', 2)
+    def test_least_recently_used_dropped():
+        for key in ['a', 'b']:
+            state_module._set_cached('bucket', key, 'etag', key)
+        assert state_module._get_cached('bucket', 'a', 'etag') == (True, 'a')
+        state_module._set_cached('bucket', 'c', 'etag', 'c')
+
+        assert state_module._get_cached('bucket', 'b', 'etag') == \
+            (False, None)
+        assert state_module._get_cached('bucket', 'a', 'etag') == (True, 'a')
+        assert state_module._get_cached('bucket', 'c', 'etag') == (True, 'c')
@@ -1,33 +1,62 @@
 import json
 import logging
 
+import reconcile.utils.threaded as threaded
+
 
 class RunnerException(Exception):
     pass
 
 
 class AggregatedList:
+    """ a list of items aggregated by params.
+
+    the items of each params keep their insertion order, and are
+    indexed by a hashed set, so adding and diffing is linear.
+
+    the key of a params object is calculated once. callers adding many
+    times with equal params objects can pass a precalculated params_hash
+    (see hash_params). """
     def __init__(self):
         self._dict = {}
-
-    def add(self, params, new_items):
-        params_hash = self.hash_params(params)
+        self._item_keys = {}
+        # params object id -> (params, params hash). the params object
+        # is referenced, so its id is not reused while it is cached
+        self._params_hashes = {}
+
+    def _params_hash(self, params):
+        cached = self._params_hashes.get(id(params))
+        if cached is None:
+            cached = (params, self.hash_params(params))
+            self._params_hashes[id(params)] = cached
+        return cached[1]
+
+    def add(self, params, new_items, params_hash=None):
+        if params_hash is None:
+            params_hash = self._params_hash(params)
 
         if self._dict.get(params_hash) is None:
             self._dict[params_hash] = {
                 'params': params,
                 'items': []
             }
+            self._item_keys[params_hash] = set()
 
         if not isinstance(new_items, list):
             new_items = [new_items]
 
+        items = self._dict[params_hash]["items"]
+        item_keys = self._item_keys[params_hash]
         for item in new_items:
-            if item not in self._dict[params_hash]["items"]:
-                self._dict[params_hash]["items"].append(item)
-
-    def get(self, params):
-        return self._dict[self.hash_params(params)]
+            item_key = self.item_key(item)
+            if item_key not in item_keys:
+                item_keys.add(item_key)
+                items.append(item)
+
+    def get(self, params, params_hash=None):
+        if params_hash is None:
+            params_hash = self._params_hash(params)
+        return self._dict[params_hash]
 
     def get_all_params_hash(self):
         return self._dict.keys()
@@ -60,11 +89,13 @@ class AggregatedList:
             left = self.get_by_params_hash(p)
             right = right_state.get_by_params_hash(p)
 
-            l_items = left['items']
-            r_items = right['items']
+            l_keys = self._item_keys[p]
+            r_keys = right_state._item_keys[p]
 
-            update_insert = [i for i in r_items if i not in l_items]
-            update_delete = [i for i in l_items if i not in r_items]
+            update_insert = [i for i in right['items']
+                             if self.item_key(i) not in l_keys]
+            update_delete = [i for i in left['items']
+                             if self.item_key(i) not in r_keys]
 
             if update_insert:
                 diff['update-insert'].append({
@@ -90,34 +121,72 @@ class AggregatedList:
     def hash_params(params):
         return hash(json.dumps(params, sort_keys=True))
 
+    @staticmethod
+    def item_key(item):
+        try:
+            hash(item)
+            return item
+        except TypeError:
+            # unhashable items (dicts, lists) are compared by value
+            return ('json', json.dumps(item, sort_keys=True))
+
 
 class AggregatedDiffRunner:
-    def __init__(self, diff):
+    """ runs the actions registered for each element of a diff.
+
+    actions are executed in registration order. with a thread_pool_size
+    larger than 1, each registered action is a phase: its calls for the
+    different diff elements run concurrently, and the next phase starts
+    once they are all done. an action may therefore depend on a previously
+    registered one, whatever their params are (e.g. add a user to the org
+    before adding it to a team). """
+    def __init__(self, diff, thread_pool_size=1):
         self.diff = diff
         self.actions = []
+        self.thread_pool_size = thread_pool_size
 
     def register(self, on, action, cond=None):
         if on not in self.diff.keys():
             raise Exception("Unknown diff key for 'on': {}".format(on))
         self.actions.append((on, action, cond))
 
-    def run(self):
+    def _phase_calls(self, on, action, cond):
+        for diff_element in self.diff.get(on, []):
+            params = diff_element['params']
+            items = diff_element['items']
+
+            if cond is None or cond(params):
+                yield action, params, items
+
+    def _calls(self):
+        for (on, action, cond) in self.actions:
+            yield from self._phase_calls(on, action, cond)
+
+    @staticmethod
+    def _run_calls(calls):
         status = True
 
+        for action, params, items in calls:
+            try:
+                last_status = action(params, items)
+                status = status and last_status
+            except Exception as e:
+                status = False
+                logging.error([params, items])
+                logging.error(str(e))
+
+        return status
+
+    def run(self):
+        if self.thread_pool_size <= 1:
+            return self._run_calls(self._calls())
+
+        status = True
         for (on, action, cond) in self.actions:
-            diff_list = self.diff.get(on, [])
-
-            for diff_element in diff_list:
-                params = diff_element['params']
-                items = diff_element['items']
-
-                if cond is None or cond(params):
-                    try:
-                        last_status = action(params, items)
-                        status = status and last_status
-                    except Exception as e:
-                        status = False
-                        logging.error([params, items])
-                        logging.error(str(e))
+            calls = [[call] for call in self._phase_calls(on, action, cond)]
+            results = threaded.run(self._run_calls, calls,
+                                   self.thread_pool_size)
+            for last_status in results:
+                status = status and last_status
 
         return status
@@ -1,15 +1,19 @@
-import contextlib
+import hashlib
 import json
 import logging
 import os
+import shutil
+import tempfile
 import textwrap
 
+from collections import OrderedDict
+from threading import Lock
 from urllib.parse import urlparse
 
 import requests
 
+from requests.adapters import HTTPAdapter
 from sretoolbox.utils import retry
-from graphqlclient import GraphQLClient
 from sentry_sdk import capture_exception
 
 from reconcile.utils.config import get_config
@@ -18,6 +22,12 @@ from reconcile.status import RunningState
 
 _gqlapi = None
 
+# maximum number of connections kept alive to the GraphQL server,
+# it should match the thread pool size of the integrations
+POOL_SIZE = 50
+# maximum number of resources fetched in a single GraphQL request
+RESOURCES_BATCH_SIZE = 100
+
 
 INTEGRATIONS_QUERY = """
 {
@@ -76,24 +86,137 @@ class GqlGetResourceError(Exception):
         )
 
 
+class GqlCache:
+    """GqlCache is a content addressed cache of GraphQL responses.
+
+    Responses are keyed by (bundle sha, query, variables). As the data of
+    a bundle sha never changes, entries are never invalidated, only evicted.
+
+    Entries are kept in memory (LRU, up to max_memory_size bytes) and,
+    if cache_dir is set, on disk (up to max_disk_size bytes), where they
+    are shared between processes and survive integration runs.
+    Files are written atomically, so concurrent readers never see
+    partial entries.
+    """
+
+    def __init__(self, cache_dir=None,
+                 max_memory_size=256 * 1024 * 1024,
+                 max_disk_size=512 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_size = max_memory_size
+        self.max_disk_size = max_disk_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def key(sha, query, variables):
+        data = json.dumps([sha, query, variables], sort_keys=True)
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _path(self, sha, key):
+        return os.path.join(self.cache_dir, sha, key)
+
+    def get(self, sha, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(sha, key), 'r') as f:
+                value = f.read()
+        except OSError:
+            return None
+        self._set_memory(key, value)
+        return value
+
+    def set(self, sha, key, value):
+        self._set_memory(key, value)
+        if not self.cache_dir:
+            return
+        sha_dir = os.path.join(self.cache_dir, sha)
+        try:
+            os.makedirs(sha_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=sha_dir, prefix='.tmp-')
+            with os.fdopen(fd, 'w') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(sha, key))
+        except OSError as e:
+            logging.debug(f'could not write gql cache entry: {e}')
+
+    def _set_memory(self, key, value):
+        size = len(value)
+        if size > self.max_memory_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_memory_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def evict(self, keep_sha=None):
+        """ removes the least recently used bundle shas from disk
+        until the cache fits in max_disk_size. """
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        sha_dirs = []
+        total_size = 0
+        for entry in os.scandir(self.cache_dir):
+            if not entry.is_dir():
+                continue
+            size = sum(f.stat().st_size for f in os.scandir(entry.path))
+            sha_dirs.append((entry.stat().st_mtime, entry.name, size))
+            total_size += size
+        for _, sha, size in sorted(sha_dirs):
+            if total_size <= self.max_disk_size:
+                break
+            if sha == keep_sha:
+                continue
+            shutil.rmtree(os.path.join(self.cache_dir, sha),
+                          ignore_errors=True)
+            total_size -= size
+
+
+def init_cache():
+    global _cache
+    cache_dir = os.environ.get('GQL_CACHE_DIR')
+    max_size = int(os.environ.get('GQL_CACHE_MAX_SIZE_MB', 512))
+    _cache = GqlCache(cache_dir=cache_dir,
+                      max_memory_size=max_size * 1024 * 1024 // 2,
+                      max_disk_size=max_size * 1024 * 1024)
+    return _cache
+
+
+_cache = None
+
+
 class GqlApi:
     _valid_schemas = None
     _queried_schemas = set()
 
-    def __init__(self, url, token=None, int_name=None, validate_schemas=False):
+    def __init__(self, url, token=None, int_name=None, validate_schemas=False,
+                 sha=None, cache=None, session=None):
         self.url = url
         self.token = token
         self.integration = int_name
         self.validate_schemas = validate_schemas
-        self.client = GraphQLClient(self.url)
+        self.session = session or self._init_session(token)
+        self._resources = {}
+        # responses can only be cached if they are bound to a bundle sha
+        self.sha = sha
+        self.cache = cache if sha else None
 
         if validate_schemas and not int_name:
             raise Exception('Cannot validate schemas if integration name '
                             'is not supplied')
 
-        if token:
-            self.client.inject_token(token)
-
         if int_name:
             integrations = self.query(INTEGRATIONS_QUERY, skip_validation=True)
 
@@ -105,17 +228,43 @@ class GqlApi:
             if not self._valid_schemas:
                 raise GqlApiIntegrationNotFound(int_name)
 
+    @staticmethod
+    def _init_session(token):
+        # a session is thread safe and reuses pooled keep-alive connections,
+        # responses are gzip encoded as requests sets Accept-Encoding
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update({'Accept': 'application/json'})
+        if token:
+            session.headers['Authorization'] = token
+        return session
+
+    def _execute(self, query, variables=None):
+        data = {'query': query, 'variables': variables}
+        response = self.session.post(self.url, json=data)
+        if response.status_code >= 400:
+            logging.debug(['gql_error', response.text])
+        response.raise_for_status()
+        return response.text
+
     @retry(exceptions=GqlApiError, max_attempts=5, hook=capture_and_forget)
     def query(self, query, variables=None, skip_validation=False):
-        try:
-            # supress print on HTTP error
-            # https://github.com/prisma-labs/python-graphql-client
-            # /blob/master/graphqlclient/client.py#L32-L33
-            with open(os.devnull, 'w') as f, contextlib.redirect_stdout(f):
-                result_json = self.client.execute(query, variables)
-        except Exception as e:
-            raise GqlApiError(
-                'Could not connect to GraphQL server ({})'.format(e))
+        cache_key = None
+        result_json = None
+        if self.cache:
+            cache_key = self.cache.key(self.sha, query, variables)
+            result_json = self.cache.get(self.sha, cache_key)
+
+        if result_json is None:
+            try:
+                result_json = self._execute(query, variables)
+            except Exception as e:
+                raise GqlApiError(
+                    'Could not connect to GraphQL server ({})'.format(e))
+        else:
+            cache_key = None
 
         result = json.loads(result_json)
 
@@ -140,9 +289,18 @@ class GqlApi:
                 "`data` field missing from GraphQL"
                 "server response."))
 
+        # only successful responses are cached
+        if cache_key:
+            self.cache.set(self.sha, cache_key, result_json)
+
         return result['data']
 
     def get_resource(self, path):
+        resource = self._resources.get(path)
+        if resource:
+            # callers modify the returned resource
+            return dict(resource)
+
         query = """
         query Resource($path: String) {
             resources: resources_v1 (path: $path) {
@@ -172,13 +330,63 @@ class GqlApi:
 
         return resources[0]
 
+    def get_resources(self, paths):
+        """ fetches many resources in as few requests as possible.
+        paths that are not found are omitted from the result.
+        fetched resources are kept for subsequent calls to get_resource. """
+        paths = list(dict.fromkeys(paths))
+        for i in range(0, len(paths), RESOURCES_BATCH_SIZE):
+            batch = paths[i:i + RESOURCES_BATCH_SIZE]
+            params = ', '.join(f'$p{n}: String' for n in range(len(batch)))
+            fields = '\n'.join(
+                f'r{n}: resources_v1 (path: $p{n}) '
+                '{ path content sha256sum }'
+                for n in range(len(batch)))
+            query = f'query Resources({params}) {{\n{fields}\n}}'
+            variables = {f'p{n}': path for n, path in enumerate(batch)}
+            try:
+                result = self.query(query, variables, skip_validation=True)
+            except GqlApiError as e:
+                if '409' in str(e):
+                    raise e
+                # fetch the batch one path at a time, so only the
+                # failing paths are missing
+                self._get_resources_one_by_one(batch)
+                continue
+            for resources in result.values():
+                if resources and len(resources) == 1:
+                    self._resources[resources[0]['path']] = resources[0]
+
+        return {path: dict(self._resources[path]) for path in paths
+                if path in self._resources}
+
+    def _get_resources_one_by_one(self, paths):
+        for path in paths:
+            try:
+                resource = self.get_resource(path)
+            except GqlGetResourceError:
+                # the error is raised again when the resource is used
+                continue
+            self._resources[path] = resource
+
     def get_queried_schemas(self):
         return list(self._queried_schemas)
 
 
-def init(url, token=None, integration=None, validate_schemas=False):
+def init(url, token=None, integration=None, validate_schemas=False,
+         sha=None):
     global _gqlapi
-    _gqlapi = GqlApi(url, token, integration, validate_schemas)
+    cache = None
+    if sha:
+        # the cache is kept between runs in the same process
+        cache = _cache or init_cache()
+        cache.evict(keep_sha=sha)
+    session = None
+    if _gqlapi is not None and _gqlapi.token == token:
+        # keep the connections to the server between runs
+        session = _gqlapi.session
+    _gqlapi = GqlApi(url, token, integration, validate_schemas,
+                     sha=sha, cache=cache, session=session)
     return _gqlapi
 
 
@@ -209,6 +417,7 @@ def init_from_config(sha_url=True, integration=None, validate_schemas=False,
     server = server_url.geturl()
 
     token = config['graphql'].get('token')
+    sha = None
     if sha_url:
         sha = get_sha(server_url, token)
         server = server_url._replace(path=f'/graphqlsha/{sha}').geturl()
@@ -220,7 +429,7 @@ def init_from_config(sha_url=True, integration=None, validate_schemas=False,
 
     if print_url:
         logging.info(f'using gql endpoint {server}')
-    return init(server, token, integration, validate_schemas)
+    return init(server, token, integration, validate_schemas, sha=sha)
 
 
 def get_api():
@@ -19,3 +19,29 @@ reconcile_time = Histogram(name='qontract_reconcile_function_'
                            labelnames=['name', 'integration'],
                            buckets=(60.0, 150.0, 300.0, 600.0, 1200.0, 1800.0,
                                     2400.0, 3000.0, float("inf")))
+
+vault_cache_hits = Counter(name='qontract_reconcile_vault_cache_hits_total',
+                           documentation='Vault secret reads served from '
+                                         'the cache',
+                           labelnames=['kv_version'])
+
+vault_cache_misses = Counter(name='qontract_reconcile_vault_cache_'
+                                  'misses_total',
+                             documentation='Vault secret reads sent '
+                                           'to Vault',
+                             labelnames=['kv_version'])
+
+validation_time_to_ready = Histogram(name='qontract_reconcile_validation_'
+                                          'time_to_ready_seconds',
+                                     documentation='Seconds for a deployed '
+                                                   'resource to become ready',
+                                     labelnames=['kind'],
+                                     buckets=(5.0, 15.0, 30.0, 60.0, 120.0,
+                                              300.0, 600.0, 1200.0, 2400.0,
+                                              float("inf")))
+
+mirror_copy_seconds = Histogram(name='qontract_reconcile_mirror_copy_seconds',
+                                documentation='Duration of an image copy',
+                                labelnames=['integration', 'registry'],
+                                buckets=(1.0, 5.0, 15.0, 30.0, 60.0, 120.0,
+                                         300.0, 600.0, float("inf")))
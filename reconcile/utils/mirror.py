@@ -0,0 +1,155 @@
+import logging
+import time
+
+from threading import Lock, Semaphore
+
+from sretoolbox.container.image import ImageComparisonError
+from sretoolbox.container.skopeo import SkopeoCmdError
+
+import reconcile.utils.threaded as threaded
+
+from reconcile.utils.metrics import mirror_copy_seconds
+from reconcile.utils.registry_cache import RegistryCache
+
+
+_LOG = logging.getLogger(__name__)
+
+
+class MirrorEngine:
+    """MirrorEngine mirrors container image repositories.
+
+    The repositories are compared concurrently, and the tags which are
+    out of sync are copied by a bounded pool of workers. The number of
+    concurrent copies from or to a registry is capped, and failed copies
+    are retried with a linear backoff.
+
+    :param integration: name of the calling integration, used in metrics
+    :param skopeo_cli: Skopeo client used to copy the images
+    :param registry_cache: RegistryCache shared with the caller
+    :param dry_run: do not compare manifests
+    :param thread_pool_size: number of concurrent comparisons and copies
+    :param registry_concurrency: concurrent copies per registry
+    :param max_attempts: attempts to copy an image
+    :param backoff: seconds to wait after the first failed attempt
+    """
+
+    def __init__(self, integration, skopeo_cli, registry_cache=None,
+                 dry_run=False, thread_pool_size=10, registry_concurrency=4,
+                 max_attempts=3, backoff=5):
+        self.integration = integration
+        self.skopeo_cli = skopeo_cli
+        self.registry_cache = registry_cache or RegistryCache()
+        self.dry_run = dry_run
+        self.thread_pool_size = thread_pool_size
+        self.registry_concurrency = registry_concurrency
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self._semaphores = {}
+        self._lock = Lock()
+
+    def repo_sync_tasks(self, repo, deep_sync=False):
+        """
+        Compares a repository with its mirror.
+
+        :param repo: dict with the downstream 'image', the upstream
+                     'mirror' image, the 'mirror_creds' and an optional
+                     'tag_filter' returning the tags to sync. any other
+                     key is copied to the tasks.
+        :param deep_sync: compare the manifests of the existing tags
+        :return: a copy task for each tag which is out of sync
+        """
+        image = repo['image']
+        image_mirror = repo['mirror']
+        tag_filter = repo.get('tag_filter')
+        extra = {k: v for k, v in repo.items()
+                 if k not in ['image', 'mirror', 'tag_filter']}
+
+        tasks = []
+        for tag in self.registry_cache.tags(image_mirror):
+            if tag_filter is not None and not tag_filter(tag):
+                continue
+
+            upstream = image_mirror[tag]
+            downstream = image[tag]
+            if self.registry_cache.has_tag(image, tag):
+                # Deep (slow) check only in non dry-run mode
+                # and only from time to time
+                if self.dry_run or not deep_sync:
+                    _LOG.debug('Image %s and mirror %s are in sync',
+                               downstream, upstream)
+                    continue
+
+                try:
+                    if downstream == upstream:
+                        _LOG.debug('Image %s and mirror %s are in sync',
+                                   downstream, upstream)
+                        continue
+                except ImageComparisonError as details:
+                    _LOG.error('[%s]', details)
+                    continue
+
+            _LOG.debug('Image %s and mirror %s are out of sync',
+                       downstream, upstream)
+            task = {'mirror_url': str(upstream),
+                    'image_url': str(downstream),
+                    'src_registry': upstream.registry,
+                    'dst_registry': downstream.registry}
+            task.update(extra)
+            tasks.append(task)
+
+        return tasks
+
+    def sync_tasks(self, repos, deep_sync=False):
+        results = threaded.run(self.repo_sync_tasks, repos,
+                               self.thread_pool_size, deep_sync=deep_sync)
+        return [task for tasks in results for task in tasks]
+
+    def _semaphore(self, registry):
+        with self._lock:
+            return self._semaphores.setdefault(
+                registry, Semaphore(self.registry_concurrency))
+
+    def copy(self, task):
+        """
+        Copies an image, holding a slot of its source and destination
+        registries, and retrying failed copies.
+
+        :param task: dict with the 'mirror_url', 'mirror_creds',
+                     'image_url' and 'dest_creds'
+        :return: True if the image was copied
+        """
+        # semaphores are always acquired in the same order
+        registries = sorted({task['src_registry'], task['dst_registry']})
+        semaphores = [self._semaphore(r) for r in registries]
+        for attempt in range(1, self.max_attempts + 1):
+            for semaphore in semaphores:
+                semaphore.acquire()
+            start = time.monotonic()
+            try:
+                self.skopeo_cli.copy(src_image=task['mirror_url'],
+                                     src_creds=task['mirror_creds'],
+                                     dst_image=task['image_url'],
+                                     dest_creds=task['dest_creds'])
+                break
+            except SkopeoCmdError as details:
+                if attempt == self.max_attempts:
+                    _LOG.error('[%s]', details)
+                    return False
+                _LOG.debug('[%s] retrying', details)
+            finally:
+                for semaphore in reversed(semaphores):
+                    semaphore.release()
+            time.sleep(self.backoff * attempt)
+
+        if not self.dry_run:
+            mirror_copy_seconds.labels(
+                integration=self.integration,
+                registry=task['dst_registry']).observe(
+                    time.monotonic() - start)
+        return True
+
+    def run(self, tasks):
+        """copies the images of the tasks concurrently,
+        returns the number of failed copies."""
+        results = threaded.run(self.copy, tasks, self.thread_pool_size)
+        return results.count(False)
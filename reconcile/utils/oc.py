@@ -1,6 +1,7 @@
 import json
 import logging
 import os
+import ssl
 import tempfile
 import time
 
@@ -9,6 +10,8 @@ from functools import wraps
 from subprocess import Popen, PIPE
 from threading import Lock
 
+import requests
+
 from sretoolbox.utils import retry
 
 import reconcile.utils.threaded as threaded
@@ -19,6 +22,15 @@ from reconcile.status import RunningState
 from reconcile.utils.metrics import reconcile_time
 
 
+# any authenticated user is allowed to create a SelfSubjectAccessReview
+SELF_SUBJECT_ACCESS_REVIEW = {
+    'apiVersion': 'authorization.k8s.io/v1',
+    'kind': 'SelfSubjectAccessReview',
+    'spec': {'resourceAttributes': {'verb': 'get',
+                                    'resource': 'namespaces'}},
+}
+
+
 class StatusCodeError(Exception):
     pass
 
@@ -177,10 +189,7 @@ class OC:
             self.get_version()
         self.init_projects = init_projects
         if self.init_projects:
-            self.projects = \
-                [p['metadata']['name']
-                 for p
-                 in self.get_all('Project.project.openshift.io')['items']]
+            self.projects = self.get_project_names()
         self.init_api_resources = init_api_resources
         if self.init_api_resources:
             self.api_resources = self.get_api_resources()
@@ -197,6 +206,17 @@ class OC:
     def whoami(self):
         return self._run(['whoami'])
 
+    def self_subject_access_review(self):
+        """ checks that the token is valid with an authenticated request
+        which does not require any permission. """
+        cmd = ['create', '-f', '-', '-o', 'json']
+        result = self._run(cmd, stdin=json.dumps(SELF_SUBJECT_ACCESS_REVIEW))
+        return json.loads(result)
+
+    def get_project_names(self):
+        return [p['metadata']['name']
+                for p in self.get_all('Project.project.openshift.io')['items']]
+
     def cleanup(self):
         if hasattr(self, 'jump_host') and \
                 isinstance(self.jump_host, JumpHostSSH):
@@ -225,15 +245,11 @@ class OC:
 
         resource_names = kwargs.get('resource_names')
         if resource_names:
-            items = []
-            for resource_name in resource_names:
-                resource_cmd = cmd + [resource_name]
-                item = self._run_json(resource_cmd, allow_not_found=True)
-                if item:
-                    items.append(item)
-            items_list = {'items': items}
-        else:
-            items_list = self._run_json(cmd)
+            # fetch all named resources in a single call
+            cmd.extend(resource_names)
+            return self._get_items_ignore_not_found(cmd)
+
+        items_list = self._run_json(cmd)
 
         items = items_list.get('items')
         if items is None:
@@ -241,6 +257,42 @@ class OC:
 
         return items
 
+    def get_namespace_items(self, namespace, kinds=None,
+                            resource_names=None):
+        """ get items of multiple kinds from a namespace at once.
+        kinds: kinds to list all items of.
+        resource_names: a dictionary of kind to the names of
+                        the items to get of that kind.
+        results in at most one call for kinds and one for resource_names. """
+        cmd = ['get', '-o', 'json']
+        # for cluster scoped integrations
+        # currently only openshift-clusterrolebindings
+        if namespace != 'cluster':
+            if not self.project_exists(namespace):
+                return []
+            cmd.extend(['-n', namespace])
+
+        items = []
+        if kinds:
+            items_list = self._run_json(cmd + [','.join(kinds)])
+            items.extend(items_list['items'])
+        if resource_names:
+            names_cmd = cmd + [f'{kind}/{name}'
+                               for kind, names in resource_names.items()
+                               for name in names]
+            items.extend(self._get_items_ignore_not_found(names_cmd))
+        return items
+
+    def _get_items_ignore_not_found(self, cmd):
+        cmd = cmd + ['--ignore-not-found']
+        result = self._run_json(cmd, allow_not_found=True)
+        # a single item is returned as is, multiple items as a List
+        if not result:
+            return []
+        if result.get('kind') == 'List':
+            return result['items']
+        return [result]
+
     def get(self, namespace, kind, name=None, allow_not_found=False):
         cmd = ['get', '-o', 'json', kind]
         if name:
@@ -304,6 +356,52 @@ class OC:
         resource = {'kind': kind, 'metadata': {'name': name}}
         return self._msg_to_process_reconcile_time(namespace, resource)
 
+    def watch(self, namespace, kind, name, timeout):
+        """ yields the states of a resource as it changes, for up to
+        timeout seconds. the oc binary output can not be streamed, so
+        only the current state is yielded. """
+        yield self.get(namespace, kind, name=name)
+
+    @staticmethod
+    def _managed_versions(items, names=None, integration=None):
+        """ filters (name, resourceVersion, integration annotation)
+        tuples to the named items and the items of an integration. """
+        if names is None and integration is None:
+            return {name: version for name, version, _ in items}
+        names = names or set()
+        return {name: version for name, version, item_integration in items
+                if name in names or
+                (integration and item_integration == integration)}
+
+    def get_resource_versions(self, namespace, kind, names=None,
+                              integration=None):
+        """ returns the resourceVersion of the items of a kind
+        in a namespace by name, without fetching their content.
+        if names or integration are specified, only the named items
+        and the items annotated by the integration are returned. """
+        cmd = ['get', kind, '-o',
+               'jsonpath={range .items[*]}{.metadata.name}{" "}'
+               '{.metadata.resourceVersion}{" "}'
+               '{.metadata.annotations.qontract\\.integration}'
+               '{"\\n"}{end}']
+        if namespace != 'cluster':
+            if not self.project_exists(namespace):
+                return {}
+            cmd.extend(['-n', namespace])
+        # an empty list has no output, which is not an error
+        out = self._run(cmd, allow_not_found=True)
+        if isinstance(out, bytes):
+            out = out.decode('utf-8')
+        items = []
+        for line in out.splitlines():
+            fields = line.split(' ', 2)
+            if len(fields) < 2:
+                continue
+            name, version = fields[0], fields[1]
+            item_integration = fields[2] if len(fields) > 2 else ''
+            items.append((name, version, item_integration))
+        return self._managed_versions(items, names, integration)
+
     def project_exists(self, name):
         if self.init_projects:
             return name in self.projects
@@ -597,22 +695,7 @@ class OC:
         if code != 0:
             err = err.decode('utf-8')
             if kwargs.get('apply'):
-                if 'Invalid value: 0x0' in err:
-                    raise InvalidValueApplyError(f"[{self.server}]: {err}")
-                if 'Invalid value: ' in err:
-                    if ': field is immutable' in err:
-                        raise FieldIsImmutableError(f"[{self.server}]: {err}")
-                    if ': may not change once set' in err:
-                        raise MayNotChangeOnceSetError(
-                            f"[{self.server}]: {err}")
-                    if ': primary clusterIP can not be unset' in err:
-                        raise PrimaryClusterIPCanNotBeUnsetError(
-                            f"[{self.server}]: {err}")
-                if 'metadata.annotations: Too long' in err:
-                    raise MetaDataAnnotationsTooLongApplyError(
-                        f"[{self.server}]: {err}")
-                if 'UnsupportedMediaType' in err:
-                    raise UnsupportedMediaTypeError(f"[{self.server}]: {err}")
+                self._raise_apply_error(err)
             if not (allow_not_found and 'NotFound' in err):
                 raise StatusCodeError(f"[{self.server}]: {err}")
 
@@ -624,6 +707,24 @@ class OC:
 
         return out.strip()
 
+    def _raise_apply_error(self, err):
+        if 'Invalid value: 0x0' in err:
+            raise InvalidValueApplyError(f"[{self.server}]: {err}")
+        if 'Invalid value: ' in err:
+            if ': field is immutable' in err:
+                raise FieldIsImmutableError(f"[{self.server}]: {err}")
+            if ': may not change once set' in err:
+                raise MayNotChangeOnceSetError(
+                    f"[{self.server}]: {err}")
+            if ': primary clusterIP can not be unset' in err:
+                raise PrimaryClusterIPCanNotBeUnsetError(
+                    f"[{self.server}]: {err}")
+        if 'metadata.annotations: Too long' in err:
+            raise MetaDataAnnotationsTooLongApplyError(
+                f"[{self.server}]: {err}")
+        if 'UnsupportedMediaType' in err:
+            raise UnsupportedMediaTypeError(f"[{self.server}]: {err}")
+
     def _run_json(self, cmd, allow_not_found=False):
         out = self._run(cmd, allow_not_found=allow_not_found)
 
@@ -635,6 +736,543 @@ class OC:
         return out_json
 
 
+def system_ca_bundle():
+    """ returns the CA bundle of the system, which the oc binary trusts,
+    to be used instead of the one shipped with requests (certifi). """
+    paths = ssl.get_default_verify_paths()
+    for path in [paths.cafile, paths.openssl_cafile]:
+        if path and os.path.isfile(path):
+            return path
+    if paths.capath and os.path.isdir(paths.capath):
+        return paths.capath
+    return True
+
+
+class OCNative(OC):
+    """OCNative is an OC client which talks to the API server directly
+    over a pooled HTTP session instead of forking the oc binary.
+
+    The most frequently used methods (get, get_items, apply, delete, etc)
+    are implemented on top of the Kubernetes REST API. Any other method
+    falls back to the oc binary through the OC base class.
+    """
+
+    FIELD_MANAGER = 'qontract-reconcile'
+    # the field manager of `oc apply` (client-side apply)
+    CLIENT_SIDE_APPLY_MANAGER = 'kubectl-client-side-apply'
+    LIST_CHUNK_SIZE = 500
+    METADATA_ONLY_ACCEPT = \
+        'application/json;as=PartialObjectMetadataList;g=meta.k8s.io;v=v1,' \
+        'application/json'
+
+    def __init__(self, server, token, settings=None,
+                 init_projects=False, init_api_resources=False,
+                 pool_size=10):
+        self.server = server
+        self._session = requests.Session()
+        # trust the same certificates as oc does
+        self._session.verify = system_ca_bundle()
+        self._session.headers.update({
+            'Authorization': f'Bearer {token}',
+            'Accept': 'application/json',
+        })
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1,
+                                                pool_maxsize=pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._discovery_lock = Lock()
+        self._group_versions = {}
+        self._resources = None
+        # objects listed with client-side apply managed fields
+        self._client_side_applied = set()
+        self._client_side_applied_lock = Lock()
+        super().__init__(server, token, settings=settings,
+                         init_projects=init_projects,
+                         init_api_resources=init_api_resources)
+
+    def cleanup(self):
+        super().cleanup()
+        self._session.close()
+
+    @retry(exceptions=(requests.exceptions.RequestException),
+           max_attempts=10)
+    def _send(self, method, path, **kwargs):
+        response = self._session.request(method, self.server + path,
+                                         **kwargs)
+        if response.status_code >= 500:
+            response.raise_for_status()
+        return response
+
+    def _request(self, method, path, apply=False, allow_not_found=False,
+                 **kwargs):
+        try:
+            response = self._send(method, path, **kwargs)
+        except requests.exceptions.RequestException as e:
+            raise StatusCodeError(f"[{self.server}]: {e}")
+
+        if response.ok:
+            try:
+                return response.json()
+            except ValueError as e:
+                raise JSONParsingError(response.text + "\n" + str(e))
+
+        # try to get the same error message the oc binary would print
+        try:
+            status = response.json()
+            reason = status.get('reason') or response.reason
+            message = status.get('message') or response.text
+        except ValueError:
+            reason = response.reason
+            message = response.text
+        err = f"Error from server ({reason}): {message}"
+        if apply:
+            self._raise_apply_error(err)
+        if response.status_code == 404:
+            if allow_not_found:
+                return {}
+            err = f"Error from server (NotFound): {message}"
+        raise StatusCodeError(f"[{self.server}]: {err}")
+
+    def _get_group_version_resources(self, group_version):
+        with self._discovery_lock:
+            resources = self._group_versions.get(group_version)
+            if resources is not None:
+                return resources
+        prefix = '/api' if group_version == 'v1' else '/apis'
+        result = self._request('GET', f'{prefix}/{group_version}',
+                               allow_not_found=True)
+        resources = [dict(r, groupVersion=group_version)
+                     for r in result.get('resources', [])
+                     if '/' not in r['name']]
+        with self._discovery_lock:
+            self._group_versions[group_version] = resources
+        return resources
+
+    def _discover_resources(self):
+        """ returns all resources served by the preferred version
+        of each API group, in the priority order of the server. """
+        if self._resources is not None:
+            return self._resources
+        group_versions = ['v1']
+        groups = self._request('GET', '/apis').get('groups', [])
+        group_versions.extend(g['preferredVersion']['groupVersion']
+                              for g in groups)
+        resources = []
+        for group_version in group_versions:
+            resources.extend(self._get_group_version_resources(group_version))
+        self._resources = resources
+        return resources
+
+    def _resolve(self, kind, api_version=None):
+        """ finds the API resource of a kind as accepted by the oc binary:
+        Kind, plural name, short name or any of those suffixed with
+        the API group (and optionally version), e.g.
+        Project.project.openshift.io """
+        if api_version is not None:
+            for r in self._get_group_version_resources(api_version):
+                if r['kind'] == kind:
+                    return r
+        name = kind.lower()
+        for r in self._discover_resources():
+            group, _, version = r['groupVersion'].rpartition('/')
+            names = [r['kind'].lower(), r['name'], r.get('singularName')] + \
+                r.get('shortNames', [])
+            for n in filter(None, names):
+                if name in (n, f'{n}.{group}', f'{n}.{version}.{group}'):
+                    return r
+        raise StatusCodeError(
+            f"[{self.server}]: error: the server doesn't have "
+            f"a resource type \"{kind}\"")
+
+    @staticmethod
+    def _path(resource, namespace=None, name=None):
+        group_version = resource['groupVersion']
+        prefix = '/api' if group_version == 'v1' else '/apis'
+        path = f'{prefix}/{group_version}'
+        if resource['namespaced'] and namespace is not None:
+            path += f'/namespaces/{namespace}'
+        path += f"/{resource['name']}"
+        if name:
+            path += f'/{name}'
+        return path
+
+    def _list(self, resource, namespace=None, labels=None, headers=None):
+        params = {'limit': self.LIST_CHUNK_SIZE}
+        if labels:
+            params['labelSelector'] = \
+                ','.join(f'{k}={v}' for k, v in labels.items())
+        path = self._path(resource, namespace=namespace)
+        items = []
+        while True:
+            result = self._request('GET', path, params=params,
+                                   headers=headers)
+            for item in result.get('items', []):
+                # list items do not contain the kind and apiVersion
+                item.setdefault('kind', resource['kind'])
+                item.setdefault('apiVersion', resource['groupVersion'])
+                self._record_client_side_applied(resource, item)
+                items.append(item)
+            params['continue'] = result.get('metadata', {}).get('continue')
+            if not params['continue']:
+                break
+        return {'apiVersion': 'v1', 'kind': 'List', 'items': items}
+
+    def get_items(self, kind, **kwargs):
+        resource = self._resolve(kind)
+        namespace = None
+        if 'namespace' in kwargs:
+            namespace = kwargs['namespace']
+            # for cluster scoped integrations
+            # currently only openshift-clusterrolebindings
+            if namespace == 'cluster':
+                namespace = None
+            elif not self.project_exists(namespace):
+                return []
+
+        resource_names = kwargs.get('resource_names')
+        if resource_names:
+            items = []
+            for resource_name in resource_names:
+                item = self._request(
+                    'GET',
+                    self._path(resource, namespace, resource_name),
+                    allow_not_found=True)
+                if item:
+                    self._record_client_side_applied(resource, item)
+                    items.append(item)
+            return items
+
+        return self._list(resource, namespace=namespace,
+                          labels=kwargs.get('labels'))['items']
+
+    def watch(self, namespace, kind, name, timeout):
+        resource = self._resolve(kind)
+        path = self._path(resource, namespace=namespace)
+        # the first events are the current state of the resource
+        params = {'watch': 'true',
+                  'fieldSelector': f'metadata.name={name}',
+                  'timeoutSeconds': max(int(timeout), 1)}
+        try:
+            response = self._session.get(self.server + path, params=params,
+                                         stream=True, timeout=timeout + 10)
+        except requests.exceptions.RequestException as e:
+            raise StatusCodeError(f"[{self.server}]: {e}")
+        with response:
+            if not response.ok:
+                raise StatusCodeError(
+                    f"[{self.server}]: Error from server "
+                    f"({response.reason}): {response.text}")
+            try:
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    event = json.loads(line)
+                    if event.get('type') in ['ADDED', 'MODIFIED']:
+                        yield event['object']
+            except requests.exceptions.RequestException:
+                # the server closed the stream
+                return
+
+    def get_resource_versions(self, namespace, kind, names=None,
+                              integration=None):
+        resource = self._resolve(kind)
+        if namespace == 'cluster':
+            namespace = None
+        elif not self.project_exists(namespace):
+            return {}
+        # only request the metadata of the items
+        headers = {'Accept': self.METADATA_ONLY_ACCEPT}
+        items = self._list(resource, namespace=namespace,
+                           headers=headers)['items']
+        return self._managed_versions(
+            [(item['metadata']['name'],
+              item['metadata']['resourceVersion'],
+              (item['metadata'].get('annotations') or {})
+              .get('qontract.integration'))
+             for item in items],
+            names, integration)
+
+    def get_namespace_items(self, namespace, kinds=None,
+                            resource_names=None):
+        # there is no multi-kind list in the REST API, but all requests
+        # share the same pooled connection to the API server
+        if namespace == 'cluster':
+            namespace = None
+        elif not self.project_exists(namespace):
+            return []
+        items = []
+        for kind in kinds or []:
+            items.extend(self._list(self._resolve(kind),
+                                    namespace=namespace)['items'])
+        for kind, names in (resource_names or {}).items():
+            resource = self._resolve(kind)
+            for name in names:
+                item = self._request('GET',
+                                     self._path(resource, namespace, name),
+                                     allow_not_found=True)
+                if item:
+                    self._record_client_side_applied(resource, item)
+                    items.append(item)
+        return items
+
+    def get(self, namespace, kind, name=None, allow_not_found=False):
+        resource = self._resolve(kind)
+        # oc uses the default namespace if none is specified
+        namespace = namespace or 'default'
+        if not name:
+            return self._list(resource, namespace=namespace)
+        return self._request('GET', self._path(resource, namespace, name),
+                             allow_not_found=allow_not_found)
+
+    def get_all(self, kind, all_namespaces=False):
+        namespace = None if all_namespaces else 'default'
+        return self._list(self._resolve(kind), namespace=namespace)
+
+    def _resolve_body(self, body):
+        return self._resolve(body['kind'], api_version=body['apiVersion'])
+
+    def remove_last_applied_configuration(self, namespace, kind, name):
+        patch = {'metadata': {'annotations': {
+            'kubectl.kubernetes.io/last-applied-configuration': None}}}
+        self._request('PATCH',
+                      self._path(self._resolve(kind), namespace, name),
+                      data=json.dumps(patch),
+                      headers={'Content-Type':
+                               'application/merge-patch+json'})
+
+    @staticmethod
+    def _merge_fields(fields, other):
+        for k, v in other.items():
+            fields[k] = OCNative._merge_fields(fields.get(k) or {}, v)
+        return fields
+
+    @classmethod
+    def upgrade_managed_fields(cls, managed_fields):
+        """ hands the fields owned by client-side apply over to the
+        server-side apply field manager, as `kubectl apply --server-side`
+        does when migrating an object from client-side apply.
+        otherwise, fields removed from the desired state would still be
+        owned by the client-side apply manager and kept on the object.
+        returns None if there is nothing to upgrade. """
+        csa = [e for e in managed_fields
+               if e.get('manager') == cls.CLIENT_SIDE_APPLY_MANAGER
+               and e.get('operation') == 'Update']
+        if not csa:
+            return None
+        others = [e for e in managed_fields if e not in csa]
+        ssa = [e for e in others
+               if e.get('manager') == cls.FIELD_MANAGER
+               and e.get('operation') == 'Apply']
+        fields = {}
+        for e in csa + ssa:
+            cls._merge_fields(fields, e.get('fieldsV1') or {})
+        upgraded = dict(ssa[0] if ssa else csa[0],
+                        manager=cls.FIELD_MANAGER, operation='Apply',
+                        fieldsType='FieldsV1', fieldsV1=fields)
+        return [e for e in others if e not in ssa] + [upgraded]
+
+    @staticmethod
+    def _object_key(resource, namespace, name):
+        # any version of the resource refers to the same object
+        group = resource['groupVersion'].rpartition('/')[0]
+        if not resource['namespaced']:
+            namespace = None
+        return (group, resource['name'], namespace, name)
+
+    def _record_client_side_applied(self, resource, item):
+        metadata = item.get('metadata') or {}
+        managed_fields = metadata.get('managedFields') or []
+        if self.upgrade_managed_fields(managed_fields) is None:
+            return
+        key = self._object_key(resource, metadata.get('namespace'),
+                               metadata.get('name'))
+        with self._client_side_applied_lock:
+            self._client_side_applied.add(key)
+
+    def _upgrade_client_side_apply(self, resource, namespace, name):
+        """ migrates an object which was listed with client-side apply
+        managed fields. other objects are not requested again. """
+        key = self._object_key(resource, namespace, name)
+        with self._client_side_applied_lock:
+            if key not in self._client_side_applied:
+                return
+            self._client_side_applied.discard(key)
+        path = self._path(resource, namespace, name)
+        current = self._request('GET', path, allow_not_found=True)
+        metadata = current.get('metadata') or {}
+        managed_fields = \
+            self.upgrade_managed_fields(metadata.get('managedFields') or [])
+        if managed_fields is None:
+            return
+        # the upgrade fails if the object changed in the meantime
+        patch = [
+            {'op': 'test', 'path': '/metadata/resourceVersion',
+             'value': metadata['resourceVersion']},
+            {'op': 'replace', 'path': '/metadata/managedFields',
+             'value': managed_fields},
+        ]
+        self._request('PATCH', path, data=json.dumps(patch),
+                      headers={'Content-Type': 'application/json-patch+json'})
+
+    @OCDecorators.process_reconcile_time
+    def apply(self, namespace, resource):
+        # server-side apply. clusters that do not support it
+        # respond with UnsupportedMediaType, in which case the caller
+        # is expected to fall back to create/replace.
+        api_resource = self._resolve_body(resource.body)
+        path = self._path(api_resource, namespace, resource.name)
+        # objects applied with the oc binary are migrated first
+        self._upgrade_client_side_apply(api_resource, namespace,
+                                        resource.name)
+        self._request('PATCH', path, apply=True,
+                      params={'fieldManager': self.FIELD_MANAGER,
+                              'force': 'true'},
+                      data=resource.toJSON(),
+                      headers={'Content-Type':
+                               'application/apply-patch+yaml'})
+        return self._msg_to_process_reconcile_time(namespace, resource.body)
+
+    @OCDecorators.process_reconcile_time
+    def create(self, namespace, resource):
+        path = self._path(self._resolve_body(resource.body), namespace)
+        self._request('POST', path, apply=True, data=resource.toJSON(),
+                      headers={'Content-Type': 'application/json'})
+        return self._msg_to_process_reconcile_time(namespace, resource.body)
+
+    @OCDecorators.process_reconcile_time
+    def replace(self, namespace, resource):
+        path = self._path(self._resolve_body(resource.body),
+                          namespace, resource.name)
+        self._request('PUT', path, apply=True, data=resource.toJSON(),
+                      headers={'Content-Type': 'application/json'})
+        return self._msg_to_process_reconcile_time(namespace, resource.body)
+
+    @OCDecorators.process_reconcile_time
+    def delete(self, namespace, kind, name):
+        path = self._path(self._resolve(kind), namespace, name)
+        self._request('DELETE', path,
+                      data=json.dumps({'propagationPolicy': 'Background'}),
+                      headers={'Content-Type': 'application/json'})
+        resource = {'kind': kind, 'metadata': {'name': name}}
+        return self._msg_to_process_reconcile_time(namespace, resource)
+
+    def get_api_resources(self):
+        return [r['kind'] for r in self._discover_resources()]
+
+    def get_version(self):
+        return self._request('GET', '/version', timeout=10)
+
+    def self_subject_access_review(self):
+        return self._request(
+            'POST',
+            '/apis/authorization.k8s.io/v1/selfsubjectaccessreviews',
+            data=json.dumps(SELF_SUBJECT_ACCESS_REVIEW),
+            headers={'Content-Type': 'application/json'}, timeout=10)
+
+
+class OCClientPool:
+    """OCClientPool keeps OC clients between the runs of an integration
+    in a long running process (daemon mode).
+
+    Clients are keyed by the parts of the cluster definition they are
+    built from, including the path and version of their token, so a
+    client is rebuilt if its cluster definition changed, without reading
+    its token again. Clients are rebuilt after ttl seconds, and health
+    checked with an authenticated request when they are reused after
+    health_check_interval seconds, so a revoked token is replaced.
+    The jump host tunnel of a client is kept with the client.
+    """
+
+    def __init__(self, ttl=3600, health_check_interval=300):
+        self.ttl = ttl
+        self.health_check_interval = health_check_interval
+        self._clients = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def key(cluster_info, jump_host, *args):
+        # the token reference includes its version, if any
+        return json.dumps([cluster_info['name'],
+                           cluster_info['serverUrl'],
+                           cluster_info.get('automationToken'),
+                           jump_host, *args],
+                          sort_keys=True)
+
+    def _healthy(self, entry, now):
+        if now - entry['checked'] < self.health_check_interval:
+            return True
+        try:
+            entry['client'].self_subject_access_review()
+        except Exception as e:
+            logging.debug(f"pooled client of {entry['client'].server} "
+                          f"is unhealthy: {e}")
+            return False
+        entry['checked'] = now
+        return True
+
+    def get(self, key, build):
+        """ returns the pooled client for key, or a client built
+        with build() if there is no usable pooled client. """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._clients.pop(key, None)
+        if entry:
+            if now - entry['created'] < self.ttl and \
+                    self._healthy(entry, now):
+                client = entry['client']
+                if client.init_projects:
+                    client.projects = client.get_project_names()
+                entry['used'] = now
+                with self._lock:
+                    self._clients[key] = entry
+                return client
+            entry['client'].cleanup()
+
+        client = build()
+        with self._lock:
+            self._clients[key] = {'client': client, 'created': now,
+                                  'checked': now, 'used': now}
+        return client
+
+    def expire(self):
+        """ cleans up clients which were not used within ttl seconds,
+        e.g. clients of clusters which were removed. """
+        now = time.monotonic()
+        with self._lock:
+            expired = [k for k, e in self._clients.items()
+                       if now - e['used'] >= self.ttl]
+            entries = [self._clients.pop(k) for k in expired]
+        for entry in entries:
+            entry['client'].cleanup()
+
+    def clear(self):
+        with self._lock:
+            entries = list(self._clients.values())
+            self._clients = {}
+        for entry in entries:
+            entry['client'].cleanup()
+
+
+_client_pool = None
+
+
+def init_client_pool(ttl=3600, health_check_interval=300):
+    global _client_pool
+    _client_pool = OCClientPool(ttl, health_check_interval)
+    return _client_pool
+
+
+def native_client_enabled(integration):
+    """ returns True if USE_NATIVE_CLIENT enables the OCNative client
+    for all integrations or for this one. """
+    value = os.environ.get('USE_NATIVE_CLIENT', '')
+    if value.lower() in ['true', 'yes']:
+        return True
+    integrations = [i.strip() for i in value.split(',')]
+    return bool(integration) and \
+        integration.replace('_', '-') in integrations
+
+
 class OC_Map:
     """OC_Map gets a GraphQL query results list as input
     and initiates a dictionary of OC clients per cluster.
@@ -643,12 +1281,21 @@ class OC_Map:
 
     In case a cluster does not have an automation token
     the OC client will be initiated to False.
+
+    If use_native_client is set, clusters which are not accessed through
+    a jump host will be initiated with an OCNative client. By default,
+    it is set if USE_NATIVE_CLIENT is set to true, or to a comma separated
+    list of integrations which includes the calling integration.
+
+    If a client pool is initiated (see init_client_pool), clients are
+    taken from the pool and are kept on cleanup.
     """
 
     def __init__(self, clusters=None, namespaces=None,
                  integration='', e2e_test='', settings=None,
                  internal=None, use_jump_host=True, thread_pool_size=1,
-                 init_projects=False, init_api_resources=False):
+                 init_projects=False, init_api_resources=False,
+                 use_native_client=None):
         self.oc_map = {}
         self.calling_integration = integration
         self.calling_e2e_test = e2e_test
@@ -658,6 +1305,10 @@ class OC_Map:
         self.thread_pool_size = thread_pool_size
         self.init_projects = init_projects
         self.init_api_resources = init_api_resources
+        if use_native_client is None:
+            use_native_client = native_client_enabled(integration)
+        self.use_native_client = use_native_client
+        self._pooled = set()
         self._lock = Lock()
 
         if clusters and namespaces:
@@ -692,17 +1343,37 @@ class OC_Map:
                                  " has no automation token"))
         else:
             server_url = cluster_info['serverUrl']
-            secret_reader = SecretReader(settings=self.settings)
-            token = secret_reader.read(automation_token)
             if self.use_jump_host:
                 jump_host = cluster_info.get('jumpHost')
             else:
                 jump_host = None
+            native = self.use_native_client and jump_host is None
+
+            def build():
+                secret_reader = SecretReader(settings=self.settings)
+                token = secret_reader.read(automation_token)
+                if native:
+                    return OCNative(
+                        server_url, token,
+                        settings=self.settings,
+                        init_projects=self.init_projects,
+                        init_api_resources=self.init_api_resources,
+                        pool_size=self.thread_pool_size)
+                return OC(server_url, token, jump_host,
+                          settings=self.settings,
+                          init_projects=self.init_projects,
+                          init_api_resources=self.init_api_resources)
+
             try:
-                oc_client = OC(server_url, token, jump_host,
-                               settings=self.settings,
-                               init_projects=self.init_projects,
-                               init_api_resources=self.init_api_resources)
+                if _client_pool is None:
+                    oc_client = build()
+                else:
+                    key = _client_pool.key(cluster_info, jump_host, native,
+                                           self.init_projects,
+                                           self.init_api_resources)
+                    oc_client = _client_pool.get(key, build)
+                    with self._lock:
+                        self._pooled.add(cluster)
                 self.set_oc(cluster, oc_client)
             except StatusCodeError as e:
                 self.set_oc(cluster,
@@ -740,8 +1411,9 @@ class OC_Map:
         return [k for k, v in self.oc_map.items() if v]
 
     def cleanup(self):
-        for oc in self.oc_map.values():
-            if oc:
+        for cluster, oc in self.oc_map.items():
+            # pooled clients are cleaned up by the pool
+            if oc and cluster not in self._pooled:
                 oc.cleanup()
 
 
@@ -1,9 +1,15 @@
 import logging
+import time
+
+from threading import Lock
 
 import requests
 
+from requests.adapters import HTTPAdapter
 from sretoolbox.utils import retry
 
+import reconcile.utils.threaded as threaded
+
 from reconcile.utils.secret_reader import SecretReader
 
 
@@ -13,6 +19,11 @@ AMS_API_BASE = '/api/accounts_mgmt'
 CS_API_BASE = '/api/clusters_mgmt'
 KAS_API_BASE = '/api/managed-services-api'
 
+# number of items requested per page of list requests
+PAGE_SIZE = 100
+# fraction of the access token lifetime after which it is refreshed
+ACCESS_TOKEN_REFRESH_RATIO = 0.8
+
 
 class OCM:
     """
@@ -26,19 +37,34 @@ class OCM:
     :type access_token_client_id: string
     :type access_token_url: string
     :type offline_token: string
+
+    Requests share a pool of keep-alive connections and are safe to
+    make from multiple threads. The access token is refreshed before
+    it expires, and list requests are transparently paginated.
     """
     def __init__(self, url, access_token_client_id, access_token_url,
-                 offline_token, skip_provision_shards=True):
+                 offline_token, skip_provision_shards=True,
+                 thread_pool_size=10):
         """Initiates access token and gets clusters information."""
         self.url = url
         self.access_token_client_id = access_token_client_id
         self.access_token_url = access_token_url
         self.offline_token = offline_token
+        self.thread_pool_size = thread_pool_size
+        self._init_session()
         self._init_access_token()
-        self._init_request_headers()
         self._init_clusters(skip_provision_shards=skip_provision_shards)
         self._init_addons()
 
+    def _init_session(self):
+        self._session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1,
+                              pool_maxsize=self.thread_pool_size)
+        self._session.mount('https://', adapter)
+        self._session.mount('http://', adapter)
+        self._access_token_lock = Lock()
+        self._access_token_refresh_time = None
+
     @retry()
     def _init_access_token(self):
         data = {
@@ -46,25 +72,45 @@ class OCM:
             'client_id': self.access_token_client_id,
             'refresh_token': self.offline_token
         }
-        r = requests.post(self.access_token_url, data=data)
+        request_time = time.monotonic()
+        r = self._session.post(self.access_token_url, data=data,
+                               headers={'Authorization': None})
         r.raise_for_status()
-        self.access_token = r.json().get('access_token')
+        token = r.json()
+        self.access_token = token.get('access_token')
+        self._init_request_headers()
+        expires_in = token.get('expires_in')
+        self._access_token_refresh_time = \
+            request_time + expires_in * ACCESS_TOKEN_REFRESH_RATIO \
+            if expires_in else None
 
     def _init_request_headers(self):
         self.headers = {
             "Authorization": f"Bearer {self.access_token}",
             "accept": "application/json",
         }
+        self._session.headers.update(self.headers)
+
+    def _ensure_access_token(self):
+        refresh_time = self._access_token_refresh_time
+        if refresh_time is None or time.monotonic() < refresh_time:
+            return
+        with self._access_token_lock:
+            # another thread may have refreshed the token meanwhile
+            if self._access_token_refresh_time == refresh_time:
+                self._init_access_token()
 
     def _init_clusters(self, skip_provision_shards):
         api = f'{CS_API_BASE}/v1/clusters'
         clusters = self._get_json(api)['items']
         self.cluster_ids = {c['name']: c['id'] for c in clusters}
-        self.clusters = {
-            c['name']: self._get_cluster_ocm_spec(c, skip_provision_shards)
-            for c in clusters if c['managed']
-            and c['state'] == STATUS_READY
-        }
+        ready_clusters = [c for c in clusters
+                          if c['managed'] and c['state'] == STATUS_READY]
+        ocm_specs = threaded.run(self._get_cluster_ocm_spec, ready_clusters,
+                                 self.thread_pool_size,
+                                 skip_provision_shards=skip_provision_shards)
+        self.clusters = {c['name']: ocm_spec
+                         for c, ocm_spec in zip(ready_clusters, ocm_specs)}
         self.not_ready_clusters = [c['name'] for c in clusters
                                    if c['managed']
                                    and c['state'] != STATUS_READY]
@@ -729,15 +775,36 @@ class OCM:
         self._post(api, data)
 
     @retry(max_attempts=10)
-    def _get_json(self, api):
-        r = requests.get(f"{self.url}{api}", headers=self.headers)
+    def _get_page(self, api, params=None):
+        self._ensure_access_token()
+        r = self._session.get(f"{self.url}{api}", params=params)
         r.raise_for_status()
         return r.json()
 
+    def _get_json(self, api):
+        result = self._get_page(api)
+        if result.get('kind', '').endswith('List') and \
+                'page' in result and 'total' in result:
+            # list responses are paginated, fetch all the items
+            items = result.get('items') or []
+            size = len(items) or PAGE_SIZE
+            page = result['page']
+            while len(items) < result['total']:
+                page += 1
+                next_page = self._get_page(
+                    api, params={'page': page, 'size': size})
+                next_items = next_page.get('items')
+                if not next_items:
+                    break
+                items.extend(next_items)
+            result['items'] = items
+            result['size'] = len(items)
+        return result
+
     def _post(self, api, data=None, params=None):
-        r = requests.post(
+        self._ensure_access_token()
+        r = self._session.post(
             f"{self.url}{api}",
-            headers=self.headers,
             json=data,
             params=params
         )
@@ -751,9 +818,9 @@ class OCM:
         return r.json()
 
     def _patch(self, api, data, params=None):
-        r = requests.patch(
+        self._ensure_access_token()
+        r = self._session.patch(
             f"{self.url}{api}",
-            headers=self.headers,
             json=data,
             params=params,
         )
@@ -764,7 +831,8 @@ class OCM:
             raise e
 
     def _delete(self, api):
-        r = requests.delete(f"{self.url}{api}", headers=self.headers)
+        self._ensure_access_token()
+        r = self._session.delete(f"{self.url}{api}")
         r.raise_for_status()
 
 
@@ -783,53 +851,57 @@ class OCMMap:
     :param integration: Name of calling integration.
                         Used to disable integrations.
     :param settings: App Interface settings
+    :param thread_pool_size: number of OCM instances to initiate
+                             in parallel, and of concurrent requests
+                             per OCM instance
     :type clusters: list
     :type namespaces: list
     :type integration: string
     :type settings: dict
+    :type thread_pool_size: int
     """
     def __init__(self, clusters=None, namespaces=None,
                  integration='', settings=None,
-                 skip_provision_shards=True):
+                 skip_provision_shards=True, thread_pool_size=10):
         """Initiates OCM instances for each OCM referenced in a cluster."""
         self.clusters_map = {}
         self.ocm_map = {}
         self.calling_integration = integration
         self.settings = settings
+        self.thread_pool_size = thread_pool_size
 
         if clusters and namespaces:
             raise KeyError('expected only one of clusters or namespaces.')
         elif clusters:
-            for cluster_info in clusters:
-                self.init_ocm_client(cluster_info, skip_provision_shards)
+            cluster_infos = clusters
         elif namespaces:
-            for namespace_info in namespaces:
-                cluster_info = namespace_info['cluster']
-                self.init_ocm_client(cluster_info, skip_provision_shards)
+            cluster_infos = [namespace_info['cluster']
+                             for namespace_info in namespaces]
         else:
             raise KeyError('expected one of clusters or namespaces.')
 
-    def init_ocm_client(self, cluster_info, skip_provision_shards):
+        ocm_infos = {}
+        for cluster_info in cluster_infos:
+            if self.cluster_disabled(cluster_info):
+                continue
+            ocm_info = cluster_info['ocm']
+            # pointer from each cluster to its referenced OCM instance
+            self.clusters_map[cluster_info['name']] = ocm_info['name']
+            ocm_infos.setdefault(ocm_info['name'], ocm_info)
+        threaded.run(self.init_ocm_client, ocm_infos.values(),
+                     self.thread_pool_size,
+                     skip_provision_shards=skip_provision_shards)
+
+    def init_ocm_client(self, ocm_info, skip_provision_shards):
         """
         Initiate OCM client.
         Gets the OCM information and initiates an OCM client.
-        Skip initiating OCM if it has already been initialized or if
-        the current integration is disabled on it.
 
-        :param cluster_info: Graphql cluster query result
+        :param ocm_info: Graphql OCM query result
 
-        :type cluster_info: dict
+        :type ocm_info: dict
         """
-        if self.cluster_disabled(cluster_info):
-            return
-        cluster_name = cluster_info['name']
-        ocm_info = cluster_info['ocm']
         ocm_name = ocm_info['name']
-        # pointer from each cluster to its referenced OCM instance
-        self.clusters_map[cluster_name] = ocm_name
-        if self.ocm_map.get(ocm_name):
-            return
-
         access_token_client_id = ocm_info.get('accessTokenClientId')
         access_token_url = ocm_info.get('accessTokenUrl')
         ocm_offline_token = ocm_info.get('offlineToken')
@@ -841,7 +913,8 @@ class OCMMap:
             token = secret_reader.read(ocm_offline_token)
             self.ocm_map[ocm_name] = \
                 OCM(url, access_token_client_id, access_token_url, token,
-                    skip_provision_shards=skip_provision_shards)
+                    skip_provision_shards=skip_provision_shards,
+                    thread_pool_size=self.thread_pool_size)
 
     def cluster_disabled(self, cluster_info):
         """
@@ -871,6 +944,27 @@ class OCMMap:
         ocm = self.clusters_map[cluster]
         return self.ocm_map.get(ocm, None)
 
+    def get_for_clusters(self, method, clusters, **kwargs):
+        """Calls an OCM method that takes a cluster name (such as
+        get_machine_pools) for many clusters concurrently,
+        through the OCM instance of each cluster.
+
+        :param method: name of the method to call
+        :param clusters: cluster names
+
+        :type method: string
+        :type clusters: list
+
+        :return: a dictionary of results per cluster name
+        """
+        results = threaded.run(self._get_for_cluster, clusters,
+                               self.thread_pool_size,
+                               method=method, **kwargs)
+        return dict(zip(clusters, results))
+
+    def _get_for_cluster(self, cluster, method, **kwargs):
+        return getattr(self.get(cluster), method)(cluster, **kwargs)
+
     def clusters(self):
         """Get list of cluster names initiated in the OCM map."""
         return [k for k, v in self.clusters_map.items() if v]
@@ -31,6 +31,10 @@ IGNORABLE_DATA_FIELDS = ['service-ca.crt']
 
 
 class OpenshiftResource:
+    __slots__ = ['_body', 'integration', 'integration_version',
+                 'error_details', 'caller_name',
+                 '_canonical_body', '_sha256sum']
+
     def __init__(self, body, integration, integration_version,
                  error_details='', caller_name=None):
         self.body = body
@@ -40,6 +44,27 @@ class OpenshiftResource:
         self.caller_name = caller_name
         self.verify_valid_k8s_object()
 
+    @property
+    def body(self):
+        return self._body
+
+    @body.setter
+    def body(self, body):
+        self._body = body
+        # canonical body and sha256sum are calculated lazily and only
+        # reset here, so the body must be replaced instead of mutated
+        self._canonical_body = None
+        self._sha256sum = None
+
+    @property
+    def canonical_body(self):
+        """ canonical form of the body, calculated once.
+        shares all the fields which are not changed by canonicalize
+        with body, so it must not be mutated. """
+        if self._canonical_body is None:
+            self._canonical_body = self.canonicalize(self.body)
+        return self._canonical_body
+
     def __eq__(self, other):
         return self.obj_intersect_equal(self.body, other.body)
 
@@ -154,11 +179,15 @@ class OpenshiftResource:
     def kind(self):
         return self.body['kind']
 
+    @property
+    def annotations(self):
+        return self.body['metadata']['annotations']
+
     @property
     def caller(self):
         try:
             return self.caller_name or \
-                self.body['metadata']['annotations']['qontract.caller_name']
+                self.annotations['qontract.caller_name']
         except KeyError:
             return None
 
@@ -207,7 +236,7 @@ class OpenshiftResource:
 
     def has_qontract_annotations(self):
         try:
-            annotations = self.body['metadata']['annotations']
+            annotations = self.annotations
 
             assert annotations['qontract.integration'] == self.integration
 
@@ -228,8 +257,7 @@ class OpenshiftResource:
 
     def has_valid_sha256sum(self):
         try:
-            current_sha256sum = \
-                self.body['metadata']['annotations']['qontract.sha256sum']
+            current_sha256sum = self.annotations['qontract.sha256sum']
             return current_sha256sum == self.sha256sum()
         except KeyError:
             return False
@@ -244,19 +272,14 @@ class OpenshiftResource:
                 annotations.
         """
 
-        # calculate sha256sum of canonical body
-        canonical_body = self.canonicalize(self.body)
-        sha256sum = self.calculate_sha256sum(self.serialize(canonical_body))
-
-        # create new body object
-        body = copy.deepcopy(self.body)
-
-        # create annotations if not present
-        body['metadata'].setdefault('annotations', {})
-        if body['metadata']['annotations'] is None:
-            body['metadata']['annotations'] = {}
+        sha256sum = self.sha256sum()
 
-        annotations = body['metadata']['annotations']
+        # create new body object. only the annotations are changed,
+        # so all other fields are shared with the current body.
+        body = dict(self.body)
+        body['metadata'] = dict(body['metadata'])
+        annotations = dict(body['metadata'].get('annotations') or {})
+        body['metadata']['annotations'] = annotations
 
         # add qontract annotations
         annotations['qontract.integration'] = self.integration
@@ -268,27 +291,33 @@ class OpenshiftResource:
         if self.caller_name:
             annotations['qontract.caller_name'] = self.caller_name
 
-        return OpenshiftResource(body, self.integration,
-                                 self.integration_version)
+        # the annotated resource has the same name, kind and canonical
+        # body, so there is no need to validate or canonicalize it again
+        annotated = copy.copy(self)
+        annotated.body = body
+        annotated._canonical_body = self._canonical_body
+        annotated._sha256sum = sha256sum
+        return annotated
 
     def sha256sum(self):
-        body = self.annotate().body
-
-        annotations = body['metadata']['annotations']
-        return annotations['qontract.sha256sum']
+        if self._sha256sum is None:
+            self._sha256sum = self.calculate_sha256sum(
+                self.serialize(self.canonical_body))
+        return self._sha256sum
 
     def toJSON(self):
         return self.serialize(self.body)
 
     @staticmethod
     def canonicalize(body):
-        body = copy.deepcopy(body)
+        # only copy the parts of the body which are changed,
+        # large fields such as data are shared with the input body
+        body = dict(body)
+        body['metadata'] = dict(body['metadata'])
 
         # create annotations if not present
-        body['metadata'].setdefault('annotations', {})
-        if body['metadata']['annotations'] is None:
-            body['metadata']['annotations'] = {}
-        annotations = body['metadata']['annotations']
+        annotations = dict(body['metadata'].get('annotations') or {})
+        body['metadata']['annotations'] = annotations
 
         # remove openshift specific params
         body['metadata'].pop('creationTimestamp', None)
@@ -314,6 +343,7 @@ class OpenshiftResource:
             annotations.pop('deployment.kubernetes.io/revision', None)
 
         if body['kind'] == 'Route':
+            body['spec'] = dict(body['spec'])
             if body['spec'].get('wildcardPolicy') == 'None':
                 body['spec'].pop('wildcardPolicy')
             # remove tls-acme specific params from Route
@@ -325,7 +355,7 @@ class OpenshiftResource:
                     'kubernetes.io/tls-acme-awaiting-authorization-at-url',
                     None)
                 if 'tls' in body['spec']:
-                    tls = body['spec']['tls']
+                    tls = body['spec']['tls'] = dict(body['spec']['tls'])
                     tls.pop('key', None)
                     tls.pop('certificate', None)
             subdomain = body['spec'].get('subdomain', None)
@@ -344,12 +374,13 @@ class OpenshiftResource:
                 body.pop('secrets')
 
         if body['kind'] == 'Role':
+            body['rules'] = [dict(rule) for rule in body['rules']]
             for rule in body['rules']:
                 if 'resources' in rule:
-                    rule['resources'].sort()
+                    rule['resources'] = sorted(rule['resources'])
 
                 if 'verbs' in rule:
-                    rule['verbs'].sort()
+                    rule['verbs'] = sorted(rule['verbs'])
 
                 if 'attributeRestrictions' in rule and \
                         not rule['attributeRestrictions']:
@@ -367,7 +398,7 @@ class OpenshiftResource:
             if 'userNames' in body:
                 body.pop('userNames')
             if 'roleRef' in body:
-                roleRef = body['roleRef']
+                roleRef = body['roleRef'] = dict(body['roleRef'])
                 if 'namespace' in roleRef:
                     roleRef.pop('namespace')
                 if 'apiGroup' in roleRef and \
@@ -375,6 +406,7 @@ class OpenshiftResource:
                     roleRef.pop('apiGroup')
                 if 'kind' in roleRef:
                     roleRef.pop('kind')
+            body['subjects'] = [dict(s) for s in body['subjects']]
             for subject in body['subjects']:
                 if 'namespace' in subject:
                     subject.pop('namespace')
@@ -393,7 +425,7 @@ class OpenshiftResource:
             if 'userNames' in body:
                 body.pop('userNames')
             if 'roleRef' in body:
-                roleRef = body['roleRef']
+                roleRef = body['roleRef'] = dict(body['roleRef'])
                 if 'apiGroup' in roleRef and \
                         roleRef['apiGroup'] in body['apiVersion']:
                     roleRef.pop('apiGroup')
@@ -402,7 +434,7 @@ class OpenshiftResource:
             if 'groupNames' in body:
                 body.pop('groupNames')
         if body['kind'] == 'Service':
-            spec = body['spec']
+            spec = body['spec'] = dict(body['spec'])
             if spec.get('sessionAffinity') == 'None':
                 spec.pop('sessionAffinity')
             if spec.get('type') == 'ClusterIP':
@@ -428,42 +460,153 @@ class OpenshiftResource:
         return m.hexdigest()
 
 
-class ResourceInventory:
+class CompactOpenshiftResource(OpenshiftResource):
+    """ an OpenshiftResource which only keeps the name, kind, qontract
+    annotations and sha256sum of a current resource. it is only used for
+    resources which match their desired resource by a valid sha256sum,
+    so their body is not needed to reconcile them. """
+    __slots__ = ['_name', '_kind', '_annotations']
+
+    def __init__(self, resource):
+        self.integration = resource.integration
+        self.integration_version = resource.integration_version
+        self.error_details = resource.error_details
+        self.caller_name = resource.caller_name
+        self._name = resource.name
+        self._kind = resource.kind
+        annotations = resource.body['metadata'].get('annotations')
+        if annotations is not None:
+            annotations = {k: v for k, v in annotations.items()
+                           if k.startswith('qontract.')}
+        self._annotations = annotations
+        self._sha256sum = resource.sha256sum()
+        self._canonical_body = None
+        self._body = None
+
+    def __eq__(self, other):
+        # d_item == c_item is uncommutative. python calls the __eq__ of a
+        # subclass first, so defer to the __eq__ of the other (desired)
+        # resource to keep comparing the desired resource to this one.
+        return NotImplemented
+
+    @property
+    def body(self):
+        metadata = {'name': self._name}
+        if self._annotations is not None:
+            metadata['annotations'] = self._annotations
+        return {'kind': self._kind, 'metadata': metadata}
+
+    @property
+    def name(self):
+        return self._name
+
+    @property
+    def kind(self):
+        return self._kind
+
+    @property
+    def annotations(self):
+        if self._annotations is None:
+            raise KeyError('annotations')
+        return self._annotations
+
+
+class ResourceTypeInventory:
+    __slots__ = ['current', 'desired']
+
     def __init__(self):
+        self.current = {}
+        self.desired = {}
+
+    def __getitem__(self, key):
+        # allow data['current'] and data['desired']
+        return getattr(self, key)
+
+
+class ResourceInventory:
+    """ inventory of current and desired resources per
+    cluster, namespace and resource type.
+
+    each cluster is guarded by its own lock, so threads adding
+    resources to different clusters do not block each other.
+
+    with compact_current, the body of a current resource is dropped
+    once it is known to match its desired resource by a valid
+    sha256sum, which is what realize_data checks before anything else. """
+    def __init__(self, compact_current=False):
         self._clusters = {}
+        self._cluster_locks = {}
         self._error_registered = False
         self._error_registered_clusters = {}
         self._lock = Lock()
+        self.compact_current = compact_current
 
     def initialize_resource_type(self, cluster, namespace, resource_type):
-        self._clusters.setdefault(cluster, {})
-        self._clusters[cluster].setdefault(namespace, {})
-        self._clusters[cluster][namespace].setdefault(resource_type, {
-            'current': {},
-            'desired': {}
-        })
+        with self._lock:
+            namespaces = self._clusters.setdefault(cluster, {})
+            lock = self._cluster_locks.setdefault(cluster, Lock())
+        with lock:
+            resource_types = namespaces.setdefault(namespace, {})
+            if resource_type not in resource_types:
+                resource_types[resource_type] = ResourceTypeInventory()
+
+    def remove_resource_type(self, cluster, namespace, resource_type):
+        lock = self._cluster_locks.get(cluster)
+        if lock is None:
+            return
+        with lock:
+            resource_types = self._clusters[cluster].get(namespace, {})
+            resource_types.pop(resource_type, None)
+
+    def _get(self, cluster, namespace, resource_type):
+        try:
+            return self._clusters[cluster][namespace][resource_type]
+        except KeyError:
+            return None
 
     def add_desired(self, cluster, namespace, resource_type, name, value):
-        with self._lock:
-            try:
-                desired = \
-                    (self._clusters[cluster][namespace][resource_type]
-                        ['desired'])
-            except KeyError:
+        lock = self._cluster_locks.get(cluster)
+        if lock is None:
+            return None
+        if self.compact_current:
+            # calculated outside of the lock, the result is cached
+            value.sha256sum()
+        with lock:
+            data = self._get(cluster, namespace, resource_type)
+            if data is None:
                 return None
-            if name in desired:
+            if name in data.desired:
                 raise ResourceKeyExistsError(name)
-            desired[name] = value
+            data.desired[name] = value
+            if self.compact_current:
+                self._compact_current(data, name)
 
     def add_current(self, cluster, namespace, resource_type, name, value):
-        with self._lock:
-            try:
-                current = \
-                    (self._clusters[cluster][namespace][resource_type]
-                        ['current'])
-            except KeyError:
+        lock = self._cluster_locks.get(cluster)
+        if lock is None:
+            return None
+        if self.compact_current:
+            # calculated outside of the lock, the result is cached
+            value.sha256sum()
+        with lock:
+            data = self._get(cluster, namespace, resource_type)
+            if data is None:
                 return None
-            current[name] = value
+            data.current[name] = value
+            if self.compact_current:
+                self._compact_current(data, name)
+
+    @staticmethod
+    def _compact_current(data, name):
+        current = data.current.get(name)
+        desired = data.desired.get(name)
+        if current is None or desired is None or \
+                isinstance(current, CompactOpenshiftResource):
+            return
+        if current.has_qontract_annotations() and \
+                current.sha256sum() == desired.sha256sum() and \
+                current.has_valid_sha256sum():
+            data.current[name] = CompactOpenshiftResource(current)
 
     def __iter__(self):
         for cluster in self._clusters:
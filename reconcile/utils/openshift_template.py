@@ -0,0 +1,192 @@
+import copy
+import json
+import random
+import re
+import string
+
+
+# the same expressions used by `oc process`
+STRING_PARAMETER_RE = re.compile(r'\$\{([a-zA-Z0-9_]+?)\}')
+NON_STRING_PARAMETER_RE = re.compile(r'^\$\{\{([a-zA-Z0-9_]+)\}\}$')
+GENERATOR_RE = re.compile(r'\[([a-zA-Z0-9\-\\]+)\](\{(\w+)\})')
+RANGE_RE = re.compile(r'([\\]?[a-zA-Z0-9]\-?[a-zA-Z0-9]?)')
+
+ALPHABET = string.ascii_lowercase + string.ascii_uppercase
+NUMERALS = string.digits
+SYMBOLS = "~!@#$%^&*()-_+={}[]\\|<,>.?/\"';:`"
+ASCII = ALPHABET + NUMERALS + SYMBOLS
+SPECIAL_RANGES = {
+    '\\w': ALPHABET + NUMERALS + '_',
+    '\\d': NUMERALS,
+    '\\a': ALPHABET + NUMERALS,
+    '\\A': SYMBOLS,
+}
+MAX_GENERATED_LENGTH = 255
+
+
+class TemplateProcessingError(Exception):
+    pass
+
+
+def _expression_alphabet(ranges):
+    alphabet = ''
+    for match in RANGE_RE.finditer(ranges):
+        expression = match.group(0)
+        first, last = expression[0], expression[-1]
+        special = SPECIAL_RANGES.get(first + last)
+        if special is not None:
+            alphabet += special
+            continue
+        start = ASCII.find(first)
+        end = ASCII.rfind(last)
+        if start < 0 or end < 0 or start > end:
+            raise TemplateProcessingError(
+                f"invalid range specified: {first}-{last}")
+        alphabet += ASCII[start:end + 1]
+    # remove duplicates, keeping the order
+    return ''.join(dict.fromkeys(alphabet))
+
+
+def generate_expression_value(expression, rand=random.SystemRandom()):
+    """generates a value from an `expression` generator, replacing
+    each `[range]{length}` construct with random characters of the
+    range, e.g. "[a-zA-Z0-9]{8}" or "test[\\d]{4}"."""
+    value = expression
+    while True:
+        match = GENERATOR_RE.search(value)
+        if match is None:
+            return value
+        ranges = match.group(1)
+        if not RANGE_RE.match(ranges):
+            raise TemplateProcessingError(
+                f"malformed expression syntax: {ranges}")
+        try:
+            length = int(match.group(3))
+        except ValueError:
+            length = 0
+        if not 0 < length <= MAX_GENERATED_LENGTH:
+            raise TemplateProcessingError(
+                f"range must be within [1-{MAX_GENERATED_LENGTH}] "
+                f"characters ({length})")
+        alphabet = _expression_alphabet(ranges)
+        generated = ''.join(rand.choice(alphabet) for _ in range(length))
+        value = value[:match.start()] + generated + value[match.end():]
+
+
+def _parameter_values(template, parameters, ignore_unknown_parameters):
+    template_parameters = copy.deepcopy(template.get('parameters') or [])
+    by_name = {p['name']: p for p in template_parameters}
+
+    unknown = []
+    for name, value in parameters.items():
+        parameter = by_name.get(name)
+        if parameter is None:
+            unknown.append(name)
+            continue
+        # a provided value is never generated
+        parameter['value'] = str(value)
+        parameter.pop('generate', None)
+    if unknown and not ignore_unknown_parameters:
+        raise TemplateProcessingError(
+            f"unknown parameter names: {', '.join(sorted(unknown))}")
+
+    values = {}
+    for index, parameter in enumerate(template_parameters):
+        name = parameter['name']
+        value = parameter.get('value')
+        value = '' if value is None else str(value)
+        generate = parameter.get('generate')
+        if not value and generate:
+            if generate != 'expression':
+                raise TemplateProcessingError(
+                    f"template.parameters[{index}]: "
+                    f"unknown generator: {generate}")
+            if not parameter.get('from'):
+                raise TemplateProcessingError(
+                    f"template.parameters[{index}]: "
+                    f"generator {generate} requires 'from'")
+            value = generate_expression_value(parameter['from'])
+        if not value and parameter.get('required'):
+            raise TemplateProcessingError(
+                f"template.parameters[{index}]: parameter {name} "
+                f"is required and must be specified")
+        values[name] = value
+
+    return values
+
+
+def substitute(value, values):
+    """substitutes the parameter references in a string.
+
+    returns the new value and whether it is still a string. A value
+    that is exactly "${{PARAM}}" is replaced by the parameter value,
+    to be parsed as JSON, otherwise each "${PARAM}" reference is
+    replaced.
+    References to unknown parameters are left in place."""
+    match = NON_STRING_PARAMETER_RE.match(value)
+    if match and match.group(1) in values:
+        return values[match.group(1)], False
+
+    def replace(match):
+        name = match.group(1)
+        return values[name] if name in values else match.group(0)
+
+    return STRING_PARAMETER_RE.sub(replace, value), True
+
+
+def _substitute_object(obj, values):
+    if isinstance(obj, dict):
+        # keys are substituted as strings, as `oc process` does
+        return {substitute(k, values)[0]: _substitute_object(v, values)
+                for k, v in obj.items()}
+    if isinstance(obj, list):
+        return [_substitute_object(v, values) for v in obj]
+    if not isinstance(obj, str):
+        return obj
+    value, as_string = substitute(obj, values)
+    if as_string:
+        return value
+    try:
+        return json.loads(value)
+    except ValueError:
+        # `oc process` keeps values which are not valid JSON as strings
+        return value
+
+
+def process(template, parameters=None, ignore_unknown_parameters=True):
+    """process instantiates an OpenShift Template the way
+    `oc process --local` does, without forking a process.
+
+    :param template: Template object
+    :param parameters: parameter values overriding the template ones
+    :param ignore_unknown_parameters: ignore parameters which are
+                                      not defined in the template
+    :return: the list of instantiated objects
+    """
+    values = _parameter_values(template, parameters or {},
+                               ignore_unknown_parameters)
+
+    labels = {}
+    for k, v in (template.get('labels') or {}).items():
+        labels[substitute(k, values)[0]] = substitute(v, values)[0]
+
+    items = []
+    for obj in template.get('objects') or []:
+        metadata = obj.get('metadata') or {}
+        namespace = metadata.get('namespace')
+        # hardcoded namespaces are stripped, while namespaces
+        # referencing a parameter are kept
+        strip_namespace = isinstance(namespace, str) and bool(namespace) \
+            and not STRING_PARAMETER_RE.search(namespace)
+
+        item = _substitute_object(obj, values)
+        if strip_namespace:
+            item['metadata'].pop('namespace', None)
+        if labels:
+            item.setdefault('metadata', {})
+            item_labels = item['metadata'].get('labels') or {}
+            item_labels.update(labels)
+            item['metadata']['labels'] = item_labels
+        items.append(item)
+
+    return items
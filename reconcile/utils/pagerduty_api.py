@@ -1,8 +1,12 @@
 import datetime
 
+from threading import Lock
+
 import requests
 import pypd
 
+import reconcile.utils.threaded as threaded
+
 from reconcile.utils.secret_reader import SecretReader
 
 
@@ -11,18 +15,32 @@ class PagerDutyUserNotFoundException(Exception):
 
 
 class PagerDutyApi:
-    """Wrapper around PagerDuty API calls"""
+    """Wrapper around PagerDuty API calls.
+
+    The user directory is loaded once and indexed by id, and the users
+    of each schedule and escalation policy are fetched once per instance.
+    """
 
     def __init__(self, token, settings=None):
         secret_reader = SecretReader(settings=settings)
-        pd_api_key = secret_reader.read(token)
-        pypd.api_key = pd_api_key
+        # the api key is passed explicitly to every call, as instances
+        # with different tokens may be used concurrently
+        self.api_key = secret_reader.read(token)
+        self._resource_users = {}
+        self._lock = Lock()
         self.init_users()
 
     def init_users(self):
-        self.users = pypd.User.find()
+        self.users = pypd.User.find(api_key=self.api_key)
+        self._user_names = {user.id: user.email.split('@')[0]
+                            for user in self.users}
 
     def get_pagerduty_users(self, resource_type, resource_id):
+        key = (resource_type, resource_id)
+        with self._lock:
+            if key in self._resource_users:
+                return self._resource_users[key]
+
         now = datetime.datetime.utcnow()
 
         try:
@@ -31,21 +49,24 @@ class PagerDutyApi:
             elif resource_type == 'escalationPolicy':
                 users = self.get_escalation_policy_users(resource_id, now)
         except requests.exceptions.HTTPError:
-            return None
+            users = None
 
+        with self._lock:
+            self._resource_users[key] = users
         return users
 
     def get_user(self, user_id):
-        for user in self.users:
-            if user.id == user_id:
-                return user.email.split('@')[0]
-
-        # should never be reached as user_id comes from PagerDuty API itself
-        raise PagerDutyUserNotFoundException(user_id)
+        try:
+            return self._user_names[user_id]
+        except KeyError:
+            # should never be reached as user_id comes
+            # from PagerDuty API itself
+            raise PagerDutyUserNotFoundException(user_id)
 
     def get_schedule_users(self, schedule_id, now):
         s = pypd.Schedule.fetch(
             id=schedule_id,
+            api_key=self.api_key,
             since=now,
             until=now,
             time_zone='UTC')
@@ -56,6 +77,7 @@ class PagerDutyApi:
     def get_escalation_policy_users(self, escalation_policy_id, now):
         ep = pypd.EscalationPolicy.fetch(
             id=escalation_policy_id,
+            api_key=self.api_key,
             since=now,
             until=now,
             time_zone='UTC')
@@ -76,3 +98,57 @@ class PagerDutyApi:
                 # and next escalation is not 0 minutes from now
                 break
         return users
+
+
+class PagerDutyMap:
+    """PagerDutyMap initiates a PagerDutyApi instance per token,
+    so the user directory of each PagerDuty account is loaded once.
+
+    :param settings: App Interface settings
+    :param thread_pool_size: number of concurrent PagerDuty requests
+    """
+
+    def __init__(self, settings=None, thread_pool_size=10):
+        self.settings = settings
+        self.thread_pool_size = thread_pool_size
+        self.pd_apis = {}
+        self._locks = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _token_key(token):
+        return (token['path'], token['field'], token.get('version'))
+
+    def get(self, token):
+        key = self._token_key(token)
+        with self._lock:
+            lock = self._locks.setdefault(key, Lock())
+        with lock:
+            if key not in self.pd_apis:
+                self.pd_apis[key] = PagerDutyApi(token,
+                                                 settings=self.settings)
+        return self.pd_apis[key]
+
+    @staticmethod
+    def get_resource(pagerduty):
+        """returns the resource type and id of a pagerduty
+        schedule or escalation policy reference."""
+        if pagerduty['escalationPolicyID'] is not None:
+            return 'escalationPolicy', pagerduty['escalationPolicyID']
+        return 'schedule', pagerduty['scheduleID']
+
+    def get_pagerduty_users(self, pagerduty):
+        resource_type, resource_id = self.get_resource(pagerduty)
+        return self.get(pagerduty['token']).get_pagerduty_users(
+            resource_type, resource_id)
+
+    def prefetch(self, pagerduties):
+        """fetches the users of all the schedules and escalation
+        policies concurrently, once per unique reference."""
+        unique = {}
+        for pagerduty in pagerduties:
+            key = (self._token_key(pagerduty['token']),
+                   self.get_resource(pagerduty))
+            unique.setdefault(key, pagerduty)
+        threaded.run(self.get_pagerduty_users, unique.values(),
+                     self.thread_pool_size)
@@ -9,13 +9,28 @@ class RequestsException(Exception):
 
 class QuayApi:
     LIMIT_FOLLOWS = 15
+    RATE_LIMITED_ATTEMPTS = 3
 
-    def __init__(self, token, organization, base_url='quay.io'):
+    def __init__(self, token, organization, base_url='quay.io',
+                 rate_limiter=None):
         self.token = token
         self.organization = organization
         self.auth_header = {"Authorization": "Bearer %s" % (token,)}
         self.team_members = {}
         self.api_url = f"https://{base_url}/api/v1"
+        self.rate_limiter = rate_limiter
+
+    def _request(self, method, url, **kwargs):
+        if self.rate_limiter is None:
+            return requests.request(method, url, **kwargs)
+
+        for _ in range(self.RATE_LIMITED_ATTEMPTS):
+            self.rate_limiter.acquire()
+            r = requests.request(method, url, **kwargs)
+            self.rate_limiter.update_from_headers(r.headers)
+            if r.status_code != 429:
+                break
+        return r
 
     def list_team_members(self, team, **kwargs):
         if kwargs.get("cache"):
@@ -26,7 +41,7 @@ class QuayApi:
         url = "{}/organization/{}/team/{}/members?includePending=true".format(
             self.api_url, self.organization, team)
 
-        r = requests.get(url, headers=self.auth_header)
+        r = self._request('get', url, headers=self.auth_header)
         if r.status_code == 404:
             raise ValueError(f"team {team} is not found in "
                              f"org {self.organization}. "
@@ -49,7 +64,7 @@ class QuayApi:
 
     def user_exists(self, user):
         url = "{}/users/{}".format(self.api_url, user)
-        r = requests.get(url, headers=self.auth_header)
+        r = self._request('get', url, headers=self.auth_header)
         if not r.ok:
             return False
         return True
@@ -60,7 +75,7 @@ class QuayApi:
             team, user
         )
 
-        r = requests.delete(url_team, headers=self.auth_header)
+        r = self._request('delete', url_team, headers=self.auth_header)
         if not r.ok:
             message = r.json()['message']
 
@@ -73,7 +88,7 @@ class QuayApi:
         url_org = "{}/organization/{}/members/{}".format(
             self.api_url, self.organization, user)
 
-        r = requests.delete(url_org, headers=self.auth_header)
+        r = self._request('delete', url_org, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
 
@@ -85,7 +100,7 @@ class QuayApi:
 
         url = "{}/organization/{}/team/{}/members/{}".format(
             self.api_url, self.organization, team, user)
-        r = requests.put(url, headers=self.auth_header)
+        r = self._request('put', url, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
         return True
@@ -106,7 +121,7 @@ class QuayApi:
             params['next_page'] = page
 
         # perform request
-        r = requests.get(url, params=params, headers=self.auth_header)
+        r = self._request('get', url, params=params, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
 
@@ -140,7 +155,7 @@ class QuayApi:
         }
 
         # perform request
-        r = requests.post(url, json=params, headers=self.auth_header)
+        r = self._request('post', url, json=params, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
 
@@ -150,7 +165,7 @@ class QuayApi:
         )
 
         # perform request
-        r = requests.delete(url, headers=self.auth_header)
+        r = self._request('delete', url, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
 
@@ -166,7 +181,7 @@ class QuayApi:
         }
 
         # perform request
-        r = requests.put(url, json=params, headers=self.auth_header)
+        r = self._request('put', url, json=params, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
 
@@ -186,14 +201,14 @@ class QuayApi:
         }
 
         # perform request
-        r = requests.post(url, json=params, headers=self.auth_header)
+        r = self._request('post', url, json=params, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
 
     def get_repo_team_permissions(self, repo_name, team):
         url = f"{self.api_url}/repository/{self.organization}/" +\
               f"{repo_name}/permissions/team/{team}"
-        r = requests.get(url, headers=self.auth_header)
+        r = self._request('get', url, headers=self.auth_header)
         if not r.ok:
             message = r.json()['message']
             expected_message = "Team does not have permission for repo."
@@ -208,6 +223,6 @@ class QuayApi:
         url = f"{self.api_url}/repository/{self.organization}/" +\
               f"{repo_name}/permissions/team/{team}"
         body = {'role': role}
-        r = requests.put(url, json=body, headers=self.auth_header)
+        r = self._request('put', url, json=body, headers=self.auth_header)
         if not r.ok:
             raise RequestsException(r)
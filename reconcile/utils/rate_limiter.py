@@ -0,0 +1,97 @@
+import time
+
+from threading import Lock
+
+
+class TokenBucket:
+    """TokenBucket limits the rate of API calls shared by
+    concurrent threads.
+
+    The bucket is refilled at `rate` tokens per second up to `capacity`
+    tokens. Once the remaining quota reported by the service falls below
+    `floor`, the rate is lowered to spread the remaining quota until it
+    is reset, and calls are paused once it is exhausted. Above the floor,
+    the initial rate applies again.
+
+    :param rate: tokens added per second, None for no limit
+    :param capacity: maximum number of tokens (burst size)
+    :param floor: remaining quota below which the rate is lowered
+    """
+
+    def __init__(self, rate=10, capacity=10, floor=100):
+        self.base_rate = rate
+        self.rate = rate
+        self.capacity = capacity
+        self.floor = floor
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._paused_until = 0
+        self._lock = Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        if self.rate is None:
+            self._tokens = self.capacity
+        else:
+            self._tokens = min(self.capacity,
+                               self._tokens + elapsed * self.rate)
+        self._updated = now
+
+    def acquire(self):
+        """blocks until a token is available and consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now < self._paused_until:
+                    wait = self._paused_until - now
+                elif self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                else:
+                    wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """stops handing out tokens for the given number of seconds."""
+        with self._lock:
+            now = time.monotonic()
+            self._paused_until = max(self._paused_until, now + seconds)
+            self._tokens = 0
+
+    def update(self, remaining, reset_at):
+        """spreads the remaining quota of the service until its reset,
+        once it falls below the floor.
+
+        :param remaining: number of calls left in the current window
+        :param reset_at: epoch time at which the quota is reset
+        """
+        seconds = max(reset_at - time.time(), 1)
+        if remaining <= 0:
+            self.pause(seconds)
+            return
+        with self._lock:
+            self._refill(time.monotonic())
+            if remaining >= self.floor:
+                self.rate = self.base_rate
+                return
+            self.rate = remaining / seconds
+            self._tokens = min(self._tokens, remaining)
+
+    def update_from_headers(self, headers):
+        """honors the standard rate-limit response headers."""
+        retry_after = headers.get('Retry-After')
+        if retry_after is not None:
+            try:
+                self.pause(float(retry_after))
+            except ValueError:
+                pass
+
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset_at = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset_at is None:
+            return
+        try:
+            self.update(int(remaining), float(reset_at))
+        except ValueError:
+            pass
@@ -4,15 +4,79 @@ import requests
 from sretoolbox.utils import retry
 
 
+GRAPHQL_PAGE_SIZE = 100
+
+ORG_MEMBERS_QUERY = """
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    membersWithRole(first: %(page_size)d, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes { login }
+    }
+  }
+}
+""" % {'page_size': GRAPHQL_PAGE_SIZE}
+
+ORG_TEAMS_QUERY = """
+query($org: String!, $cursor: String) {
+  organization(login: $org) {
+    teams(first: %(page_size)d, after: $cursor) {
+      pageInfo { hasNextPage endCursor }
+      nodes {
+        name
+        slug
+        databaseId
+        members(first: %(page_size)d) {
+          pageInfo { hasNextPage endCursor }
+          nodes { login }
+        }
+        invitations(first: %(page_size)d) {
+          pageInfo { hasNextPage endCursor }
+          nodes { invitee { login } }
+        }
+      }
+    }
+  }
+}
+""" % {'page_size': GRAPHQL_PAGE_SIZE}
+
+TEAM_MEMBERS_QUERY = """
+query($org: String!, $slug: String!, $cursor: String) {
+  organization(login: $org) {
+    team(slug: $slug) {
+      members(first: %(page_size)d, after: $cursor) {
+        pageInfo { hasNextPage endCursor }
+        nodes { login }
+      }
+    }
+  }
+}
+""" % {'page_size': GRAPHQL_PAGE_SIZE}
+
+
+class GithubGraphQLError(Exception):
+    pass
+
+
+def graphql_url(base_url):
+    """returns the GraphQL endpoint matching a REST api url.
+    GitHub Enterprise serves REST under /api/v3 and GraphQL
+    under /api/graphql."""
+    if base_url.endswith('/v3'):
+        return base_url[:-len('/v3')] + '/graphql'
+    return base_url + '/graphql'
+
+
 class RawGithubApi:
     """
     REST based GH interface
 
     Unfortunately this needs to be used because PyGithub does not yet support
-    checking pending invitations
+    checking pending invitations nor the GraphQL API
     """
 
     BASE_URL = os.environ.get('GITHUB_API', 'https://api.github.com')
+    GRAPHQL_URL = graphql_url(BASE_URL)
     BASE_HEADERS = {
         'Accept': 'application/vnd.github.v3+json,'
         'application/vnd.github.dazzler-preview+json'
@@ -67,6 +131,72 @@ class RawGithubApi:
 
         return result
 
+    @retry()
+    def graphql(self, query, variables=None):
+        res = requests.post(self.GRAPHQL_URL,
+                            json={'query': query, 'variables': variables},
+                            headers=self.headers())
+        res.raise_for_status()
+        result = res.json()
+        if result.get('errors'):
+            raise GithubGraphQLError(result['errors'])
+        return result['data']
+
+    def _paginate(self, query, variables, get_connection, cursor=None):
+        """yields the nodes of a GraphQL connection, page by page."""
+        while True:
+            data = self.graphql(query, dict(variables, cursor=cursor))
+            connection = get_connection(data)
+            yield from connection['nodes']
+            if not connection['pageInfo']['hasNextPage']:
+                return
+            cursor = connection['pageInfo']['endCursor']
+
+    def org_members(self, org):
+        nodes = self._paginate(
+            ORG_MEMBERS_QUERY, {'org': org},
+            lambda data: data['organization']['membersWithRole'])
+        return [node['login'] for node in nodes]
+
+    def org_teams(self, org):
+        """returns the teams of an org with their members and
+        pending invitations.
+
+        Teams are fetched with their first page of members and
+        invitations in a single query per page of teams. Further
+        member pages are only queried for teams larger than a page.
+        """
+        teams = []
+        nodes = self._paginate(ORG_TEAMS_QUERY, {'org': org},
+                               lambda data: data['organization']['teams'])
+        for node in nodes:
+            members = node['members']
+            logins = [member['login'] for member in members['nodes']]
+            if members['pageInfo']['hasNextPage']:
+                more = self._paginate(
+                    TEAM_MEMBERS_QUERY,
+                    {'org': org, 'slug': node['slug']},
+                    lambda data: data['organization']['team']['members'],
+                    cursor=members['pageInfo']['endCursor'])
+                logins.extend(member['login'] for member in more)
+
+            invitations = node['invitations']
+            if invitations['pageInfo']['hasNextPage']:
+                invited = self.team_invitations(node['databaseId'])
+            else:
+                invited = [invitation['invitee']['login']
+                           for invitation in invitations['nodes']
+                           if invitation['invitee'] is not None]
+
+            teams.append({
+                'id': node['databaseId'],
+                'name': node['name'],
+                'members': logins,
+                'invitations': invited,
+            })
+
+        return teams
+
     def org_invitations(self, org):
         invitations = self.query('/orgs/{}/invitations'.format(org))
 
@@ -0,0 +1,86 @@
+import time
+
+from threading import Lock
+
+from requests import exceptions as rqexc
+
+
+class RegistryCache:
+    """RegistryCache caches the metadata of container images for a run.
+
+    Tags, digests and existence are fetched once per image and kept for
+    `ttl` seconds. Images that do not exist are kept for `negative_ttl`
+    seconds. Concurrent lookups of the same key wait for a single
+    registry round-trip.
+
+    Entries are keyed by image url and registry user, as registries may
+    answer differently depending on the credentials.
+
+    :param ttl: seconds to keep the metadata of existing images
+    :param negative_ttl: seconds to keep missing images
+    """
+
+    def __init__(self, ttl=300, negative_ttl=60):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._entries = {}
+        self._locks = {}
+        self._lock = Lock()
+
+    @staticmethod
+    def _repository_key(image):
+        return (image.registry, image.repository, image.image,
+                getattr(image, 'username', None))
+
+    @staticmethod
+    def _not_found(error):
+        response = getattr(error, 'response', None)
+        return response is not None and response.status_code == 404
+
+    def _get(self, key, fetch, negative=lambda value: value is False):
+        with self._lock:
+            lock = self._locks.setdefault(key, Lock())
+        with lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                _, value, error = entry
+                if error is not None:
+                    raise error
+                return value
+
+            value, error = None, None
+            try:
+                value = fetch()
+            except rqexc.HTTPError as e:
+                if not self._not_found(e):
+                    raise
+                error = e
+            ttl = self.negative_ttl \
+                if error is not None or negative(value) else self.ttl
+            self._entries[key] = (time.monotonic() + ttl, value, error)
+
+        if error is not None:
+            raise error
+        return value
+
+    def tags(self, image):
+        """returns the tags of the repository of an image."""
+        key = ('tags',) + self._repository_key(image)
+        return self._get(key, lambda: list(image))
+
+    def has_tag(self, image, tag):
+        key = ('tag_set',) + self._repository_key(image)
+        return tag in self._get(key, lambda: set(self.tags(image)),
+                                negative=lambda value: False)
+
+    def exists(self, image):
+        key = ('exists', str(image)) + self._repository_key(image)
+        return self._get(key, lambda: bool(image))
+
+    def digest(self, image):
+        key = ('digest', str(image)) + self._repository_key(image)
+        return self._get(key, lambda: image.digest)
+
+    def url_digest(self, image):
+        key = ('url_digest', str(image)) + self._repository_key(image)
+        return self._get(key, lambda: image.url_digest)
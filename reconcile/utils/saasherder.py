@@ -1,7 +1,13 @@
 import base64
+import hashlib
 import json
 import logging
 import os
+import re
+import tempfile
+
+from collections import OrderedDict
+from threading import Lock
 
 import yaml
 
@@ -10,16 +16,165 @@ from requests import exceptions as rqexc
 from sretoolbox.container import Image
 from sretoolbox.utils import retry
 
+import reconcile.utils.openshift_template as openshift_template
 import reconcile.utils.threaded as threaded
 
 from reconcile.github_org import get_config
 from reconcile.utils.mr.auto_promoter import AutoPromoter
 from reconcile.utils.oc import OC, StatusCodeError
 from reconcile.utils.openshift_resource import OpenshiftResource as OR
+from reconcile.utils.registry_cache import RegistryCache
 from reconcile.utils.secret_reader import SecretReader
 from reconcile.utils.state import State
 
 
+COMMIT_SHA_RE = re.compile(r'^[0-9a-f]{40}$')
+# templates are processed with `oc process` unless the in-process
+# engine is requested. it can become the default once the golden files
+# of test_openshift_template are verified against oc (test_matches_oc).
+PROCESS_TEMPLATES_IN_PROCESS = \
+    os.environ.get('PROCESS_TEMPLATES_IN_PROCESS', '').lower() \
+    in ['true', 'yes']
+
+
+class ContentCache:
+    """ContentCache is a content addressed cache of repository contents.
+
+    Entries are keyed by (repository url, commit sha, path). Resolved by
+    a commit sha, contents never change, so entries are never invalidated,
+    only evicted.
+
+    Entries are kept in memory (LRU, up to max_memory_size bytes) and,
+    if cache_dir is set, on disk (up to max_disk_size bytes), where they
+    are shared across integration runs. Files are written atomically and
+    their mtime is refreshed on every hit, so eviction removes the least
+    recently used ones. Eviction runs whenever a tenth of max_disk_size
+    was written, so the disk store stays bounded in long running processes.
+    """
+
+    def __init__(self, cache_dir=None,
+                 max_memory_size=64 * 1024 * 1024,
+                 max_disk_size=256 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_memory_size = max_memory_size
+        self.max_disk_size = max_disk_size
+        self._entries = OrderedDict()
+        self._size = 0
+        self._written = 0
+        self._lock = Lock()
+
+    @staticmethod
+    def key(kind, url, commit_sha, path):
+        data = json.dumps([kind, url, commit_sha, path])
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[:2], key)
+
+    def get(self, key):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                return value
+
+        if not self.cache_dir:
+            return None
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = f.read()
+            os.utime(path)
+        except OSError:
+            return None
+        self._set_memory(key, value)
+        return value
+
+    def set(self, key, value):
+        self._set_memory(key, value)
+        if not self.cache_dir:
+            return
+        key_dir = os.path.dirname(self._path(key))
+        try:
+            os.makedirs(key_dir, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=key_dir, prefix='.tmp-')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(value)
+            os.replace(tmp_path, self._path(key))
+        except OSError as e:
+            logging.debug(f'could not write content cache entry: {e}')
+            return
+        with self._lock:
+            self._written += len(value)
+            evict = self._written >= self.max_disk_size // 10
+            if evict:
+                self._written = 0
+        if evict:
+            self.evict()
+
+    def get_or_fetch(self, key, fetch):
+        value = self.get(key)
+        if value is None:
+            value = fetch()
+            if value is None:
+                return None
+            if isinstance(value, str):
+                value = value.encode('utf-8')
+            self.set(key, value)
+        return value
+
+    def _set_memory(self, key, value):
+        size = len(value)
+        if size > self.max_memory_size:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = value
+            self._size += size
+            while self._size > self.max_memory_size:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+    def evict(self):
+        """ removes the least recently used entries from disk
+        until the cache fits in max_disk_size. """
+        if not self.cache_dir or not os.path.isdir(self.cache_dir):
+            return
+        entries = []
+        total_size = 0
+        for key_dir in os.scandir(self.cache_dir):
+            if not key_dir.is_dir():
+                continue
+            for entry in os.scandir(key_dir.path):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, entry.path, stat.st_size))
+                total_size += stat.st_size
+        for _, path, size in sorted(entries):
+            if total_size <= self.max_disk_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total_size -= size
+
+
+def init_content_cache():
+    global _content_cache
+    cache_dir = os.environ.get('SAAS_CONTENT_CACHE_DIR')
+    max_size = int(os.environ.get('SAAS_CONTENT_CACHE_MAX_SIZE_MB', 256))
+    _content_cache = ContentCache(
+        cache_dir=cache_dir,
+        max_memory_size=max_size * 1024 * 1024 // 4,
+        max_disk_size=max_size * 1024 * 1024)
+    _content_cache.evict()
+    return _content_cache
+
+
+_content_cache = None
+
+
 class SaasHerder():
     """Wrapper around SaaS deployment actions."""
 
@@ -33,6 +188,18 @@ class SaasHerder():
                  accounts=None,
                  validate=False):
         self.saas_files = saas_files
+        # contents are shared across runs, while refs
+        # are resolved to commit shas once per run
+        if _content_cache is None:
+            init_content_cache()
+        else:
+            # the cache is kept between runs in daemon mode
+            _content_cache.evict()
+        self.content_cache = _content_cache
+        self._commit_shas = {}
+        self._commit_shas_lock = Lock()
+        # images are usually shared by many targets
+        self.registry_cache = RegistryCache()
         if validate:
             self._validate_saas_files()
             if not self.valid:
@@ -231,7 +398,6 @@ class SaasHerder():
 
             raise e
 
-    @retry()
     def _get_file_contents(self, options):
         url = options['url']
         path = options['path']
@@ -239,6 +405,19 @@ class SaasHerder():
         github = options['github']
         html_url = f"{url}/blob/{ref}{path}"
         commit_sha = self._get_commit_sha(options)
+        content = self._get_file_contents_cached(url, path, commit_sha,
+                                                 github)
+
+        return yaml.safe_load(content), html_url, commit_sha
+
+    def _get_file_contents_cached(self, url, path, commit_sha, github):
+        key = ContentCache.key('file', url, commit_sha, path)
+        return self.content_cache.get_or_fetch(
+            key,
+            lambda: self._fetch_file_contents(url, path, commit_sha, github))
+
+    @retry()
+    def _fetch_file_contents(self, url, path, commit_sha, github):
         content = None
         if 'github' in url:
             repo_name = url.rstrip("/").replace('https://github.com/', '')
@@ -251,9 +430,8 @@ class SaasHerder():
             f = project.files.get(file_path=path.lstrip('/'), ref=commit_sha)
             content = f.decode()
 
-        return yaml.safe_load(content), html_url, commit_sha
+        return content
 
-    @retry()
     def _get_directory_contents(self, options):
         url = options['url']
         path = options['path']
@@ -261,36 +439,60 @@ class SaasHerder():
         github = options['github']
         html_url = f"{url}/tree/{ref}{path}"
         commit_sha = self._get_commit_sha(options)
+        key = ContentCache.key('directory', url, commit_sha, path)
+        file_paths = json.loads(self.content_cache.get_or_fetch(
+            key,
+            lambda: json.dumps(self._fetch_directory_file_paths(
+                url, path, commit_sha, github))))
         resources = []
+        for file_path in file_paths:
+            content = self._get_file_contents_cached(url, file_path,
+                                                     commit_sha, github)
+            resources.append(yaml.safe_load(content))
+
+        return resources, html_url, commit_sha
+
+    @retry()
+    def _fetch_directory_file_paths(self, url, path, commit_sha, github):
+        file_paths = []
         if 'github' in url:
             repo_name = url.rstrip("/").replace('https://github.com/', '')
             repo = github.get_repo(repo_name)
             for f in repo.get_contents(path, commit_sha):
-                file_path = os.path.join(path, f.name)
-                file_contents_decoded = \
-                    self._get_file_contents_github(
-                        repo, file_path, commit_sha)
-                resource = yaml.safe_load(file_contents_decoded)
-                resources.append(resource)
+                file_paths.append(os.path.join(path, f.name))
         elif 'gitlab' in url:
             if not self.gitlab:
                 raise Exception('gitlab is not initialized')
             project = self.gitlab.get_project(url)
             for f in project.repository_tree(path=path.lstrip('/'),
                                              ref=commit_sha, all=True):
-                file_contents = \
-                    project.files.get(file_path=f['path'], ref=commit_sha)
-                resource = yaml.safe_load(file_contents.decode())
-                resources.append(resource)
+                file_paths.append(f['path'])
 
-        return resources, html_url, commit_sha
+        return file_paths
 
-    @retry()
     def _get_commit_sha(self, options):
         url = options['url']
         ref = options['ref']
         github = options['github']
         hash_length = options.get('hash_length')
+        if COMMIT_SHA_RE.match(ref):
+            commit_sha = ref
+        else:
+            key = (url, ref)
+            with self._commit_shas_lock:
+                commit_sha = self._commit_shas.get(key)
+            if commit_sha is None:
+                commit_sha = self._fetch_commit_sha(url, ref, github)
+                with self._commit_shas_lock:
+                    self._commit_shas[key] = commit_sha
+
+        if hash_length:
+            return commit_sha[:hash_length]
+
+        return commit_sha
+
+    @retry()
+    def _fetch_commit_sha(self, url, ref, github):
         commit_sha = ''
         if 'github' in url:
             repo_name = url.rstrip("/").replace('https://github.com/', '')
@@ -304,9 +506,6 @@ class SaasHerder():
             commits = project.commits.list(ref_name=ref)
             commit_sha = commits[0].id
 
-        if hash_length:
-            return commit_sha[:hash_length]
-
         return commit_sha
 
     @staticmethod
@@ -356,6 +555,13 @@ class SaasHerder():
                 return True
         return False
 
+    @staticmethod
+    def _oc_process(template, parameters):
+        if PROCESS_TEMPLATES_IN_PROCESS:
+            return openshift_template.process(template, parameters)
+        oc = OC('server', 'token', local=True)
+        return oc.process(template, parameters)
+
     def _process_template(self, options):
         saas_file_name = options['saas_file_name']
         resource_template_name = options['resource_template_name']
@@ -454,10 +660,11 @@ class SaasHerder():
                     image_uri = f"{registry_image}:{image_tag}"
                     img = Image(image_uri, **image_auth)
                     if need_repo_digest:
-                        consolidated_parameters[
-                            "REPO_DIGEST"] = img.url_digest
+                        consolidated_parameters["REPO_DIGEST"] = \
+                            self.registry_cache.url_digest(img)
                     if need_image_digest:
-                        consolidated_parameters["IMAGE_DIGEST"] = img.digest
+                        consolidated_parameters["IMAGE_DIGEST"] = \
+                            self.registry_cache.digest(img)
                 except (rqexc.ConnectionError, rqexc.HTTPError) as e:
                     logging.error(
                         f"[{saas_file_name}/{resource_template_name}] "
@@ -465,10 +672,11 @@ class SaasHerder():
                         + f"{image_uri}: {str(e)}")
                     return None, None, None
 
-            oc = OC('server', 'token', local=True)
             try:
-                resources = oc.process(template, consolidated_parameters)
-            except StatusCodeError as e:
+                resources = self._oc_process(template,
+                                             consolidated_parameters)
+            except (StatusCodeError,
+                    openshift_template.TemplateProcessingError) as e:
                 logging.error(
                     f"[{saas_file_name}/{resource_template_name}] " +
                     f"{html_url}: error processing template: {str(e)}")
@@ -530,8 +738,7 @@ class SaasHerder():
 
         return images
 
-    @staticmethod
-    def _check_image(image, image_patterns, image_auth, error_prefix):
+    def _check_image(self, image, image_patterns, image_auth, error_prefix):
         error = False
         if image_patterns and \
                 not any(image.startswith(p) for p in image_patterns):
@@ -539,7 +746,7 @@ class SaasHerder():
             logging.error(
                 f"{error_prefix} Image is not in imagePatterns: {image}")
         try:
-            valid = Image(image, **image_auth)
+            valid = self.registry_cache.exists(Image(image, **image_auth))
             if not valid:
                 error = True
                 logging.error(
@@ -768,7 +975,13 @@ class SaasHerder():
 
         return promotion
 
+    def load_state(self):
+        """loads the state once, so it is read from memory by the
+        threads computing the diff."""
+        self.state.load(self.thread_pool_size)
+
     def get_moving_commits_diff(self, dry_run):
+        self.load_state()
         results = threaded.run(self.get_moving_commits_diff_saas_file,
                                self.saas_files,
                                self.thread_pool_size,
@@ -845,6 +1058,7 @@ class SaasHerder():
         self.state.add(key, value=commit_sha, force=True)
 
     def get_configs_diff(self):
+        self.load_state()
         results = threaded.run(self.get_configs_diff_saas_file,
                                self.saas_files,
                                self.thread_pool_size)
@@ -44,6 +44,15 @@ class SecretReader:
         else:
             return config.read(secret)
 
+    def read_all_many(self, secrets, thread_pool_size=10):
+        """Reads many secrets in advance, so that subsequent calls
+        to read and read_all for these secrets are served from memory.
+
+        Only applies if Vault is the secret backend.
+        """
+        if self.settings and self.settings.get('vault'):
+            self.vault_client.read_all_many(secrets, thread_pool_size)
+
     @retry()
     def read_all(self, secret):
         """Returns a dictionary of keys and values
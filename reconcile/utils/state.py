@@ -1,11 +1,54 @@
+import copy
 import os
 import json
 
+from collections import OrderedDict
+from threading import Lock
+
 from botocore.errorfactory import ClientError
 
+import reconcile.utils.threaded as threaded
+
 from reconcile.utils.aws_api import AWSApi
 
 
+# values read in previous runs, by (bucket, key), with their ETag.
+# an object whose ETag did not change is not downloaded again.
+# the least recently used values are dropped above the size limit.
+ETAG_CACHE_SIZE = int(os.environ.get('STATE_ETAG_CACHE_SIZE', 10000))
+_etag_cache = OrderedDict()
+_etag_cache_lock = Lock()
+
+
+def _get_cached_entry(bucket, key):
+    with _etag_cache_lock:
+        cached = _etag_cache.get((bucket, key))
+        if cached is not None:
+            _etag_cache.move_to_end((bucket, key))
+    return cached
+
+
+def _get_cached(bucket, key, etag):
+    cached = _get_cached_entry(bucket, key)
+    if cached is not None and cached[0] == etag:
+        return True, cached[1]
+    return False, None
+
+
+def _set_cached(bucket, key, etag, value):
+    with _etag_cache_lock:
+        _etag_cache[(bucket, key)] = (etag, value)
+        _etag_cache.move_to_end((bucket, key))
+        while len(_etag_cache) > ETAG_CACHE_SIZE:
+            _etag_cache.popitem(last=False)
+
+
+def clear_cache():
+    """ drops all the values cached by previous reads. """
+    with _etag_cache_lock:
+        _etag_cache.clear()
+
+
 class State:
     """
     A state object to be used by stateful integrations.
@@ -15,6 +58,9 @@ class State:
     Good example: email-sender should only send each email once
     Bad example: openshift-resources' source of truth is the clusters
 
+    Once `load` is called, the state is read from an in-memory
+    snapshot. Writes always go to the bucket right away.
+
     :param integration: name of calling integration
     :param accounts: Graphql AWS accounts query results
     :param settings: App Interface settings
@@ -33,6 +79,65 @@ class State:
         session = aws_api.get_session(account)
 
         self.client = session.client('s3')
+        self._snapshot = None
+
+    def _key(self, key):
+        return f"{self.state_path}/{key}"
+
+    def _list_objects(self):
+        paginator = self.client.get_paginator('list_objects_v2')
+        for page in paginator.paginate(Bucket=self.bucket,
+                                       Prefix=self.state_path):
+            yield from page.get('Contents', [])
+
+    def _fetch(self, s3_key, etag=None):
+        """returns the value of an object, which is only downloaded
+        if it changed since it was last read."""
+        if etag is not None:
+            hit, value = _get_cached(self.bucket, s3_key, etag)
+            if hit:
+                return value
+
+        kwargs = {}
+        cached = _get_cached_entry(self.bucket, s3_key)
+        if cached is not None:
+            kwargs['IfNoneMatch'] = cached[0]
+        try:
+            response = self.client.get_object(Bucket=self.bucket,
+                                              Key=s3_key, **kwargs)
+        except ClientError as details:
+            if details.response['Error']['Code'] in ['304', 'NotModified']:
+                return cached[1]
+            raise
+        value = json.loads(response['Body'].read())
+        _set_cached(self.bucket, s3_key, response['ETag'], value)
+        return value
+
+    def load(self, thread_pool_size=10):
+        """
+        Loads all the keys of the state, listed with pagination and
+        fetched concurrently, into an in-memory snapshot.
+
+        :param thread_pool_size: number of concurrent reads
+        """
+        objects = [o for o in self._list_objects()
+                   if o['Key'].startswith(f"{self.state_path}/")]
+
+        def fetch(o):
+            try:
+                return self._fetch(o['Key'], etag=o['ETag'])
+            except ClientError as details:
+                if details.response['Error']['Code'] == 'NoSuchKey':
+                    return KeyError
+                raise
+            except json.decoder.JSONDecodeError:
+                return KeyError
+
+        values = threaded.run(fetch, objects, thread_pool_size)
+        prefix_len = len(self.state_path) + 1
+        self._snapshot = {o['Key'][prefix_len:]: value
+                          for o, value in zip(objects, values)
+                          if value is not KeyError}
 
     def exists(self, key):
         """
@@ -42,6 +147,8 @@ class State:
 
         :type key: string
         """
+        if self._snapshot is not None:
+            return key in self._snapshot
         try:
             self.client.head_object(
                 Bucket=self.bucket, Key=f"{self.state_path}/{key}")
@@ -53,14 +160,11 @@ class State:
         """
         Returns a list of keys in the state
         """
-        objects = self.client.list_objects(Bucket=self.bucket,
-                                           Prefix=self.state_path)
-
-        if 'Contents' not in objects:
-            return []
+        if self._snapshot is not None:
+            return [f"/{key}" for key in self._snapshot]
 
         return [o['Key'].replace(self.state_path, '')
-                for o in objects['Contents']]
+                for o in self._list_objects()]
 
     def add(self, key, value=None, force=False):
         """
@@ -89,6 +193,8 @@ class State:
                 f"[state] key {key} does not exists in {self.state_path}")
         self.client.delete_object(
             Bucket=self.bucket, Key=f"{self.state_path}/{key}")
+        if self._snapshot is not None:
+            self._snapshot.pop(key, None)
 
     def get(self, key, *args):
         """
@@ -108,18 +214,23 @@ class State:
                 return args[0]
             raise
 
-    def get_all(self, path):
+    def get_all(self, path, thread_pool_size=10):
         """
         Gets all keys and values from the state in the specified path.
         """
-        return {k.replace(f'/{path}/', ''): self.get(k.lstrip('/'))
-                for k in self.ls() if k.startswith(f'/{path}')}
+        keys = [k for k in self.ls() if k.startswith(f'/{path}')]
+        values = threaded.run(lambda k: self.get(k.lstrip('/')), keys,
+                              thread_pool_size)
+        return {k.replace(f'/{path}/', ''): v for k, v in zip(keys, values)}
 
     def __getitem__(self, item):
+        if self._snapshot is not None:
+            try:
+                return copy.deepcopy(self._snapshot[item])
+            except KeyError:
+                raise KeyError(item)
         try:
-            response = self.client.get_object(Bucket=self.bucket,
-                                              Key=f"{self.state_path}/{item}")
-            return json.loads(response['Body'].read())
+            return copy.deepcopy(self._fetch(self._key(item)))
         except ClientError as details:
             if details.response['Error']['Code'] == 'NoSuchKey':
                 raise KeyError(item)
@@ -128,6 +239,14 @@ class State:
             raise KeyError(item)
 
     def __setitem__(self, key, value):
-        self.client.put_object(Bucket=self.bucket,
-                               Key=f"{self.state_path}/{key}",
-                               Body=json.dumps(value))
+        self._put(key, value)
+        if self._snapshot is not None:
+            self._snapshot[key] = copy.deepcopy(value)
+
+    def _put(self, key, value):
+        s3_key = self._key(key)
+        response = self.client.put_object(Bucket=self.bucket,
+                                          Key=s3_key,
+                                          Body=json.dumps(value))
+        _set_cached(self.bucket, s3_key, response['ETag'],
+                    copy.deepcopy(value))
@@ -762,6 +762,11 @@ class TerrascriptClient:
     def populate_resources(self, namespaces, existing_secrets, account_name,
                            ocm_map=None):
         self.init_populate_specs(namespaces, account_name)
+        # prefetch all defaults files in as few requests as possible
+        gql.get_api().get_resources(
+            spec['resource']['defaults']
+            for specs in self.account_resources.values()
+            for spec in specs if spec['resource'].get('defaults'))
         for specs in self.account_resources.values():
             for spec in specs:
                 self.populate_tf_resources(spec, existing_secrets,
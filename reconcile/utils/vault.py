@@ -1,7 +1,10 @@
 import base64
+import logging
 import time
 import functools
 
+from threading import Lock, RLock
+
 import hvac
 import requests
 
@@ -9,7 +12,10 @@ from hvac.exceptions import InvalidPath
 from requests.adapters import HTTPAdapter
 from sretoolbox.utils import retry
 
+import reconcile.utils.threaded as threaded
+
 from reconcile.utils.config import get_config
+from reconcile.utils.metrics import vault_cache_hits, vault_cache_misses
 
 
 class SecretNotFound(Exception):
@@ -35,10 +41,19 @@ class VaultConnectionError(Exception):
 class _VaultClient:
     """
     A class representing a Vault client. Allows read/write operations.
-    The client caches read requests in-memory if the request is made
-    to a versioned KV engine (v2), since that includes both a path
-    and a version (no invalidation required).
+    The client caches read requests in-memory. Reads from a versioned
+    KV engine (v2) include both a path and a version, so they are cached
+    with no invalidation required. Reads from a KV v1 engine are cached
+    until clear_cache is called (once per run).
+    Secrets can be read in bulk in advance with read_all_many.
+
+    The client tracks the lease of its token locally and logs in again
+    before the token expires (or when access is denied), instead of
+    checking if it is authenticated before every access.
     """
+    # fraction of the token lease after which the client logs in again
+    TOKEN_RENEW_RATIO = 0.75
+
     def __init__(self):
         config = get_config()
 
@@ -55,6 +70,11 @@ class _VaultClient:
                               pool_maxsize=100)
         session.mount('https://', adapter)
         self._client = hvac.Client(url=server, session=session)
+        self._auth_lock = RLock()
+        self._token_renew_time = None
+        self._cache = {}
+        self._v1_cache_keys = set()
+        self._cache_lock = Lock()
 
         authenticated = False
         for i in range(0, 3):
@@ -69,7 +89,30 @@ class _VaultClient:
             raise VaultConnectionError()
 
     def _refresh_client_auth(self):
-        self._client.auth_approle(self.role_id, self.secret_id)
+        with self._auth_lock:
+            login_time = time.monotonic()
+            result = self._client.auth_approle(self.role_id, self.secret_id)
+            auth = result.get('auth') if isinstance(result, dict) else None
+            lease_duration = (auth or {}).get('lease_duration')
+            if lease_duration:
+                self._token_renew_time = \
+                    login_time + lease_duration * self.TOKEN_RENEW_RATIO
+            else:
+                # the token does not expire
+                self._token_renew_time = None
+
+    def ensure_authenticated(self):
+        """ logs in again if the token is about to expire.
+        this is a local check, no request is made to Vault otherwise. """
+        renew_time = self._token_renew_time
+        if renew_time is None or time.monotonic() < renew_time:
+            return
+        with self._auth_lock:
+            # another thread may have logged in meanwhile
+            if self._token_renew_time != renew_time:
+                return
+            logging.debug('vault token is about to expire, logging in again')
+            self._refresh_client_auth()
 
     @retry()
     def read_all(self, secret):
@@ -80,6 +123,7 @@ class _VaultClient:
         * version (optional) - secret version to read (if this is
                                a v2 KV engine)
         """
+        self.ensure_authenticated()
         secret_path = secret['path']
         secret_version = secret.get('version')
 
@@ -87,7 +131,12 @@ class _VaultClient:
 
         data = None
         if kv_version == 2:
-            data = self._read_all_v2(secret_path, secret_version)
+            try:
+                data = self._read_all_v2(secret_path, secret_version)
+            except SecretAccessForbidden:
+                # the token may have been revoked
+                self._refresh_client_auth()
+                raise
         else:
             try:
                 data = self._read_all_v1(secret_path)
@@ -119,8 +168,54 @@ class _VaultClient:
 
         return version
 
-    @functools.lru_cache(maxsize=None)
+    def _cached(self, kv_version, key, read):
+        try:
+            data = self._cache[key]
+            vault_cache_hits.labels(kv_version=kv_version).inc()
+        except KeyError:
+            vault_cache_misses.labels(kv_version=kv_version).inc()
+            data = read()
+            with self._cache_lock:
+                self._cache[key] = data
+                if kv_version == 1:
+                    self._v1_cache_keys.add(key)
+        # callers may modify the returned secret
+        return dict(data)
+
+    def clear_cache(self):
+        """ clears the cache of KV v1 secrets, which are not versioned. """
+        with self._cache_lock:
+            for key in self._v1_cache_keys:
+                self._cache.pop(key, None)
+            self._v1_cache_keys = set()
+
+    def read_all_many(self, secrets, thread_pool_size=10):
+        """Reads many secrets concurrently into the cache, so subsequent
+        reads of these secrets are served from memory.
+
+        The input secrets is a list of dictionaries as expected
+        by read_all. Failed reads are not cached and will fail again
+        when the secret is read.
+        """
+        self.ensure_authenticated()
+        unique = {(s['path'], s.get('version')) for s in secrets}
+        threaded.run(self._prefetch, unique, thread_pool_size)
+
+    def _prefetch(self, path_version):
+        path, version = path_version
+        try:
+            if self._get_mount_version_by_secret_path(path) == 2:
+                self._read_all_v2(path, version)
+            else:
+                self._read_all_v1(path)
+        except Exception as e:
+            logging.debug(f'could not prefetch secret {path}: {e}')
+
     def _read_all_v2(self, path, version):
+        return self._cached(2, (path, version),
+                            lambda: self._fetch_all_v2(path, version))
+
+    def _fetch_all_v2(self, path, version):
         path_split = path.split('/')
         mount_point = path_split[0]
         read_path = '/'.join(path_split[1:])
@@ -145,6 +240,9 @@ class _VaultClient:
         return data
 
     def _read_all_v1(self, path):
+        return self._cached(1, path, lambda: self._fetch_all_v1(path))
+
+    def _fetch_all_v1(self, path):
         try:
             secret = self._client.read(path)
         except hvac.exceptions.Forbidden:
@@ -167,6 +265,7 @@ class _VaultClient:
         * version (optional) - secret version to read (if this is
                                a v2 KV engine)
         """
+        self.ensure_authenticated()
         secret_path = secret['path']
         secret_field = secret['field']
         secret_format = secret.get('format', 'plain')
@@ -176,7 +275,13 @@ class _VaultClient:
 
         data = None
         if kv_version == 2:
-            data = self._read_v2(secret_path, secret_field, secret_version)
+            try:
+                data = self._read_v2(secret_path, secret_field,
+                                     secret_version)
+            except SecretAccessForbidden:
+                # the token may have been revoked
+                self._refresh_client_auth()
+                raise
         else:
             try:
                 data = self._read_v1(secret_path, secret_field)
@@ -217,6 +322,7 @@ class _VaultClient:
         * path - path to the secret in Vault
         * data - data (dictionary) to write
         """
+        self.ensure_authenticated()
         secret_path = secret['path']
         b64_data = secret['data']
         data = {k: base64.b64decode(v or '').decode('utf-8')
@@ -233,7 +339,7 @@ class _VaultClient:
                 raise SecretNotFound
 
     def _write_v2(self, path, data):
-        # do not forget to run `self._read_all_v2.cache_clear()`
+        # do not forget to clear the cached versions of the secret
         # if this ever get's implemented
         raise NotImplementedError('vault_client write v2')
 
@@ -243,24 +349,27 @@ class _VaultClient:
         except hvac.exceptions.Forbidden:
             msg = f"permission denied accessing secret '{path}'"
             raise SecretAccessForbidden(msg)
+        with self._cache_lock:
+            self._cache.pop(path, None)
 
 
 class VaultClient:
 
     _instance = None
+    _lock = Lock()
 
     def __new__(cls, *args, **kwargs):
         if cls._instance is None:
-            cls._instance = _VaultClient(*args, **kwargs)
-            return cls._instance
-
-        try:
-            is_authenticated = cls._instance._client.is_authenticated()
-        except requests.exceptions.ConnectionError:
-            is_authenticated = False
-
-        if not is_authenticated:
-            cls._instance = _VaultClient(*args, **kwargs)
-            return cls._instance
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = _VaultClient(*args, **kwargs)
+                return cls._instance
 
+        cls._instance.ensure_authenticated()
         return cls._instance
+
+    @classmethod
+    def clear_cache(cls):
+        """ clears the run-scoped cache of the client, if it exists. """
+        if cls._instance is not None:
+            cls._instance.clear_cache()